@@ -0,0 +1,179 @@
+"""
+Adaptive measurement of the I(V) curve.
+Instead of the 2000 uniform steps of intensityVoltageprog, the curve is first measured on a coarse grid, then only
+the intervals where the linear interpolation of the curve is not accurate enough (where the curve bends) are
+refined, until the estimated interpolation error is below the target accuracy everywhere.
+
+On noisy measurements, the estimated error of an interval cannot go below the noise: it is computed from second
+differences of the intensities, whose noise does not decrease with the step. The noise of a measurement is estimated
+by measuring the coarse grid twice (or given), and intervals whose estimated error is within the noise are not
+refined: the effective tolerance is max(tolerance, noise_factor * sqrt(6) / 8 * noise), noise_factor being 4 by
+default.
+
+The measurements are made by a function measure(amplitudes) returning the intensities, built from:
+    - the offline simulator: simulator_measure
+    - a quantum machine (real or simulated) executing a program for a list of amplitudes: machine_measure
+"""
+import numpy as np
+
+
+class AdaptiveSweepResult:
+    """
+    Result of an adaptive sweep
+
+    Attributes:
+        - a (Array): Measured amplitude factors, sorted
+        - i (Array): Measured intensities
+        - n_shots (Int): Number of measurements
+        - n_rounds (Int): Number of refinement rounds (the coarse grid excluded)
+        - max_error (Float): Estimated maximal error of the linear interpolation of the curve
+        - noise (Float): Standard deviation of the noise of a measurement, estimated or given
+        - threshold (Float): Effective tolerance, the tolerance raised to the level of the noise
+        - converged (Bool): Whether the estimated error is below the effective tolerance on every interval
+    """
+    def __init__(self, a, i, n_shots, n_rounds, max_error, noise=0., threshold=0.):
+        self.a = a
+        self.i = i
+        self.n_shots = n_shots
+        self.n_rounds = n_rounds
+        self.max_error = max_error
+        self.noise = noise
+        self.threshold = threshold
+
+    @property
+    def converged(self):
+        return bool(self.max_error <= self.threshold)
+
+
+def interpolation_errors(a, i):
+    """
+    Estimates the error of the linear interpolation of the curve on each interval [a[k], a[k+1]]:
+    |i''| h^2 / 8, the second derivative being estimated by the divided differences at both ends of the interval.
+
+    Params:
+        - a (Array): Sorted amplitudes, at least 3
+        - i (Array): Intensities
+    Return:
+        - errors (Array): Estimated error on each of the len(a)-1 intervals
+    """
+    steps = np.diff(a)
+    slopes = np.diff(i) / steps
+    second_derivatives = np.abs(2 * np.diff(slopes) / (steps[1:] + steps[:-1]))
+    # Second derivative at both ends of each interval, the first and last points using their neighbour's
+    at_points = np.concatenate(([second_derivatives[0]], second_derivatives, [second_derivatives[-1]]))
+    curvature = np.maximum(at_points[:-1], at_points[1:])
+    return curvature * steps**2 / 8
+
+
+def noise_threshold(noise, noise_factor=4.):
+    """
+    Returns the level below which an estimated interpolation error cannot be told apart from the noise: the noise of
+    a second difference is sqrt(6) noise, so the noise of an estimated error is about sqrt(6) / 8 noise
+
+    Params:
+        - noise (Float): Standard deviation of the noise of a measurement
+        - noise_factor (Float): Number of standard deviations of the noise of the estimated errors, default to 4
+    """
+    return noise_factor * np.sqrt(6) / 8 * noise
+
+
+def adaptive_sweep(measure,
+                   start=0.,
+                   stop=2.,
+                   n_initial=33,
+                   tolerance=1e-3,
+                   min_step=0.001,
+                   max_points=2001,
+                   max_rounds=20,
+                   noise=None,
+                   noise_factor=4.):
+    """
+    Measures the curve on a coarse grid, then refines the intervals whose estimated interpolation error is above the
+    tolerance (raised to the noise level, see noise_threshold) by measuring their midpoints, until the tolerance is
+    met, the intervals reach min_step, or max_points are measured. New amplitudes are rounded to multiples of min_step
+    (the grid of intensityVoltageprog by default).
+
+    Params:
+        - measure (Callable): measure(amplitudes) returns the intensities measured for an Array of amplitudes
+        - start, stop (Float): Range of the amplitude factors
+        - n_initial (Int): Number of points of the coarse grid, default to 33
+        - tolerance (Float): Target interpolation error, in the unit of the intensities, default to 1e-3
+        - min_step (Float): Smallest distance between two amplitudes, default to 0.001
+        - max_points (Int): Maximal number of measurements, default to 2001
+        - max_rounds (Int): Maximal number of refinement rounds, default to 20
+        - noise (Float): Standard deviation of the noise of a measurement. Default to None: the coarse grid is
+        measured twice, the noise is estimated from the differences of the repetitions and the means are kept
+        - noise_factor (Float): See noise_threshold, default to 4
+    Return:
+        - result (AdaptiveSweepResult): Measured curve
+    """
+    a = np.round(np.linspace(start, stop, n_initial) / min_step) * min_step
+    i = np.asarray(measure(a), dtype=np.float64).ravel()
+    n_shots = a.size
+    if noise is None:
+        repeated = np.asarray(measure(a), dtype=np.float64).ravel()
+        n_shots += a.size
+        noise = float(np.std(i - repeated, ddof=1) / np.sqrt(2))
+        i = (i + repeated) / 2
+    threshold = max(tolerance, noise_threshold(noise, noise_factor))
+    n_rounds = 0
+    errors = interpolation_errors(a, i)
+    while n_rounds < max_rounds and n_shots < max_points:
+        steps = np.diff(a)
+        refine = np.flatnonzero((errors > threshold) & (steps >= 2 * min_step - min_step / 2))
+        if refine.size == 0:
+            break
+        # Worst intervals first if the budget does not allow to refine all of them
+        budget = max_points - n_shots
+        if refine.size > budget:
+            refine = refine[np.argsort(errors[refine])[::-1][:budget]]
+        new_a = np.round((a[refine] + a[refine + 1]) / 2 / min_step) * min_step
+        new_i = np.asarray(measure(new_a), dtype=np.float64).ravel()
+        n_shots += new_a.size
+        a = np.concatenate((a, new_a))
+        i = np.concatenate((i, new_i))
+        order = np.argsort(a, kind="stable")
+        a, i = a[order], i[order]
+        errors = interpolation_errors(a, i)
+        n_rounds += 1
+    return AdaptiveSweepResult(a, i, n_shots, n_rounds, float(errors.max()), noise, threshold)
+
+
+def simulator_measure(config, model=None, **kwargs):
+    """
+    Returns a measure function computing the intensities with the offline simulator
+
+    Params:
+        - config (Dict): Configuration dictionary
+        - model (AOMPhotodiodeModel): Model of the setup
+        - kwargs: Other parameters of simulator.simulate_amplitudes
+    """
+    from simulator import simulate_amplitudes
+
+    def measure(amplitudes):
+        return simulate_amplitudes(config, amplitudes, model, **kwargs)[0]
+    return measure
+
+
+def machine_measure(machine, build_program=None, timeout=None):
+    """
+    Returns a measure function executing a program on an open quantum machine for each list of amplitudes
+
+    Params:
+        - machine: Quantum machine (opened by a QuantumMachinesManager or a SimulatedQuantumMachinesManager)
+        - build_program (Callable): build_program(amplitudes) returns the program to execute, saving the streams 'a'
+        and 'i'. Default to intensityVoltage.build_amplitude_list_program (use lambda amplitudes:
+        {"amplitudes": amplitudes} with a simulated machine)
+        - timeout (Float): Maximal duration of each execution in s, default to None
+    """
+    if build_program is None:
+        from intensityVoltage import build_amplitude_list_program as build_program
+
+    def measure(amplitudes):
+        job = machine.execute(build_program(list(amplitudes)))
+        result_handles = job.result_handles
+        if result_handles.wait_for_all_values(timeout) is False:
+            job.halt()
+            raise TimeoutError("Measurement not over after {} s".format(timeout))
+        return np.asarray(result_handles.get("i").fetch_all(), dtype=np.float64)
+    return measure
@@ -0,0 +1,186 @@
+"""
+Analysis of the I(V) curves fetched from the 'a' and 'i' streams, and linearization of the AOM.
+The intensity is fitted by a monotone function of the amplitude, which is inverted to build a look-up table (LUT)
+giving the amplitude factor producing each intensity. Intensities obtained with amplitudes taken from the LUT are
+linear. The LUT can be written back as an arbitrary Waveform, or used as amplitude factors for amp(a).
+
+All the functions work on batches of curves (one row per channel): calibrating a whole AOM array is a single array
+operation.
+"""
+import numpy as np
+
+from quantum_machine import Waveform
+
+
+def as_curves(a, i):
+    """
+    Returns the curves as 2D arrays of shape (n_channels, n_points), sorted by amplitude
+
+    Params:
+        - a (Array): Amplitudes, of shape (n_points,) or (n_channels, n_points)
+        - i (Array): Intensities, of shape (n_points,) or (n_channels, n_points)
+    """
+    i = np.atleast_2d(np.asarray(i, dtype=np.float64))
+    a = np.broadcast_to(np.asarray(a, dtype=np.float64), i.shape)
+    order = np.argsort(a, axis=1, kind="stable")
+    return np.take_along_axis(a, order, axis=1), np.take_along_axis(i, order, axis=1)
+
+
+def monotone_fit(a, i, increasing=True):
+    """
+    Fits monotone curves: average of the running maximum from the start and the running minimum from the end,
+    which are both monotone and enclose the data. Noise makes the running extrema diverge, so the curves should be
+    averaged over repetitions or smoothed (see bin_average) beforehand.
+
+    Params:
+        - a (Array): Amplitudes, of shape (n_points,) or (n_channels, n_points)
+        - i (Array): Intensities, of shape (n_points,) or (n_channels, n_points)
+        - increasing (Bool): Whether the curves are increasing, default to True
+    Return:
+        - a (Array): Sorted amplitudes, of shape (n_channels, n_points)
+        - fit (Array): Monotone intensities, of shape (n_channels, n_points)
+    """
+    a, i = as_curves(a, i)
+    if not increasing:
+        i = -i
+    upper = np.maximum.accumulate(i, axis=1)
+    lower = np.minimum.accumulate(i[:, ::-1], axis=1)[:, ::-1]
+    fit = (upper + lower) / 2
+    return a, fit if increasing else -fit
+
+
+def bin_average(a, i, n_bins):
+    """
+    Averages the curves in n_bins bins of amplitude of same width (bins without points are interpolated)
+
+    Params:
+        - a (Array): Amplitudes, of shape (n_points,) or (n_channels, n_points)
+        - i (Array): Intensities, of shape (n_points,) or (n_channels, n_points)
+        - n_bins (Int): Number of bins
+    Return:
+        - centers (Array): Centers of the bins, of shape (n_channels, n_bins)
+        - means (Array): Mean intensity in each bin, of shape (n_channels, n_bins)
+    """
+    a, i = as_curves(a, i)
+    n_channels = a.shape[0]
+    low, high = a[:, :1], a[:, -1:]
+    width = np.where(high > low, (high - low) / n_bins, 1.)
+    bins = np.minimum(((a - low) / width).astype(np.int64), n_bins - 1)
+    # One bincount for all the channels: bins of channel k are shifted by k*n_bins
+    flat_bins = (bins + n_bins * np.arange(n_channels)[:, None]).ravel()
+    counts = np.bincount(flat_bins, minlength=n_channels * n_bins).reshape(n_channels, n_bins)
+    sums = np.bincount(flat_bins, weights=i.ravel(), minlength=n_channels * n_bins).reshape(n_channels, n_bins)
+    centers = low + width * (np.arange(n_bins) + 0.5)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+    empty = counts == 0
+    for row in np.flatnonzero(empty.any(axis=1)):
+        full = ~empty[row]
+        means[row, empty[row]] = np.interp(centers[row, empty[row]], centers[row, full], means[row, full])
+    return centers, means
+
+
+def batched_interp(x, xp, fp):
+    """
+    Linear interpolation of each row of x on the corresponding rows of (xp, fp), as numpy.interp, in a single call:
+    rows are shifted so that they do not overlap, then interpolated together.
+
+    Params:
+        - x (Array): Points to evaluate, of shape (n_rows, n)
+        - xp (Array): Non-decreasing abscissas of each row, of shape (n_rows, m)
+        - fp (Array): Values at xp, of shape (n_rows, m)
+    Return:
+        - f (Array): Interpolated values, of shape (n_rows, n)
+    """
+    x = np.atleast_2d(np.asarray(x, dtype=np.float64))
+    xp = np.atleast_2d(np.asarray(xp, dtype=np.float64))
+    fp = np.atleast_2d(np.asarray(fp, dtype=np.float64))
+    n_rows = xp.shape[0]
+    x = np.broadcast_to(x, (n_rows, x.shape[1]))
+    low = xp[:, :1]
+    high = xp[:, -1:]
+    span = float((high - low).max()) + 1.
+    shifts = (np.arange(n_rows)[:, None] * 2 * span) - low
+    x = np.clip(x, low, high) + shifts
+    return np.interp(x.ravel(), (xp + shifts).ravel(), fp.ravel()).reshape(x.shape)
+
+
+class LinearizationTable:
+    """
+    Inverse look-up table of the AOM response of one or several channels
+
+    Attributes:
+        - levels (Array): Normalized intensities of the table, from 0 (minimal intensity) to 1 (maximal intensity)
+        - amplitudes (Array): Amplitude factor giving each level, of shape (n_channels, n_levels)
+        - intensities (Array): Intensity corresponding to each level, of shape (n_channels, n_levels)
+
+    Methods:
+        - amplitude_factors: Returns the amplitude factors giving normalized intensities
+        - waveform: Returns an arbitrary Waveform whose intensity increases linearly
+    """
+    def __init__(self, levels, amplitudes, intensities):
+        self.levels = levels
+        self.amplitudes = amplitudes
+        self.intensities = intensities
+
+    @property
+    def n_channels(self):
+        return self.amplitudes.shape[0]
+
+    def amplitude_factors(self, levels):
+        """
+        Params:
+            - levels (Array): Normalized intensities between 0 and 1, of shape (n,) or (n_channels, n)
+        Return:
+            - amplitudes (Array): Amplitude factors (for amp(a)), of shape (n_channels, n)
+        """
+        levels = np.broadcast_to(np.atleast_2d(np.asarray(levels, dtype=np.float64)),
+                                 (self.n_channels, np.shape(np.atleast_2d(levels))[1]))
+        return batched_interp(levels, np.broadcast_to(self.levels, self.amplitudes.shape), self.amplitudes)
+
+    def waveform(self, name, length, sample=0.25, channel=0):
+        """
+        Arbitrary waveform ramping the intensity linearly from the minimal to the maximal intensity
+
+        Params:
+            - name (String): Name of the waveform
+            - length (Int): Number of samples (pulse length in ns)
+            - sample (Float): Amplitude of the waveform for an amplitude factor of 1, in V (amp_mod_wf: 0.25V)
+            - channel (Int): Channel of the table
+        Return:
+            - waveform (Waveform): Arbitrary waveform
+        """
+        samples = sample * self.amplitude_factors(np.linspace(0., 1., length))[channel]
+        return Waveform(name, wvf_type="arbitrary", samples=samples)
+
+
+def linearization_table(a, i, n_levels=1001, n_bins=None):
+    """
+    Builds the inverse look-up tables of I(V) curves. The curves are fitted by monotone curves up to their maximum
+    (the AOM saturates and the intensity decreases for higher amplitudes), then inverted.
+
+    Params:
+        - a (Array): Amplitude factors, of shape (n_points,) or (n_channels, n_points)
+        - i (Array): Measured intensities, of shape (n_points,) or (n_channels, n_points)
+        - n_levels (Int): Number of levels of the table, default to 1001
+        - n_bins (Int): If given, the curves are first averaged in n_bins bins of amplitude (noisy curves)
+    Return:
+        - table (LinearizationTable): Tables of all the channels
+    """
+    if n_bins is not None:
+        a, i = bin_average(a, i, n_bins)
+    a, i = as_curves(a, i)
+    # Points after the maximum of each curve are replaced by the maximum: the table stops at the saturation
+    peak = np.argmax(i, axis=1)
+    after_peak = np.arange(i.shape[1])[None, :] > peak[:, None]
+    i = np.where(after_peak, np.take_along_axis(i, peak[:, None], axis=1), i)
+    a = np.where(after_peak, np.take_along_axis(a, peak[:, None], axis=1), a)
+    a, fit = monotone_fit(a, i)
+
+    low, high = fit[:, :1], fit[:, -1:]
+    levels = np.linspace(0., 1., n_levels)
+    intensities = low + (high - low) * levels
+    # Flat parts of the fit are made strictly increasing, so that their inversion is well defined
+    ramp = 1e-12 * np.maximum(high - low, 1e-12) * np.arange(fit.shape[1]) / fit.shape[1]
+    amplitudes = batched_interp(intensities, fit + ramp, a)
+    return LinearizationTable(levels, amplitudes, intensities)
@@ -0,0 +1,198 @@
+"""
+Asyncio interface of the quantum machines: open, execute, wait and fetch can be awaited from an event loop which
+serves other tasks at the same time (monitoring, other instruments...).
+
+The blocking calls of the manager (QM SDK or simulator) are made in a bounded thread pool. Waiting for a job does not
+hold a thread: the result handles are polled, so that any number of jobs and streams can be awaited concurrently,
+and waits can be cancelled or time out. A job whose wait is cancelled or times out is halted.
+
+Example:
+    async with AsyncQuantumMachinesManager(QuantumMachinesManager()) as qmm:
+        qm = await qmm.open_qm(config)
+        jobs = [await qm.execute(program) for program in programs]
+        results = await asyncio.gather(*(job.result(timeout=60) for job in jobs))
+
+AsyncQuantumMachinesManager.simulated builds the same interface over a SimulatedQuantumMachinesManager, for tests.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from streaming import astream_results
+
+
+class AsyncQuantumMachinesManager:
+    """
+    Asynchronous wrapper of a QuantumMachinesManager
+
+    Attributes:
+        - manager: Wrapped manager (QuantumMachinesManager or SimulatedQuantumMachinesManager)
+        - max_workers (Int): Maximal number of blocking calls running at the same time, default to 4
+        - poll_interval (Float): Delay between two polls of the result handles of a job in s, default to 0.05
+
+    Methods:
+        - open_qm: Opens a quantum machine
+        - close: Shuts the thread pool down
+    """
+    def __init__(self, manager, max_workers=4, poll_interval=0.05):
+        self.manager = manager
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="qm")
+
+    @classmethod
+    def simulated(cls, model=None, max_workers=4, poll_interval=0.05, **kwargs):
+        """
+        Builds the manager over a SimulatedQuantumMachinesManager (fake manager, no QM SDK nor hardware)
+
+        Params:
+            - model (AOMPhotodiodeModel): Model of the setup
+            - kwargs: Other parameters of SimulatedQuantumMachinesManager (open_time, execution_time...)
+        """
+        from simulator import SimulatedQuantumMachinesManager
+        return cls(SimulatedQuantumMachinesManager(model, **kwargs), max_workers, poll_interval)
+
+    async def run(self, function, *args, **kwargs):
+        """
+        Calls function(*args, **kwargs) in the thread pool
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(function, *args, **kwargs))
+
+    async def open_qm(self, config, close_other_machines=False, timeout=None):
+        """
+        Params:
+            - config (Dict): Configuration dictionary
+            - close_other_machines (Bool): Whether the other machines are closed, default to False
+            - timeout (Float): Maximal duration of the opening in s, default to None
+        Return:
+            - machine (AsyncQuantumMachine): Open quantum machine
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, functools.partial(
+            self.manager.open_qm, config, close_other_machines=close_other_machines))
+        try:
+            machine = await asyncio.wait_for(asyncio.shield(future), timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            # The upload cannot be interrupted: the machine is closed once open
+            future.add_done_callback(_close_opened_machine)
+            raise
+        return AsyncQuantumMachine(machine, self)
+
+    async def close(self):
+        await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+        return False
+
+
+def _close_opened_machine(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+class AsyncQuantumMachine:
+    """
+    Asynchronous wrapper of an open quantum machine
+
+    Attributes:
+        - machine: Wrapped machine
+        - manager (AsyncQuantumMachinesManager): Manager having opened the machine
+
+    Methods:
+        - execute: Starts the execution of a program
+        - set_intermediate_frequency, set_output_dc_offset_by_element: Runtime updates of the machine
+        - close: Closes the machine
+    """
+    def __init__(self, machine, manager):
+        self.machine = machine
+        self.manager = manager
+
+    async def execute(self, program):
+        """
+        Param:
+            - program: QUA program (or ProgramBuild, or parameters of a simulated machine)
+        Return:
+            - job (AsyncJob): Running job
+        """
+        job = await self.manager.run(self.machine.execute, program)
+        return AsyncJob(job, self.manager)
+
+    async def set_intermediate_frequency(self, element, freq):
+        return await self.manager.run(self.machine.set_intermediate_frequency, element, freq)
+
+    async def set_output_dc_offset_by_element(self, element, input, offset):
+        return await self.manager.run(self.machine.set_output_dc_offset_by_element, element, input, offset)
+
+    async def close(self):
+        return await self.manager.run(self.machine.close)
+
+
+class AsyncJob:
+    """
+    Asynchronous wrapper of a running job
+
+    Attributes:
+        - job: Wrapped job
+        - result_handles: Result handles of the job
+        - manager (AsyncQuantumMachinesManager): Manager of the machine running the job
+
+    Methods:
+        - wait: Waits until all the values are acquired
+        - fetch: Fetches whole streams
+        - result: Waits, then fetches
+        - stream: Asynchronous generator of the chunks of new values (see streaming.py)
+        - halt: Stops the job
+    """
+    def __init__(self, job, manager):
+        self.job = job
+        self.result_handles = job.result_handles
+        self.manager = manager
+
+    async def wait(self, timeout=None):
+        """
+        Waits until all the values are acquired, polling the result handles. The job is halted if the wait is
+        cancelled or lasts more than timeout seconds (asyncio.TimeoutError is then raised).
+        """
+        try:
+            await asyncio.wait_for(self._poll(), timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            await asyncio.shield(self.halt())
+            raise
+
+    async def _poll(self):
+        while await self.manager.run(self.result_handles.is_processing):
+            await asyncio.sleep(self.manager.poll_interval)
+
+    async def fetch(self, names=("a", "i")):
+        """
+        Fetches the streams, concurrently
+
+        Param:
+            - names (Tuple[String]): Names of the streams, default to ('a', 'i')
+        Return:
+            - results (Dict): Map the names of the streams to their arrays of values
+        """
+        values = await asyncio.gather(*(self.manager.run(self.result_handles.get(name).fetch_all)
+                                        for name in names))
+        return {name: np.asarray(value) for name, value in zip(names, values)}
+
+    async def result(self, names=("a", "i"), timeout=None):
+        await self.wait(timeout)
+        return await self.fetch(names)
+
+    def stream(self, names=("a", "i"), chunk_size=None, timeout=None):
+        """
+        Asynchronous generator of the chunks of new values of the streams, see streaming.astream_results
+        """
+        return astream_results(self.result_handles, names, chunk_size, self.manager.poll_interval, timeout,
+                               executor=self.manager.executor)
+
+    async def halt(self):
+        return await self.manager.run(self.job.halt)
@@ -0,0 +1,231 @@
+"""
+Batch execution of (configuration, program) jobs on several quantum machines.
+
+Each job goes through the stages:
+    - prepare: build of the configuration dictionary (from a QuantumMachine of quantum_machine.py)
+    - open: opening of a quantum machine with the configuration (upload and validation)
+    - execute: execution of the program, until all the values are acquired
+    - fetch: fetch of the result streams
+Configurations are prepared ahead in a thread pool, and up to n_machines jobs are run at the same time.
+
+The quantum machines are pooled, keyed by the hash of their configuration (see quantum_machine.config_hash): jobs with
+a configuration already used run on the machine left open, without uploading it again. On the hardware, machines open
+at the same time must not share ports of the controllers, so:
+    - jobs whose configurations share ports are run one after the other (a job holds the locks of all its ports)
+    - before opening a configuration, the pooled machines using some of its ports are closed
+Jobs on disjoint ports run in parallel: the upload of a job overlaps the execution and the fetch of the other ones.
+The pooled machines stay open between calls to run, until close is called.
+The manager can be a QuantumMachinesManager or a simulator.SimulatedQuantumMachinesManager.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from quantum_machine import config_hash
+
+PORT_TYPES = ("analog_outputs", "analog_inputs", "digital_outputs", "digital_inputs")
+
+
+def config_ports(config):
+    """
+    Returns the ports declared by the controllers of a configuration
+
+    Param:
+        - config (Dict): Configuration dictionary
+    Return:
+        - ports (Set[Tuple]): Ports (controller, port type, index)
+    """
+    return {(controller_name, port_type, index)
+            for controller_name, controller in (config.get("controllers") or {}).items()
+            for port_type in PORT_TYPES
+            for index in controller.get(port_type) or {}}
+
+
+class BatchJob:
+    """
+    Job of a batch
+
+    Attributes:
+        - name (String): Name of the job
+        - config (Dict or QuantumMachine): Configuration, or QuantumMachine generating it
+        - program: Program to execute
+        - streams (Tuple[String]): Names of the streams to fetch, default to ("a", "i")
+    """
+    def __init__(self, name, config, program, streams=("a", "i")):
+        self.name = name
+        self.config = config
+        self.program = program
+        self.streams = streams
+
+
+class JobResult:
+    """
+    Result of a job of a batch
+
+    Attributes:
+        - name (String): Name of the job
+        - results (Dict): Map the names of the streams to their values, None if the job failed
+        - timings (Dict): Duration of the stages (prepare, queue, open, execute, fetch) and total duration, in s. queue
+        is the wait between the end of the preparation (or the submission of the job, if later) and the availability
+        of the ports of the configuration. open is close to 0 when the machine of the configuration was already open
+        - reused (Bool): Whether the job ran on a machine already open
+        - error (Exception): Exception raised by the job, None if it succeeded
+    """
+    def __init__(self, name, results=None, timings=None, error=None, reused=False):
+        self.name = name
+        self.results = results
+        self.timings = timings if timings is not None else {}
+        self.error = error
+        self.reused = reused
+
+    def __repr__(self):
+        timings = ", ".join("{}={:.3f}s".format(stage, duration) for stage, duration in self.timings.items())
+        status = "failed: {!r}".format(self.error) if self.error is not None else "ok"
+        return "JobResult({}, {}{}, {})".format(self.name, status, ", reused machine" if self.reused else "", timings)
+
+
+class BatchRunner:
+    """
+    Runs jobs on a pool of quantum machines
+
+    Attributes:
+        - manager: QuantumMachinesManager (or simulated one) opening the quantum machines
+        - n_machines (Int): Maximal number of jobs run at the same time, default to 2
+        - n_prepare (Int): Number of threads preparing the configurations, default to 1
+        - timeout (Float): Maximal duration of the execution of a program in s, default to None (no limit)
+        - n_opened (Int): Number of machines opened
+        - n_reused (Int): Number of jobs run on a machine already open
+
+    Methods:
+        - run: Runs a list of BatchJob and returns the list of their JobResult
+        - close: Closes the pooled machines
+    """
+    def __init__(self, manager, n_machines=2, n_prepare=1, timeout=None):
+        self.manager = manager
+        self.n_machines = n_machines
+        self.n_prepare = n_prepare
+        self.timeout = timeout
+        self.n_opened = 0
+        self.n_reused = 0
+        # Map the hash of the configurations to their open machine and their ports
+        self._machines = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def run(self, jobs):
+        """
+        Params:
+            - jobs (List[BatchJob]): Jobs to run, started in this order
+        Return:
+            - results (List[JobResult]): Results of the jobs, in the same order
+        """
+        with ThreadPoolExecutor(self.n_prepare) as prepare_pool, ThreadPoolExecutor(self.n_machines) as machine_pool:
+            prepared = [prepare_pool.submit(self._prepare, job) for job in jobs]
+            futures = [machine_pool.submit(self._run_job, job, configuration, time.perf_counter())
+                       for job, configuration in zip(jobs, prepared)]
+            return [future.result() for future in futures]
+
+    def close(self):
+        with self._lock:
+            machines = [machine for machine, _ in self._machines.values()]
+            self._machines.clear()
+        for machine in machines:
+            machine.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    @staticmethod
+    def _prepare(job):
+        start = time.perf_counter()
+        config = job.config.config() if hasattr(job.config, "config") else job.config
+        key = config_hash(config)
+        end = time.perf_counter()
+        return config, key, end - start, end
+
+    def _acquire(self, key, ports):
+        """
+        Acquires the locks of the ports (in a fixed order, so that jobs waiting for each other cannot deadlock) and of
+        the configuration
+        """
+        with self._lock:
+            locks = [self._locks.setdefault(resource, threading.Lock())
+                     for resource in sorted(ports, key=repr) + [key]]
+        for lock in locks:
+            lock.acquire()
+        return locks
+
+    def _open(self, config, key, ports):
+        """
+        Returns the pooled machine of the configuration, or opens it after closing the pooled machines using some of
+        its ports (the locks of the ports must be held)
+        """
+        with self._lock:
+            if key in self._machines:
+                self.n_reused += 1
+                return self._machines[key][0], True
+            conflicting = [other_key for other_key, (_, other_ports) in self._machines.items() if other_ports & ports]
+            machines = [self._machines.pop(other_key)[0] for other_key in conflicting]
+        for machine in machines:
+            machine.close()
+        machine = self.manager.open_qm(config, close_other_machines=False)
+        with self._lock:
+            self._machines[key] = (machine, ports)
+            self.n_opened += 1
+        return machine, False
+
+    def _discard(self, key):
+        with self._lock:
+            machine, _ = self._machines.pop(key, (None, None))
+        if machine is not None:
+            machine.close()
+
+    def _run_job(self, job, prepared, submitted):
+        timings = {}
+        reused = False
+        start = time.perf_counter()
+        try:
+            config, key, timings["prepare"], prepared_end = prepared.result()
+            ports = config_ports(config)
+            locks = self._acquire(key, ports)
+        except Exception as error:
+            timings["total"] = time.perf_counter() - start
+            return JobResult(job.name, timings=timings, error=error)
+        try:
+            stage_start = time.perf_counter()
+            timings["queue"] = stage_start - max(submitted, prepared_end)
+            machine, reused = self._open(config, key, ports)
+            timings["open"], stage_start = _elapsed(stage_start)
+            try:
+                running_job = machine.execute(job.program)
+                result_handles = running_job.result_handles
+                if result_handles.wait_for_all_values(self.timeout) is False:
+                    running_job.halt()
+                    raise TimeoutError("Job {} not over after {} s".format(job.name, self.timeout))
+                timings["execute"], stage_start = _elapsed(stage_start)
+                results = {name: result_handles.get(name).fetch_all() for name in job.streams}
+                timings["fetch"], stage_start = _elapsed(stage_start)
+            except Exception:
+                # The state of the machine is unknown: it is not reused
+                self._discard(key)
+                raise
+            timings["total"] = time.perf_counter() - start
+            return JobResult(job.name, results, timings, reused=reused)
+        except Exception as error:
+            timings["total"] = time.perf_counter() - start
+            return JobResult(job.name, timings=timings, error=error, reused=reused)
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+
+def _elapsed(start):
+    """
+    Returns the time elapsed since start, and the current time
+    """
+    now = time.perf_counter()
+    return now - start, now
@@ -0,0 +1,56 @@
+"""
+Compares the sequential execution of jobs (one quantum machine) with their execution on a pool of machines,
+using a simulated manager with the latencies of a real setup.
+The 16 jobs use 4 configurations: 2 amplitudes of the AOM, on 2 controllers. Jobs on the same controller share its
+ports and run one after the other, each configuration is only opened again when the other configuration of its
+controller was used in between.
+
+Run with: python benchmarks/bench_batch.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch import BatchJob, BatchRunner
+from simulator import SimulatedQuantumMachinesManager
+import update_main
+
+
+def on_controller(config, name):
+    """
+    Returns the configuration with its controller renamed
+    """
+    config = dict(config)
+    config["controllers"] = {name: controller for controller in config["controllers"].values()}
+    elements = {}
+    for element_name, element in config["elements"].items():
+        element = dict(element)
+        if "singleInput" in element:
+            element["singleInput"] = {"port": (name, element["singleInput"]["port"][1])}
+        if "outputs" in element:
+            element["outputs"] = {output: (name, port[1]) for output, port in element["outputs"].items()}
+        elements[element_name] = element
+    config["elements"] = elements
+    return config
+
+
+if __name__ == '__main__':
+    configs = []
+    for sample in [0.1, 0.2]:
+        update_main.amp_mod_wf.sample = sample
+        configs.extend(on_controller(update_main.quantumMachine.config(), name) for name in ["OPX+", "OPX+2"])
+    n_jobs = 16
+    jobs = [BatchJob("job{}".format(n), configs[(n // 2) % len(configs)], {"n_sweeps": 2}) for n in range(n_jobs)]
+    for n_machines in [1, 2, 4, 8]:
+        manager = SimulatedQuantumMachinesManager(open_time=0.05, execution_time=0.1)
+        start = time.perf_counter()
+        with BatchRunner(manager, n_machines=n_machines) as runner:
+            results = runner.run(jobs)
+        duration = time.perf_counter() - start
+        assert all(result.error is None for result in results)
+        print("{} machines: {} jobs in {:.2f} s, {} machines opened, {} jobs on a machine already open".format(
+            n_machines, n_jobs, duration, runner.n_opened, runner.n_reused))
+    print(results[0])
+    print(results[1])
@@ -0,0 +1,35 @@
+"""
+Compares the full build of the configuration with its incremental build (QuantumMachine.config(cached=True))
+when one pulse amplitude or one offset is modified between two builds, as in a calibration loop.
+
+Run with: python benchmarks/bench_config_cache.py
+"""
+import time
+
+from synthetic import build_machine
+
+
+def time_builds(machine, n_builds, cached):
+    """
+    Returns the mean duration of a build of the configuration (in s), modifying one waveform and one offset
+    before each build
+    """
+    waveform = machine.waveforms[0]
+    port = machine.controllers[0].analog_outputs[0]
+    machine.config(cached=cached)
+    start = time.perf_counter()
+    for n in range(n_builds):
+        waveform.sample = 0.25 * (n % 4) / 4
+        port.offset = 0.01 * (n % 2)
+        machine.config(cached=cached)
+    return (time.perf_counter() - start) / n_builds
+
+
+if __name__ == '__main__':
+    n_builds = 200
+    for n_elements, n_pulses in [(1000, 1000), (5000, 5000)]:
+        machine = build_machine(n_elements=n_elements, n_pulses=n_pulses, n_waveforms=n_pulses // 2)
+        full = time_builds(machine, n_builds, cached=False)
+        incremental = time_builds(machine, n_builds, cached=True)
+        print("{} elements, {} pulses: full {:.3f} ms, incremental {:.3f} ms, speed-up x{:.1f}".format(
+            n_elements, n_pulses, 1e3 * full, 1e3 * incremental, full / incremental))
@@ -0,0 +1,68 @@
+"""
+Compares the memory used by a machine with 10k pulses built with the slotted components of quantum_machine.py and
+with the same components backed by a __dict__ (previous implementation).
+
+Run with: python benchmarks/bench_slots_memory.py
+"""
+import gc
+import time
+import tracemalloc
+
+import synthetic
+import quantum_machine
+
+
+def unslotted(cls, base):
+    """
+    Returns a copy of the class cls, deriving from base, whose instances store their attributes in a __dict__
+    """
+    namespace = {name: value for name, value in vars(cls).items()
+                 if name != "__slots__" and not isinstance(value, type(quantum_machine.Pulse.name))}
+    return type(cls.__name__, (base,), namespace)
+
+
+def build_with(classes, **kwargs):
+    """
+    Builds a synthetic machine with the classes of quantum_machine replaced by the given ones.
+    Returns the machine, the memory it uses (in bytes) and the duration of the build (in s).
+    """
+    originals = {name: getattr(synthetic, name) for name in classes}
+    for name, cls in classes.items():
+        setattr(synthetic, name, cls)
+    try:
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        machine = synthetic.build_machine(**kwargs)
+        duration = time.perf_counter() - start
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    finally:
+        for name, cls in originals.items():
+            setattr(synthetic, name, cls)
+    return machine, memory, duration
+
+
+if __name__ == '__main__':
+    names = ["Analog_input", "Analog_output", "Controller", "Waveform", "IntegrationWeight", "Pulse", "Element",
+             "Oscillator2", "QuantumMachine"]
+    DictComponent = unslotted(quantum_machine.Component, object)
+    dict_classes = {name: unslotted(getattr(quantum_machine, name), DictComponent) for name in names}
+    kwargs = dict(n_controllers=10, n_ports=10, n_elements=10000, n_pulses=10000, n_waveforms=5000)
+
+    machine, slots_memory, slots_time = build_with({}, **kwargs)
+    dict_machine, dict_memory, dict_time = build_with(dict_classes, **kwargs)
+    assert machine.config() == dict_machine.config()
+    print("10k pulses, 10k elements, 5k waveforms, 200 ports")
+    print("slots: {:.1f} MB, built in {:.0f} ms".format(slots_memory / 1e6, 1e3 * slots_time))
+    print("dict:  {:.1f} MB, built in {:.0f} ms".format(dict_memory / 1e6, 1e3 * dict_time))
+
+    # Components alone, without the dictionaries and strings they reference
+    waveforms = {"single": "wf"}
+    for label, cls in [("slots", quantum_machine.Pulse), ("dict", dict_classes["Pulse"])]:
+        gc.collect()
+        tracemalloc.start()
+        pulses = [cls("pulse", length=16, waveforms=waveforms) for _ in range(10000)]
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print("10k Pulse instances ({}): {:.0f} bytes per pulse".format(label, memory / len(pulses)))
@@ -0,0 +1,77 @@
+"""
+Compares the memory used and the build time of arbitrary waveforms stored as lists of floats (previous
+implementation of Waveform) and as numpy arrays.
+The memory is measured after the construction, and after a call to config() (its result being dropped): an arbitrary
+Waveform then also keeps the list of its samples, so that the next configurations do not convert them again.
+The conversion of the samples to a list of floats (tolist, also done by the first config() of an arbitrary Waveform)
+is timed separately.
+
+Run with: python benchmarks/bench_waveform_samples.py
+"""
+import time
+import tracemalloc
+
+import numpy as np
+
+from synthetic import Component, QuantumMachine, Waveform
+
+
+class ListWaveform(Component):
+    """
+    Previous implementation of an arbitrary Waveform: samples kept in a list of floats
+    """
+    def __init__(self, name, samples):
+        self.name = name
+        self.samples = samples
+
+    def get(self):
+        return {self.name: {"type": "arbitrary",
+                            "samples": self.samples}}
+
+
+def measure(build):
+    """
+    Returns the waveform built by build, the memory allocated (in bytes) after building it, the memory still
+    allocated after building a configuration of a machine containing it, and the duration (in s) of the build
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    waveform = build()
+    duration = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    QuantumMachine(waveforms=[waveform]).config()
+    config_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return waveform, memory, config_memory, duration
+
+
+def time_configs(machine, n_configs=20):
+    start = time.perf_counter()
+    for _ in range(n_configs):
+        machine.config()
+    return (time.perf_counter() - start) / n_configs
+
+
+if __name__ == '__main__':
+    for n_samples in [10**5, 10**6, 10**7]:
+        t = np.linspace(-4., 4., n_samples)
+        shape = 0.25 * np.exp(-t**2 / 2)
+
+        start = time.perf_counter()
+        shape.tolist()
+        conversion_time = time.perf_counter() - start
+        list_waveform, list_memory, _, list_time = measure(lambda: ListWaveform("gauss", shape.tolist()))
+        array_waveform, array_memory, array_config_memory, array_time = measure(
+            lambda: Waveform("gauss", "arbitrary", samples=shape * 1.))
+
+        list_machine = QuantumMachine(waveforms=[list_waveform])
+        array_machine = QuantumMachine(waveforms=[array_waveform])
+        start = time.perf_counter()
+        array_waveform.get_buffer()
+        buffer_time = time.perf_counter() - start
+        print("{:>8} samples: memory list {:.1f} MB, array {:.1f} MB ({:.1f} MB after config()) | "
+              "build list {:.1f} ms (of which tolist {:.1f} ms), array {:.1f} ms | "
+              "config() list {:.3f} ms, array {:.3f} ms | buffer export {:.3f} ms".format(
+                  n_samples, list_memory / 1e6, array_memory / 1e6, array_config_memory / 1e6, 1e3 * list_time,
+                  1e3 * conversion_time, 1e3 * array_time, 1e3 * time_configs(list_machine),
+                  1e3 * time_configs(array_machine), 1e3 * buffer_time))
@@ -0,0 +1,53 @@
+"""
+Guards the startup time of the configuration tooling: imports the configuration modules with python -X importtime,
+fails if the QM SDK (qm package) is imported, or if the total import time exceeds the budget.
+
+Run with: python benchmarks/check_import_time.py [budget in ms, default to 500]
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules which must be importable without the QM SDK
+MODULES = ["quantum_machine", "config", "update_main", "validation", "sweep", "config_cache", "intensityVoltage",
+           "main", "multichannel", "async_jobs",
+           "calibration"]
+
+
+def import_times(modules):
+    """
+    Imports the modules in a new interpreter
+
+    Return:
+        - times (Dict): Map the imported modules to their cumulative import time in us
+        - total (Int): Total import time in us
+    """
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + ", ".join(modules)],
+                             cwd=ROOT, capture_output=True, text=True, check=True)
+    times = {}
+    total = 0
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+        # Modules imported directly by the command are not indented
+        if not name[1:].startswith(" "):
+            total += int(cumulative)
+    return times, total
+
+
+if __name__ == '__main__':
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else 500.
+    times, total = import_times(MODULES)
+    sdk_modules = sorted(name for name in times if name == "qm" or name.startswith("qm."))
+    total /= 1e3
+    for name in MODULES:
+        print("{:<20} {:8.1f} ms".format(name, times.get(name, 0) / 1e3))
+    print("total {:.1f} ms (budget {:.0f} ms)".format(total, budget))
+    if sdk_modules:
+        sys.exit("QM SDK imported by the configuration modules: " + ", ".join(sdk_modules))
+    if total > budget:
+        sys.exit("Import time over budget")
@@ -0,0 +1,210 @@
+"""
+Benchmark suite of the hot paths of the configuration tooling and of the I(V) analysis, on synthetic machines of
+increasing scale (see synthetic.py). Runs offline: neither the QM SDK nor the hardware are needed.
+
+Each benchmark is timed relative to a calibration loop run just before it in each repetition, and the median ratio
+is kept: the ratios depend neither on the speed of the host nor much on its load. They are compared with the ratios
+stored in baseline.json, the script exits with an error if a benchmark is slower than its baseline by more than the
+tolerance, so that it can be used in CI.
+
+Run with: python benchmarks/suite.py [--scales small,medium] [--filter config] [--tolerance 0.5] [--save]
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from synthetic import build_machine
+from config import config as setup_config
+from quantum_machine import QuantumMachine, dict_from_list_instances
+from validation import validate_config
+from analysis import linearization_table
+from simulator import AOMPhotodiodeModel, simulate_intensity_voltage
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Parameters of build_machine, and number of channels of the I(V) analysis
+SCALES = {
+    "small": dict(machine=dict(n_controllers=1, n_ports=10, n_elements=100, n_pulses=100, n_waveforms=10,
+                               waveform_length=0),
+                  n_channels=1),
+    "medium": dict(machine=dict(n_controllers=2, n_ports=10, n_elements=1000, n_pulses=1000, n_waveforms=100,
+                                waveform_length=1000),
+                   n_channels=8),
+    "large": dict(machine=dict(n_controllers=4, n_ports=10, n_elements=5000, n_pulses=5000, n_waveforms=500,
+                               waveform_length=4000),
+                  n_channels=64),
+}
+
+
+def _number_of_calls(function, min_time):
+    # Number of calls of function lasting at least min_time
+    number = 1
+    while True:
+        duration = _time(function, number)
+        if duration >= min_time:
+            return number
+        number *= 2 if duration == 0 else max(2, int(min_time / duration) + 1)
+
+
+def _time(function, number):
+    # As timeit, the garbage collector is disabled: its collections would depend on the objects alive in the process
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        return time.perf_counter() - start
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def measure(function, repeat=5, min_time=0.05):
+    """
+    Returns the duration of a call of function in s: the number of calls per repetition is chosen so that a
+    repetition lasts at least min_time, and the best repetition is kept
+    """
+    number = _number_of_calls(function, min_time)
+    return min(_time(function, number) for _ in range(repeat)) / number
+
+
+def measure_relative(function, repeat=7, min_time=0.05):
+    """
+    Times function and the calibration loop one after the other in each repetition, so that both see the same load
+    of the host
+
+    Return:
+        - ratio (Float): Median over the repetitions of the duration of function relative to the calibration loop
+        - duration (Float): Best duration of a call of function in s
+    """
+    number = _number_of_calls(function, min_time)
+    calibration_number = _number_of_calls(calibration_loop, min_time)
+    ratios, durations = [], []
+    for _ in range(repeat):
+        calibration = _time(calibration_loop, calibration_number) / calibration_number
+        durations.append(_time(function, number) / number)
+        ratios.append(durations[-1] / calibration)
+    return float(np.median(ratios)), min(durations)
+
+
+def calibration_loop():
+    """
+    Reference workload, mixing the operations of the benchmarks: creation of dictionaries and lists, attribute
+    accesses, string formatting and small numpy operations
+    """
+    class Item:
+        __slots__ = ("name", "value")
+
+        def __init__(self, name, value):
+            self.name = name
+            self.value = value
+
+    items = [Item("item{}".format(n), float(n)) for n in range(2000)]
+    table = {item.name: {"value": item.value, "values": [item.value] * 4} for item in items}
+    total = sum(entry["value"] for entry in table.values())
+    array = np.array([entry["values"] for entry in table.values()])
+    return total + float(np.abs(np.diff(array, axis=0)).max())
+
+
+def benchmarks(scale):
+    """
+    Builds the benchmarks of a scale
+
+    Return:
+        - benchmarks (Dict): Map the names of the benchmarks to functions without parameters
+    """
+    parameters = SCALES[scale]
+    machine = build_machine(**parameters["machine"])
+    config = machine.config()
+    data = machine.to_bytes()
+    waveform = machine.waveforms[0]
+
+    def incremental_config():
+        waveform.touch()
+        machine.config(cached=True)
+
+    # I(V) curves of n_channels noisy channels of the setup of config.py
+    curves = simulate_intensity_voltage(setup_config, AOMPhotodiodeModel(noise=1e-3, seed=0),
+                                        n_sweeps=parameters["n_channels"])
+    a, i = curves["a"], curves["i"]
+    return {
+        "config": machine.config,
+        "config_cached": incremental_config,
+        "dict_from_list_instances": lambda: dict_from_list_instances(machine.pulses),
+        "to_bytes": machine.to_bytes,
+        "from_bytes": lambda: QuantumMachine.from_bytes(data),
+        "validate_config": lambda: validate_config(config),
+        "linearization_table": lambda: linearization_table(a, i, n_bins=200),
+    }
+
+
+def run(scales, name_filter=None, repeat=7):
+    """
+    Return:
+        - results (Dict): Map "<scale>/<benchmark>" to its duration relative to the calibration loop
+        - calibration (Float): Duration of the calibration loop in s
+    """
+    results = {}
+    for scale in scales:
+        for name, function in benchmarks(scale).items():
+            if name_filter and name_filter not in name:
+                continue
+            key = "{}/{}".format(scale, name)
+            results[key], duration = measure_relative(function, repeat)
+            print("{:<40} {:12.3f} ms {:12.3f} x calibration".format(key, 1e3 * duration, results[key]), flush=True)
+    calibration = measure(calibration_loop, repeat)
+    print("{:<40} {:12.3f} ms".format("calibration", 1e3 * calibration))
+    return results, calibration
+
+
+def compare(results, baseline, tolerance):
+    """
+    Params:
+        - results, baseline (Dict): Durations relative to the calibration loop
+    Return:
+        - regressions (List[String]): Description of the benchmarks slower than (1 + tolerance) times their baseline
+    """
+    regressions = []
+    for key, ratio in results.items():
+        reference = baseline.get(key)
+        if reference is not None and ratio > (1 + tolerance) * reference:
+            regressions.append("{}: {:.3f} x calibration, baseline {:.3f} (x{:.2f})".format(
+                key, ratio, reference, ratio / reference))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", default="small,medium,large", help="Comma-separated scales")
+    parser.add_argument("--filter", default=None, help="Only run the benchmarks whose name contains this string")
+    parser.add_argument("--repeat", type=int, default=7, help="Number of repetitions of each benchmark")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed slow-down relative to the baseline")
+    parser.add_argument("--baseline", default=BASELINE, help="Baseline file")
+    parser.add_argument("--save", action="store_true", help="Stores the results as the new baseline")
+    arguments = parser.parse_args()
+
+    results, calibration = run(arguments.scales.split(","), arguments.filter, arguments.repeat)
+    if arguments.save:
+        baseline = {}
+        if os.path.exists(arguments.baseline):
+            with open(arguments.baseline) as file:
+                baseline = json.load(file)["ratios"]
+        baseline.update(results)
+        with open(arguments.baseline, "w") as file:
+            # The duration of the calibration loop is only stored for information
+            json.dump({"calibration": calibration, "ratios": dict(sorted(baseline.items()))}, file, indent=4)
+        print("Baseline saved in " + arguments.baseline)
+    elif os.path.exists(arguments.baseline):
+        with open(arguments.baseline) as file:
+            regressions = compare(results, json.load(file)["ratios"], arguments.tolerance)
+        if regressions:
+            sys.exit("Regressions:\n" + "\n".join(regressions))
+        print("No regression (tolerance {:.0%})".format(arguments.tolerance))
+    else:
+        print("No baseline: run with --save to store one")
@@ -0,0 +1,81 @@
+"""
+Synthetic Quantum Machines used by the benchmarks.
+The machines mimic the setup of update_main.py (AOM + photo-diode) duplicated on many ports and controllers.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quantum_machine import *
+
+
+def build_machine(n_controllers=1,
+                  n_ports=10,
+                  n_elements=1000,
+                  n_pulses=1000,
+                  n_waveforms=100,
+                  waveform_length=0):
+    """
+    Builds a synthetic Quantum Machine
+
+    Params:
+        - n_controllers (Int): Number of controllers
+        - n_ports (Int): Number of analog outputs and analog inputs per controller
+        - n_elements (Int): Number of elements, alternatively AOM-like and photo-diode-like elements
+        - n_pulses (Int): Number of pulses, alternatively control and measurement pulses
+        - n_waveforms (Int): Number of waveforms
+        - waveform_length (Int): Number of samples of the waveforms. If 0, the waveforms are constant
+    Return:
+        - machine (QuantumMachine): The synthetic machine
+    """
+    controllers = [Controller("con{}".format(c + 1),
+                              analog_outputs=[Analog_output(p + 1, offset=0.) for p in range(n_ports)],
+                              analog_inputs=[Analog_input(p + 1, offset=0., gain_db=0) for p in range(n_ports)],
+                              ctrl_type="opx2")
+                   for c in range(n_controllers)]
+    if waveform_length:
+        waveforms = [Waveform("wf{}".format(w),
+                              wvf_type="arbitrary",
+                              samples=[0.25 * (k % 100) / 100 for k in range(waveform_length)])
+                     for w in range(n_waveforms)]
+    else:
+        waveforms = [Waveform("wf{}".format(w), wvf_type="constant", sample=0.25 * w / n_waveforms)
+                     for w in range(n_waveforms)]
+    length = max(16, waveform_length)
+    pulses = []
+    for p in range(n_pulses):
+        if p % 2 == 0:
+            pulses.append(Pulse("pulse{}".format(p),
+                                operation="control",
+                                length=length,
+                                waveforms={"single": "wf{}".format(p % n_waveforms)}))
+        else:
+            pulses.append(Pulse("pulse{}".format(p),
+                                operation="measurement",
+                                length=length,
+                                integration_weights={"integration": "integration"}))
+    elements = []
+    for e in range(n_elements):
+        port = ("con{}".format(e % n_controllers + 1), e % n_ports + 1)
+        pulse = "pulse{}".format(e % n_pulses)
+        if e % 2 == 0:
+            elements.append(Element("el{}".format(e),
+                                    {"singleInput": {"port": port},
+                                     "oscillator": "osc",
+                                     "operations": {"op": pulse}}))
+        else:
+            elements.append(Element("el{}".format(e),
+                                    {"outputs": {"out1": port},
+                                     "oscillator": "osc",
+                                     "operations": {"meas": pulse}}))
+    integration_weights = [IntegrationWeight("integration",
+                                             cos_weight=1/length,
+                                             cos_duration=length,
+                                             sin_duration=length)]
+    return QuantumMachine(controllers=controllers,
+                          elements=elements,
+                          pulses=pulses,
+                          waveforms=waveforms,
+                          integration_weights=integration_weights,
+                          oscillators=[Oscillator2("osc", intermediate_frequency=100e6)])
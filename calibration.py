@@ -0,0 +1,370 @@
+"""
+Calibration daemon monitoring the drift of the AOM and of the laser.
+One quantum machine is kept open. Periodically, a short probe measures the intensity for a few amplitudes (spread
+over the curve, shifted at each probe to cover it over time), and compares it with the reference I(V) curve:
+    - the residuals, standardized by the noise of the probe (single shot, measured at start by repeating a probe) and
+    of the reference (averaged if the full sweep is), give a statistic z = (sum(r**2) - n) / sqrt(2 n), centered on 0
+    while the curve does not change
+    - a one-sided CUSUM S = max(0, S + z - k) accumulates the deviations of the successive probes, and raises an alarm
+    when S > h: small drifts are detected after a few probes, isolated outliers are ignored
+The full sweep of intensityVoltageprog (2001 steps) is only run on an alarm (if the estimated drift is also larger than
+the tolerance), and becomes the new reference.
+
+Example with the simulated backend, drifting laser:
+    manager = SimulatedQuantumMachinesManager(AOMPhotodiodeModel(noise=1e-3))
+    daemon = CalibrationDaemon(manager, config, interval=0., programs=simulated_programs())
+    daemon.start()
+    for n in range(100):
+        manager.model.max_intensity *= 0.999
+        daemon.step()
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from instrumentation import Instrumentation
+
+logger = logging.getLogger(__name__)
+
+
+def simulated_programs(n_repeats=1):
+    """
+    Returns the builders of the probe and of the full sweep (averaged over n_repeats sweeps) for a
+    SimulatedQuantumMachinesManager
+    """
+    full = {"n_sweeps": n_repeats, "average": True} if n_repeats > 1 else {}
+    return (lambda amplitudes: {"amplitudes": amplitudes}), (lambda: dict(full))
+
+
+def qua_programs(n_steps=2001, n_repeats=1):
+    """
+    Returns the builders of the probe and of the full sweep for a QuantumMachinesManager (see intensityVoltage.py)
+    """
+    from intensityVoltage import build_amplitude_list_program, build_averaged_program, build_raw_program
+
+    if n_repeats > 1:
+        return build_amplitude_list_program, lambda: build_averaged_program(n_steps, n_repeats).program
+    return build_amplitude_list_program, lambda: build_raw_program(n_steps).program
+
+
+class ReferenceCurve:
+    """
+    Reference I(V) curve
+
+    Attributes:
+        - a (Array): Sorted amplitude factors
+        - i (Array): Intensities
+        - noise (Float): Standard deviation of the noise of a point of the curve (averaged if the sweep is), estimated
+        from the second differences of the curve if not given
+        - created (Float): Time of the measurement, as time.time()
+    """
+    def __init__(self, a, i, noise=None, created=None):
+        a = np.asarray(a, dtype=np.float64).ravel()
+        i = np.asarray(i, dtype=np.float64).ravel()
+        order = np.argsort(a, kind="stable")
+        self.a = a[order]
+        self.i = i[order]
+        if noise is None:
+            # The second differences of a smooth curve sampled finely only contain the noise, of variance 6 sigma^2
+            noise = float(np.std(np.diff(self.i, 2)) / np.sqrt(6)) if self.i.size > 2 else 0.
+        self.noise = noise
+        self.created = time.time() if created is None else created
+
+    @classmethod
+    def from_run(cls, run, noise=None):
+        """
+        Reference curve stored in a run of a ResultStore (columns 'a' and 'i')
+        """
+        return cls(run["a"], run["i"], noise)
+
+    @property
+    def span(self):
+        return float(self.i.max() - self.i.min()) if self.i.size else 0.
+
+    def __call__(self, amplitudes):
+        return np.interp(amplitudes, self.a, self.i)
+
+
+class CusumDetector:
+    """
+    One-sided CUSUM of the standardized statistics of the probes
+
+    Attributes:
+        - slack (Float): k, deviation of the statistic tolerated at each probe, default to 0.5
+        - threshold (Float): h, alarm threshold of the cumulated sum, default to 5
+        - value (Float): Current cumulated sum S
+
+    Methods:
+        - update: Adds the statistic of a probe, returns whether the alarm is raised
+        - reset: Sets the cumulated sum to 0
+    """
+    def __init__(self, slack=0.5, threshold=5.):
+        self.slack = slack
+        self.threshold = threshold
+        self.value = 0.
+
+    def update(self, statistic):
+        self.value = max(0., self.value + statistic - self.slack)
+        return self.value > self.threshold
+
+    def reset(self):
+        self.value = 0.
+
+
+class ProbeResult:
+    """
+    Result of a probe
+
+    Attributes:
+        - time (Float): Time of the probe, as time.time()
+        - a (Array): Probed amplitude factors
+        - i (Array): Measured intensities
+        - residuals (Array): Measured minus reference intensities
+        - statistic (Float): Standardized statistic z of the probe
+        - cusum (Float): Cumulated sum after the probe
+        - drift (Float): RMS of the residuals relative to the span of the reference curve
+        - alarm (Bool): Whether the drift was detected
+    """
+    def __init__(self, time, a, i, residuals, statistic, cusum, drift, alarm):
+        self.time = time
+        self.a = a
+        self.i = i
+        self.residuals = residuals
+        self.statistic = statistic
+        self.cusum = cusum
+        self.drift = drift
+        self.alarm = alarm
+
+    def __repr__(self):
+        return "ProbeResult(z={:.2f}, cusum={:.2f}, drift={:.2e}{})".format(
+            self.statistic, self.cusum, self.drift, ", alarm" if self.alarm else "")
+
+
+class CalibrationDaemon:
+    """
+    Long-running calibration: probes the curve every interval seconds on one open machine, and runs a full sweep when
+    a drift is detected
+
+    Attributes:
+        - manager: QuantumMachinesManager or SimulatedQuantumMachinesManager
+        - config (Dict): Configuration of the machine
+        - reference (ReferenceCurve): Current reference curve, measured by a full sweep at start if None
+        - n_points (Int): Number of amplitudes of a probe, default to 16
+        - a_min, a_max (Float): Range of the probed amplitudes, default to 0 and 2
+        - interval (Float): Delay between two probes in s, default to 60
+        - detector (CusumDetector): Online test, default to CusumDetector()
+        - tolerance (Float): Minimal drift (RMS of the residuals relative to the span of the curve) triggering a
+        full sweep on an alarm, default to 0
+        - probe_noise (Float): Standard deviation of the noise of a probed intensity (single shot), measured at start
+        by measure_probe_noise if None
+        - noise_repeats (Int): Number of repetitions of the amplitudes of the probe measuring probe_noise, default to 16
+        - programs (Tuple): Builders of the probe program (from the amplitudes) and of the full sweep program (without
+        parameters), default to qua_programs()
+        - store (ResultStore): Store of the full sweeps, default to None
+        - on_recalibration (Callable): Called with the new ReferenceCurve after each full sweep, default to None
+        - timeout (Float): Maximal duration of an execution in s, default to None
+        - instrumentation (Instrumentation): Timing of the probes and sweeps, default to disabled
+        - max_backoff (Float): Maximal delay between two steps after failures in s, default to 3600: the delay is
+        doubled after each failure of a step (from interval), and reset by a step succeeding
+        - history (Deque[ProbeResult]): Last probes (at most 1000)
+        - n_probes, n_full_sweeps (Int): Number of probes and full sweeps run
+        - n_failures (Int): Number of steps having failed in a row
+
+    Methods:
+        - start: Opens the machine, and measures the reference and the noise of the probes if needed
+        - measure_probe_noise: Measures the noise of the probes, from one probe repeating its amplitudes
+        - probe: Runs a probe and updates the detector
+        - full_sweep: Measures a new reference curve
+        - step: Runs a probe, then a full sweep if a drift is detected
+        - run: Runs steps every interval seconds until stop is called, logging the failures
+        - stop: Stops run (from another thread)
+        - close: Closes the machine
+    """
+    def __init__(self,
+                 manager,
+                 config,
+                 reference=None,
+                 n_points=16,
+                 a_min=0.,
+                 a_max=2.,
+                 interval=60.,
+                 detector=None,
+                 tolerance=0.,
+                 programs=None,
+                 store=None,
+                 on_recalibration=None,
+                 timeout=None,
+                 instrumentation=None,
+                 probe_noise=None,
+                 noise_repeats=16,
+                 max_backoff=3600.):
+        self.manager = manager
+        self.config = config
+        self.reference = reference
+        self.n_points = n_points
+        self.a_min = a_min
+        self.a_max = a_max
+        self.interval = interval
+        self.detector = detector if detector is not None else CusumDetector()
+        self.tolerance = tolerance
+        self.build_probe, self.build_full = programs if programs is not None else qua_programs()
+        self.store = store
+        self.on_recalibration = on_recalibration
+        self.timeout = timeout
+        self.instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+        self.probe_noise = probe_noise
+        self.noise_repeats = noise_repeats
+        self.max_backoff = max_backoff
+        self.history = deque(maxlen=1000)
+        self.n_probes = 0
+        self.n_full_sweeps = 0
+        self.n_failures = 0
+        self.machine = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self.machine is None:
+            self.machine = self.manager.open_qm(self.config)
+        if self.reference is None:
+            self.full_sweep("no reference")
+        if self.probe_noise is None:
+            self.measure_probe_noise()
+        return self
+
+    def _execute(self, program):
+        job = self.machine.execute(program)
+        result_handles = job.result_handles
+        if result_handles.wait_for_all_values(self.timeout) is False:
+            job.halt()
+            raise TimeoutError("Execution not over after {} s".format(self.timeout))
+        a = np.asarray(result_handles.get("a").fetch_all(), dtype=np.float64)
+        i = np.asarray(result_handles.get("i").fetch_all(), dtype=np.float64)
+        return a, i
+
+    def probe_amplitudes(self):
+        """
+        Amplitudes of the next probe: n_points evenly spaced amplitudes, shifted by a fraction of their spacing at each
+        probe (golden ratio sequence) so that successive probes cover the whole curve
+        """
+        step = (self.a_max - self.a_min) / self.n_points
+        offset = (0.5 + self.n_probes * 0.6180339887498949) % 1.
+        return self.a_min + (np.arange(self.n_points) + offset) * step
+
+    def measure_probe_noise(self):
+        """
+        Measures the noise of a probed intensity: the amplitudes of a probe are measured noise_repeats times in one
+        execution, the noise is the pooled standard deviation of the repetitions. The reference cannot give it when
+        the full sweep is averaged (its noise is then about sqrt(n_repeats) times smaller than the one of a probe).
+
+        Return:
+            - probe_noise (Float): Standard deviation of the noise of a probed intensity
+        """
+        amplitudes = self.probe_amplitudes()
+        with self.instrumentation.span("probe_noise", points=amplitudes.size * self.noise_repeats):
+            _, i = self._execute(self.build_probe(np.tile(amplitudes, self.noise_repeats).tolist()))
+        i = i.reshape(self.noise_repeats, amplitudes.size)
+        self.probe_noise = float(np.sqrt(np.sum(np.var(i, axis=0, ddof=1)) / amplitudes.size))
+        return self.probe_noise
+
+    def probe(self):
+        """
+        Runs a probe and updates the detector
+
+        Return:
+            - result (ProbeResult): Result of the probe
+        """
+        if self.probe_noise is None:
+            self.measure_probe_noise()
+        amplitudes = self.probe_amplitudes()
+        with self.instrumentation.span("probe", points=amplitudes.size):
+            a, i = self._execute(self.build_probe(amplitudes.tolist()))
+        residuals = i - self.reference(a)
+        # Noise of the probe (single shot) and of the reference (averaged if the full sweep is), with a floor for
+        # noiseless measurements
+        sigma = max(np.hypot(self.probe_noise, self.reference.noise), 1e-9 * max(self.reference.span, 1.))
+        n = residuals.size
+        statistic = float((np.sum((residuals / sigma)**2) - n) / np.sqrt(2 * n))
+        alarm = self.detector.update(statistic)
+        drift = float(np.sqrt(np.mean(residuals**2)) / self.reference.span) if self.reference.span > 0 else 0.
+        result = ProbeResult(time.time(), a, i, residuals, statistic, self.detector.value, drift, alarm)
+        self.history.append(result)
+        self.n_probes += 1
+        return result
+
+    def full_sweep(self, reason=""):
+        """
+        Measures a new reference curve, stores it, and resets the detector
+
+        Param:
+            - reason (String): Reason of the sweep, logged and stored in the metadata of the run
+        Return:
+            - reference (ReferenceCurve): New reference curve
+        """
+        logger.info("Full sweep: %s", reason)
+        program = self.build_full()
+        with self.instrumentation.span("full_sweep") as span:
+            a, i = self._execute(program)
+            span.set(points=a.size)
+        self.reference = ReferenceCurve(a, i)
+        self.detector.reset()
+        self.n_full_sweeps += 1
+        if self.store is not None:
+            with self.store.create(config=self.config, program=program, metadata={"reason": reason}) as writer:
+                writer.append({"a": a, "i": i})
+        if self.on_recalibration is not None:
+            self.on_recalibration(self.reference)
+        return self.reference
+
+    def step(self):
+        """
+        Runs a probe, then a full sweep if the detector raises an alarm and the drift is larger than the tolerance
+
+        Return:
+            - result (ProbeResult): Result of the probe
+            - recalibrated (Bool): Whether a full sweep was run
+        """
+        if self.machine is None:
+            self.start()
+        result = self.probe()
+        if result.alarm and result.drift >= self.tolerance:
+            self.full_sweep("drift {:.2e} after {} probes (cusum {:.1f})".format(
+                result.drift, self.n_probes, result.cusum))
+            return result, True
+        if result.alarm:
+            # Significant but tolerated drift: the test starts again
+            self.detector.reset()
+        return result, False
+
+    def run(self, n_steps=None):
+        """
+        Runs steps every interval seconds, until stop is called or n_steps are run. A failing step (timeout, error of
+        the machine or of the connection...) is logged and the daemon goes on, waiting longer after each failure
+        (see max_backoff).
+        """
+        self._stop.clear()
+        n = 0
+        while not self._stop.is_set() and (n_steps is None or n < n_steps):
+            start = time.monotonic()
+            try:
+                self.step()
+                self.n_failures = 0
+            except Exception:
+                self.n_failures += 1
+                logger.exception("Step failed (%d in a row)", self.n_failures)
+            n += 1
+            delay = self.interval
+            if self.n_failures:
+                delay = min(self.interval * 2.**min(self.n_failures, 32), max(self.max_backoff, self.interval))
+            self._stop.wait(max(0., delay - (time.monotonic() - start)))
+
+    def stop(self):
+        self._stop.set()
+
+    def close(self):
+        self.stop()
+        if self.machine is not None:
+            self.machine.close()
+            self.machine = None
@@ -20,7 +20,7 @@ controllers = {ctrl_name: OPX}
 AOM = {"singleInput": {"port": (ctrl_name, 1)},  # AOM is connected to first port of the controller
        "oscillator": "osc",  # Uses oscillator at frequency 100MHz
        "operations": {"amp_mod": "amp_mod_pulse"}}  # Receives 1 pulse
-photodiode = {"outputs": {"out1": ("con1", 1)},  # measure on input port 1
+photodiode = {"outputs": {"out1": (ctrl_name, 1)},  # measure on input port 1
               "oscillator": "osc",  # Uses same oscillator
               "operations": {"meas": "meas_pulse"}}  # Performs measurement operation
 elements = {"AOM": AOM,
@@ -49,6 +49,7 @@ waveforms = {"amp_mod_wf": amp_mod_wf}
 # Want to avoid overflow: integration weights such that:
 # - raw ADC data scaled to between -0.5 and 0.5 multiplied by weights has result between -2 and 2.
 # - The sum of the multiplication above is smaller than 2**16
+# (checked numerically by demodulation.check_demodulation, run by validation.validate_config)
 # If we assume constant weights w=1, and a constant signal a[n] = a*cos(\omega_{IF} t_s n)
 # then result is d = \frac{a N cos(\phi) 2{-12}}{2}
 # The signal is constant and not modulated. We perform the average by integration during 10 \mu s
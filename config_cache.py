@@ -0,0 +1,138 @@
+"""
+Cache of quantum machines keyed by the hash of their configuration (see quantum_machine.config_hash).
+Opening a quantum machine with a configuration that was already used returns the machine already open, instead of
+uploading and validating the configuration again.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from quantum_machine import config_hash
+
+
+class CachedMachine:
+    """
+    Quantum machine returned by CachedQuantumMachinesManager.
+    Gives access to all the methods of the machine, except close which keeps it open in the cache: the machine is
+    closed when it is evicted from the cache.
+    """
+    def __init__(self, machine, key):
+        self.machine = machine
+        self.key = key
+
+    def __getattr__(self, name):
+        return getattr(self.machine, name)
+
+    def close(self):
+        return True
+
+
+class CachedQuantumMachinesManager:
+    """
+    Wraps a QuantumMachinesManager (or a simulated one), keeping the last maxsize machines open.
+    The least recently used machine is closed when a new configuration does not fit in the cache.
+
+    Attributes:
+        - manager: Wrapped manager
+        - maxsize (Int): Maximal number of machines kept open, default to 4
+        - hits (Int): Number of configurations found in the cache
+        - misses (Int): Number of configurations not found in the cache
+        - evictions (Int): Number of machines closed to make room
+        - payload_hits, payload_misses (Int): Same counters for the serialized payloads
+        - time_saved (Float): Estimation of the time saved, in s: mean duration of an open_qm times the number of hits
+
+    Methods:
+        - open_qm: Opens a machine, or returns the machine already open with the same configuration
+        - serialize: Returns the JSON payload of a configuration, cached as well
+        - stats: Returns the counters as a Dict
+        - close_all: Closes all the cached machines
+    """
+    def __init__(self, manager, maxsize=4):
+        self.manager = manager
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.open_duration = 0.
+        self.payload_hits = 0
+        self.payload_misses = 0
+        self._machines = OrderedDict()
+        self._payloads = OrderedDict()
+        self._lock = threading.RLock()
+
+    @property
+    def time_saved(self):
+        if self.misses == 0:
+            return 0.
+        return self.hits * self.open_duration / self.misses
+
+    def open_qm(self, config, close_other_machines=False):
+        """
+        Params:
+            - config (Dict): Configuration dictionary
+            - close_other_machines (Bool): Whether the other cached machines are closed, default to False
+        Return:
+            - machine (CachedMachine): Quantum machine with this configuration
+        """
+        key = config_hash(config)
+        with self._lock:
+            if close_other_machines:
+                for other_key in [other_key for other_key in self._machines if other_key != key]:
+                    self._evict(other_key)
+            if key in self._machines:
+                self.hits += 1
+                self._machines.move_to_end(key)
+                return self._machines[key]
+            self.misses += 1
+        # The lock is not held during the upload, so that several configurations can be uploaded at the same time
+        start = time.perf_counter()
+        machine = CachedMachine(self.manager.open_qm(config, close_other_machines=False), key)
+        with self._lock:
+            self.open_duration += time.perf_counter() - start
+            if key in self._machines:
+                # Opened at the same time by another thread
+                machine.machine.close()
+                return self._machines[key]
+            self._machines[key] = machine
+            while len(self._machines) > self.maxsize:
+                self._evict(next(iter(self._machines)))
+        return machine
+
+    def serialize(self, config):
+        """
+        Returns the configuration serialized to JSON (tuples as lists, keys as strings). Payloads are cached with the
+        same LRU policy as the machines.
+        """
+        key = config_hash(config)
+        with self._lock:
+            if key in self._payloads:
+                self.payload_hits += 1
+                self._payloads.move_to_end(key)
+                return self._payloads[key]
+            self.payload_misses += 1
+        payload = json.dumps(config, separators=(",", ":")).encode()
+        with self._lock:
+            self._payloads[key] = payload
+            while len(self._payloads) > self.maxsize:
+                self._payloads.popitem(last=False)
+        return payload
+
+    def _evict(self, key):
+        machine = self._machines.pop(key)
+        machine.machine.close()
+        self.evictions += 1
+
+    def stats(self):
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "payload_hits": self.payload_hits,
+                "payload_misses": self.payload_misses,
+                "open": len(self._machines),
+                "time_saved": self.time_saved}
+
+    def close_all(self):
+        with self._lock:
+            for key in list(self._machines):
+                self._evict(key)
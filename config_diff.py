@@ -0,0 +1,277 @@
+"""
+Structural diff of two configurations, and minimal update of an open quantum machine.
+Sections are dictionaries indexed by the names of the components: each component of the new configuration is looked
+up by name in the old one, and only the components which are not the same object are compared (configurations
+built by QuantumMachine.config(cached=True) share all their unmodified dictionaries, so that comparing them only
+visits the modified components).
+
+Changes of the intermediate frequencies and of the DC offsets of the analog outputs are applied to the open machine
+with set_intermediate_frequency and set_output_dc_offset_by_element (milliseconds), any other change requires to
+open a machine with the new configuration (seconds).
+
+Example:
+    patch = diff_configs(old_config, quantumMachine)
+    machine = retune(qmm, machine, patch, quantumMachine.config(cached=True))
+"""
+import numpy as np
+
+from quantum_machine import _SECTIONS
+
+
+class _Missing:
+    """
+    Value of the keys absent from a configuration
+    """
+    def __repr__(self):
+        return "MISSING"
+
+
+MISSING = _Missing()
+
+
+class ConfigChange:
+    """
+    Change of a value of the configuration
+
+    Attributes:
+        - path (Tuple): Keys of the value in the configuration, ex: ("controllers", "con1", "analog_outputs", 1, "offset")
+        - old: Value in the old configuration, MISSING if it was added
+        - new: Value in the new configuration, MISSING if it was removed
+    """
+    __slots__ = ("path", "old", "new")
+
+    def __init__(self, path, old, new):
+        self.path = path
+        self.old = old
+        self.new = new
+
+    @property
+    def section(self):
+        return self.path[0]
+
+    @property
+    def name(self):
+        return self.path[1] if len(self.path) > 1 else None
+
+    @property
+    def kind(self):
+        if self.old is MISSING:
+            return "added"
+        if self.new is MISSING:
+            return "removed"
+        return "modified"
+
+    def __repr__(self):
+        return "ConfigChange({}: {!r} -> {!r})".format(".".join(str(key) for key in self.path), self.old, self.new)
+
+
+class RuntimeUpdate:
+    """
+    Update of an open quantum machine: call of machine.<method>(*args)
+
+    Attributes:
+        - method (String): "set_intermediate_frequency" or "set_output_dc_offset_by_element"
+        - args (Tuple): Arguments of the method, ex: ("AOM", 100e6) or ("AOM", "single", 0.1)
+    """
+    __slots__ = ("method", "args")
+
+    def __init__(self, method, *args):
+        self.method = method
+        self.args = args
+
+    def apply(self, machine):
+        getattr(machine, self.method)(*self.args)
+
+    def __eq__(self, other):
+        return isinstance(other, RuntimeUpdate) and (self.method, self.args) == (other.method, other.args)
+
+    def __hash__(self):
+        return hash((self.method, self.args))
+
+    def __repr__(self):
+        return "{}{!r}".format(self.method, self.args)
+
+
+def _same(old, new):
+    if old is new:
+        return True
+    if isinstance(old, np.ndarray) or isinstance(new, np.ndarray):
+        return np.shape(old) == np.shape(new) and np.array_equal(old, new)
+    return old == new
+
+
+def _diff(changes, path, old, new):
+    """
+    Appends the changes between two values to changes: dictionaries are compared key by key, other values as a whole
+    """
+    if old is new:
+        return
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key, old_value in old.items():
+            new_value = new.get(key, MISSING)
+            if new_value is MISSING:
+                changes.append(ConfigChange(path + (key,), old_value, MISSING))
+            else:
+                _diff(changes, path + (key,), old_value, new_value)
+        for key, new_value in new.items():
+            if key not in old:
+                changes.append(ConfigChange(path + (key,), MISSING, new_value))
+    elif not _same(old, new):
+        changes.append(ConfigChange(path, old, new))
+
+
+def diff_configs(old, new):
+    """
+    Computes the changes between two configurations
+
+    Params:
+        - old (Dict or QuantumMachine): Old configuration
+        - new (Dict or QuantumMachine): New configuration
+    Return:
+        - patch (ConfigPatch): Changes to apply to old to obtain new
+    """
+    if hasattr(old, "config"):
+        old = old.config(cached=True)
+    if hasattr(new, "config"):
+        new = new.config(cached=True)
+    changes = []
+    if old.get('version') != new.get('version'):
+        changes.append(ConfigChange(('version',), old.get('version', MISSING), new.get('version', MISSING)))
+    for section in _SECTIONS:
+        _diff(changes, (section,), old.get(section) or {}, new.get(section) or {})
+    return ConfigPatch(changes, new)
+
+
+class ConfigPatch:
+    """
+    Changes between two configurations (see diff_configs)
+
+    Attributes:
+        - changes (List[ConfigChange]): Changed values, grouped by section
+        - config (Dict): New configuration, used to find the elements affected by the changes
+
+    Methods:
+        - components: Returns the names of the modified components of a section
+        - runtime_updates: Returns the updates of an open machine equivalent to the patch, or None
+        - apply: Returns the configuration obtained by applying the patch to a configuration
+    """
+    def __init__(self, changes, config):
+        self.changes = changes
+        self.config = config
+
+    def __len__(self):
+        return len(self.changes)
+
+    def __iter__(self):
+        return iter(self.changes)
+
+    def __repr__(self):
+        return "ConfigPatch({!r})".format(self.changes)
+
+    def components(self, section):
+        """
+        Param:
+            - section (String): Section of the configuration, ex: "waveforms", "pulses", "oscillators"
+        Return:
+            - names (List[String]): Names of the added, removed or modified components of the section
+        """
+        names = []
+        for change in self.changes:
+            if change.section == section and change.name is not None and change.name not in names:
+                names.append(change.name)
+        return names
+
+    @property
+    def requires_reopen(self):
+        return self.runtime_updates() is None
+
+    def runtime_updates(self):
+        """
+        Maps the changes to the updates of an open machine: intermediate frequencies of the oscillators and elements,
+        and DC offsets of the analog outputs used by the elements.
+
+        Return:
+            - updates (List[RuntimeUpdate]): Updates to apply, None if a change cannot be applied to an open machine
+        """
+        elements = self.config.get('elements') or {}
+        updates = []
+        for change in self.changes:
+            if change.kind != "modified":
+                return None
+            path = change.path
+            if path[0] == 'oscillators' and path[2:] == ("intermediate_frequency",):
+                users = [name for name, element in elements.items() if element.get("oscillator") == path[1]]
+                updates.extend(RuntimeUpdate("set_intermediate_frequency", name, change.new) for name in users)
+            elif path[0] == 'elements' and path[2:] == ("intermediate_frequency",):
+                updates.append(RuntimeUpdate("set_intermediate_frequency", path[1], change.new))
+            elif path[0] == 'controllers' and path[2:3] == ("analog_outputs",) and path[4:] == ("offset",):
+                inputs = _element_inputs(elements, (path[1], path[3]))
+                if not inputs:
+                    # Offset of a port used by no element: cannot be set by element
+                    return None
+                updates.extend(RuntimeUpdate("set_output_dc_offset_by_element", name, key, change.new)
+                               for name, key in inputs)
+            else:
+                return None
+        return updates
+
+    def apply(self, config):
+        """
+        Applies the patch to a configuration, copying only the dictionaries on the paths of the changes
+
+        Param:
+            - config (Dict): Old configuration
+        Return:
+            - config (Dict): New configuration, sharing the unmodified dictionaries with the old one
+        """
+        config = dict(config)
+        copied = set()
+        for change in self.changes:
+            parent = config
+            for depth, key in enumerate(change.path[:-1], 1):
+                if change.path[:depth] not in copied:
+                    parent[key] = dict(parent.get(key) or {})
+                    copied.add(change.path[:depth])
+                parent = parent[key]
+            if change.new is MISSING:
+                del parent[change.path[-1]]
+            else:
+                parent[change.path[-1]] = change.new
+        return config
+
+
+def _element_inputs(elements, port):
+    """
+    Returns the (element, input) couples driven by an analog output port, input being "single", "I" or "Q"
+    """
+    inputs = []
+    for name, element in elements.items():
+        single_input = element.get("singleInput")
+        if single_input is not None and tuple(single_input.get("port", ())) == port:
+            inputs.append((name, "single"))
+        for key in ("I", "Q"):
+            mix_input = (element.get("mixInputs") or {}).get(key)
+            if mix_input is not None and tuple(mix_input) == port:
+                inputs.append((name, key))
+    return inputs
+
+
+def retune(manager, machine, patch, config):
+    """
+    Updates an open machine to a new configuration with the cheapest path: the runtime updates of the patch if the
+    changes allow it, else a new machine is opened with the configuration.
+
+    Params:
+        - manager: Manager having opened the machine (QuantumMachinesManager or SimulatedQuantumMachinesManager)
+        - machine: Open quantum machine, with the old configuration
+        - patch (ConfigPatch): Changes between the old configuration and config
+        - config (Dict): New configuration
+    Return:
+        - machine: Updated machine, or new machine
+    """
+    updates = patch.runtime_updates()
+    if updates is None:
+        return manager.open_qm(config)
+    for update in updates:
+        update.apply(machine)
+    return machine
@@ -0,0 +1,224 @@
+"""
+Overflow and precision check of the demodulation of the measurements (integration.full).
+For each measurement pulse of an element with outputs, the OPX computes
+    result = 2**-12 * sum_n x[n] (w_cos[n] cos(w t_n) + w_sin[n] sin(w t_n))
+where the ADC samples x[n] are scaled to [-0.5, 0.5) after the gain of the analog input (gain_db), and the weights are
+stored with a resolution of 2**-15. To be valid:
+    - each product x[n] w[n] must be in [-2, 2]
+    - the sum must be smaller than 2**16
+    - the result must fit in a QUA fixed, in [-8, 8)
+The worst case is a full-scale signal in phase with the weights: |x[n]| = 0.5 (or the known amplitude of the signal
+times the gain), and |w_cos cos + w_sin sin| <= sqrt(w_cos**2 + w_sin**2).
+
+The bounds are computed with numpy on the segments of the weights (not on the samples), and memoized: checking a
+configuration costs a few microseconds per measurement (check_demodulation), or per integration weight for the
+overflows of full-scale signals (demodulation_errors, run by validation.validate_config).
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from validation import MAX_GAIN_DB, MIN_GAIN_DB, OUTPUT_RANGE, WEIGHT_RESOLUTION
+
+MAX_PRODUCT = 2.
+MAX_SUM = 2.**16
+RESULT_FACTOR = 2.**-12
+# Range and resolution of a QUA fixed (4.28)
+MAX_RESULT = 8.
+RESULT_RESOLUTION = 2.**-28
+
+
+class WeightBounds:
+    """
+    Worst-case quantities of an integration weight, for a full-scale signal of amplitude 1
+
+    Attributes:
+        - max_weight (Float): Maximal amplitude of the weights
+        - total (Float): Sum of the amplitudes of the weights over the pulse
+        - quantization (Float): Sum of the amplitudes of the rounding errors of the weights over the pulse
+        - duration (Int): Duration of the weights in ns
+    """
+    def __init__(self, segments_cosine, segments_sine):
+        boundaries, cosine, sine = _merge(segments_cosine, segments_sine)
+        durations = np.diff(boundaries)
+        amplitudes = np.hypot(cosine, sine)
+        rounded = np.hypot(_round(cosine), _round(sine))
+        errors = np.hypot(cosine - _round(cosine), sine - _round(sine))
+        self.max_weight = float(np.maximum(amplitudes, rounded).max(initial=0.))
+        self.total = float(np.dot(np.maximum(amplitudes, rounded), durations))
+        self.quantization = float(np.dot(errors, durations))
+        self.duration = int(boundaries[-1]) if boundaries.size else 0
+
+
+@lru_cache(maxsize=256)
+def weight_bounds(segments_cosine, segments_sine):
+    """
+    Returns the WeightBounds of the segments (tuples of (weight, duration)), memoized: the variants of a configuration
+    mostly share the same integration weights
+    """
+    return WeightBounds(segments_cosine, segments_sine)
+
+
+def _segments_key(segments):
+    return tuple((float(weight), int(duration)) for weight, duration in segments)
+
+
+def _round(weights):
+    return np.round(weights / WEIGHT_RESOLUTION) * WEIGHT_RESOLUTION
+
+
+def _merge(segments_cosine, segments_sine):
+    """
+    Returns the weights of cosine and sine on the union of the boundaries of their segments
+
+    Return:
+        - boundaries (Array): Times in ns, from 0
+        - cosine, sine (Array): Weights between two consecutive boundaries
+    """
+    segments = [np.asarray(segments, dtype=np.float64).reshape(-1, 2) for segments in (segments_cosine, segments_sine)]
+    ends = [np.cumsum(segments[:, 1]) for segments in segments]
+    boundaries = np.union1d(np.concatenate(ends), [0.])
+    starts = boundaries[:-1]
+    weights = []
+    for segment, end in zip(segments, ends):
+        index = np.searchsorted(end, starts, side="right")
+        inside = index < end.size
+        weights.append(np.where(inside, segment[np.minimum(index, end.size - 1), 0], 0.) if end.size
+                       else np.zeros(starts.size))
+    return boundaries, weights[0], weights[1]
+
+
+def suggested_scale(bounds, max_sample=OUTPUT_RANGE, margin=0.9):
+    """
+    Returns the largest factor of the weights keeping the demodulation in the ranges of the OPX with the margin
+
+    Params:
+        - bounds (WeightBounds): Bounds of the weights
+        - max_sample (Float): Worst-case amplitude of the scaled ADC samples, default to a full-scale signal
+        - margin (Float): Part of the ranges used, default to 0.9
+    """
+    max_product = max_sample * bounds.max_weight
+    max_sum = max_sample * bounds.total
+    max_result = RESULT_FACTOR * max_sum
+    limits = [margin * MAX_PRODUCT / max_product if max_product > 0 else np.inf,
+              margin * MAX_SUM / max_sum if max_sum > 0 else np.inf,
+              margin * MAX_RESULT / max_result if max_result > 0 else np.inf]
+    return float(min(limits))
+
+
+class DemodulationCheck:
+    """
+    Check of the demodulation of a measurement
+
+    Attributes:
+        - element (String): Measured element
+        - operation (String): Operation of the element
+        - weights (String): Name of the integration weight
+        - port (Tuple): Analog input (controller, index)
+        - gain_db (Int): Gain of the analog input
+        - max_sample (Float): Worst-case amplitude of the scaled ADC samples
+        - max_product (Float): Worst-case amplitude of a product sample * weight
+        - max_sum (Float): Worst-case amplitude of the sum of the products
+        - max_result (Float): Worst-case amplitude of the result (2**-12 * sum)
+        - quantization_error (Float): Worst-case error of the result due to the rounding of the weights to 2**-15
+        - relative_error (Float): Quantization error relative to max_result (rounding of the weights and resolution
+        of the result)
+        - suggested_scale (Float): Factor of the weights using the largest part of the ranges allowed by margin (see
+        suggested_scale)
+        - suggested_gain_db (Int): Gain making the known signal amplitude use the ADC range, None if unknown
+        - errors (List[String]): Overflows
+    """
+    def __init__(self, element, operation, weights, port, gain_db, bounds, signal_amplitude=None, margin=0.9):
+        self.element = element
+        self.operation = operation
+        self.weights = weights
+        self.port = port
+        self.gain_db = gain_db
+        gain = 10**(gain_db / 20)
+        self.max_sample = OUTPUT_RANGE if signal_amplitude is None else min(OUTPUT_RANGE, signal_amplitude * gain)
+        self.max_product = self.max_sample * bounds.max_weight
+        self.max_sum = self.max_sample * bounds.total
+        self.max_result = RESULT_FACTOR * self.max_sum
+        self.quantization_error = RESULT_FACTOR * self.max_sample * bounds.quantization
+        self.relative_error = ((self.quantization_error + RESULT_RESOLUTION) / self.max_result
+                               if self.max_result > 0 else 0.)
+        self.suggested_scale = suggested_scale(bounds, self.max_sample, margin)
+        self.suggested_gain_db = None
+        if signal_amplitude:
+            gain_db = int(np.floor(20 * np.log10(margin * OUTPUT_RANGE / signal_amplitude)))
+            self.suggested_gain_db = int(np.clip(gain_db, MIN_GAIN_DB, MAX_GAIN_DB))
+        self.errors = []
+        path = "elements.{}.operations.{} ({})".format(element, operation, weights)
+        if self.max_product > MAX_PRODUCT:
+            self.errors.append("{}: products up to {:.4g}, not in [-2, 2]".format(path, self.max_product))
+        if self.max_sum >= MAX_SUM:
+            self.errors.append("{}: sum up to {:.4g}, not smaller than 2**16".format(path, self.max_sum))
+        if self.max_result >= MAX_RESULT:
+            self.errors.append("{}: result up to {:.4g}, not in the range [-8, 8) of a fixed".format(
+                path, self.max_result))
+
+    def __repr__(self):
+        return ("DemodulationCheck({}.{} with {}: result up to {:.3g}, relative error {:.2g}, "
+                "suggested scale x{:.4g}{})").format(self.element, self.operation, self.weights, self.max_result,
+                                                     self.relative_error, self.suggested_scale,
+                                                     ", " + "; ".join(self.errors) if self.errors else "")
+
+
+def check_demodulation(config, signal_amplitude=None, margin=0.9):
+    """
+    Checks the demodulation of all the measurements of a configuration
+
+    Params:
+        - config (Dict or QuantumMachine): Configuration
+        - signal_amplitude (Float or Dict): Maximal amplitude of the signal at the analog inputs in V, before the gain,
+        or Dict mapping the ports (controller, index) to it. Default to None: full-scale signals
+        - margin (Float): Part of the ranges used by the suggested scaling of the weights and gain, default to 0.9
+    Return:
+        - checks (List[DemodulationCheck]): One check per element, measurement operation, weight and output
+    """
+    if hasattr(config, "config"):
+        config = config.config(cached=True)
+    controllers = config.get("controllers") or {}
+    pulses = config.get("pulses") or {}
+    weights = config.get("integration_weights") or {}
+    bounds = {}
+    checks = []
+    for element_name, element in (config.get("elements") or {}).items():
+        outputs = element.get("outputs") or {}
+        for operation, pulse_name in (element.get("operations") or {}).items():
+            pulse = pulses.get(pulse_name) or {}
+            if pulse.get("operation") != "measurement":
+                continue
+            for weight_name in (pulse.get("integration_weights") or {}).values():
+                if weight_name not in weights:
+                    continue
+                if weight_name not in bounds:
+                    weight = weights[weight_name]
+                    bounds[weight_name] = weight_bounds(_segments_key(weight.get("cosine", ())),
+                                                        _segments_key(weight.get("sine", ())))
+                for port in outputs.values():
+                    port = tuple(port)
+                    analog_input = ((controllers.get(port[0]) or {}).get("analog_inputs") or {}).get(port[1]) or {}
+                    amplitude = signal_amplitude.get(port) if isinstance(signal_amplitude, dict) else signal_amplitude
+                    checks.append(DemodulationCheck(element_name, operation, weight_name, port,
+                                                    analog_input.get("gain_db", 0), bounds[weight_name], amplitude,
+                                                    margin))
+    return checks
+
+
+def demodulation_errors(config):
+    """
+    Returns the possible overflows of the demodulations of a configuration, for full-scale signals.
+    The samples are then bounded by the ADC range whatever the gain: the overflows only depend on the integration
+    weights, checked once each, and the measurements are only listed if one of the weights overflows
+    """
+    if hasattr(config, "config"):
+        config = config.config(cached=True)
+    overflowing = set()
+    for name, weight in (config.get("integration_weights") or {}).items():
+        bounds = weight_bounds(_segments_key(weight.get("cosine", ())), _segments_key(weight.get("sine", ())))
+        if DemodulationCheck(None, None, name, None, 0, bounds).errors:
+            overflowing.add(name)
+    if not overflowing:
+        return []
+    return [error for check in check_demodulation(config) if check.weights in overflowing for error in check.errors]
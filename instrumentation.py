@@ -0,0 +1,250 @@
+"""
+Timing of the stages of a run (build_config, import, open_qm, execute, wait_for_all_values, fetch_all, see main.py).
+Each stage is measured by a span, a context manager recording its duration and sizes (config bytes, result
+points...), from which the throughput of the stage is computed. Finished spans are sent to sinks: logging, JSON lines
+file, Prometheus text file.
+
+A disabled Instrumentation returns the same no-op span for every stage: the overhead is one attribute check.
+
+Example:
+    instrumentation = Instrumentation([LoggingSink(), JsonLinesSink("timings.jsonl")])
+    with instrumentation.span("open_qm"):
+        qm = qmm.open_qm(config)
+    with instrumentation.span("fetch_all") as span:
+        a = res_handles.get('a').fetch_all()
+        span.set(points=len(a))
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+
+class Span:
+    """
+    Measure of a stage
+
+    Attributes:
+        - name (String): Name of the stage
+        - parent (String): Name of the enclosing span, None for a top-level span
+        - sizes (Dict): Sizes processed by the stage, ex: {"points": 4000}
+        - start (Float): Start time, as time.time()
+        - duration (Float): Duration in s, None while the span is running
+
+    Methods:
+        - set: Sets sizes of the stage
+        - throughput: Returns the sizes processed per second
+        - record: Returns the span as a Dict
+    """
+    __slots__ = ("name", "parent", "sizes", "start", "duration", "_start", "_instrumentation")
+
+    def __init__(self, name, parent, sizes, instrumentation):
+        self.name = name
+        self.parent = parent
+        self.sizes = sizes
+        self.start = None
+        self.duration = None
+        self._instrumentation = instrumentation
+
+    def set(self, **sizes):
+        self.sizes.update(sizes)
+
+    def throughput(self):
+        if not self.duration:
+            return {}
+        return {name + "_per_s": size / self.duration for name, size in self.sizes.items()
+                if isinstance(size, (int, float))}
+
+    def record(self):
+        record = {"name": self.name, "parent": self.parent, "start": self.start, "duration": self.duration}
+        record.update(self.sizes)
+        record.update(self.throughput())
+        return record
+
+    def __enter__(self):
+        self._instrumentation._stack().append(self.name)
+        self.start = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.duration = time.perf_counter() - self._start
+        self._instrumentation._stack().pop()
+        if exc_type is not None:
+            self.sizes["error"] = exc_type.__name__
+        self._instrumentation._emit(self)
+        return False
+
+
+class _NoOpSpan:
+    """
+    Span of a disabled Instrumentation
+    """
+    __slots__ = ()
+    duration = None
+
+    def set(self, **sizes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NO_OP_SPAN = _NoOpSpan()
+
+
+class Instrumentation:
+    """
+    Factory of spans, sending the finished spans to its sinks
+
+    Attributes:
+        - sinks (List): Objects with a method emit(span), and optionally close()
+        - enabled (Bool): Whether the spans are measured, default to True if there are sinks
+
+    Methods:
+        - span: Returns the context manager measuring a stage
+        - close: Closes the sinks
+    """
+    def __init__(self, sinks=(), enabled=None):
+        self.sinks = list(sinks)
+        self.enabled = bool(self.sinks) if enabled is None else enabled
+        self._local = threading.local()
+
+    @classmethod
+    def from_environment(cls, variable="QM_INSTRUMENTATION"):
+        """
+        Builds the instrumentation described by an environment variable: comma-separated sinks among "log",
+        "jsonl:<path>" and "prometheus:<path>", ex: QM_INSTRUMENTATION=log,jsonl:timings.jsonl.
+        Disabled if the variable is not set.
+        """
+        sinks = []
+        for description in filter(None, os.environ.get(variable, "").split(",")):
+            kind, _, path = description.partition(":")
+            if kind == "log":
+                sinks.append(LoggingSink())
+            elif kind == "jsonl":
+                sinks.append(JsonLinesSink(path))
+            elif kind == "prometheus":
+                sinks.append(PrometheusSink(path))
+            else:
+                raise ValueError("Unknown sink {!r} in {}".format(description, variable))
+        return cls(sinks)
+
+    def span(self, name, **sizes):
+        """
+        Params:
+            - name (String): Name of the stage
+            - sizes: Sizes processed by the stage, ex: points=4000 (can also be set with span.set)
+        Return:
+            - span (Span): Context manager measuring the stage
+        """
+        if not self.enabled:
+            return _NO_OP_SPAN
+        stack = self._stack()
+        return Span(name, stack[-1] if stack else None, sizes, self)
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _emit(self, span):
+        for sink in self.sinks:
+            sink.emit(span)
+
+    def close(self):
+        for sink in self.sinks:
+            if hasattr(sink, "close"):
+                sink.close()
+
+
+class LoggingSink:
+    """
+    Logs a line for each span
+
+    Attributes:
+        - logger (logging.Logger): Logger, default to the logger of this module
+        - level (Int): Level of the messages, default to logging.INFO
+    """
+    def __init__(self, logger=None, level=logging.INFO):
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+        self.level = level
+
+    def emit(self, span):
+        details = "".join(", {}={:.6g}".format(name, value) if isinstance(value, (int, float))
+                          else ", {}={}".format(name, value)
+                          for name, value in list(span.sizes.items()) + list(span.throughput().items()))
+        self.logger.log(self.level, "%s: %.3f ms%s", span.name, span.duration * 1e3, details)
+
+
+class JsonLinesSink:
+    """
+    Appends a JSON line for each span to a file
+
+    Attribute:
+        - path (String): Path of the file
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "a")
+        self._lock = threading.Lock()
+
+    def emit(self, span):
+        line = json.dumps(span.record()) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class PrometheusSink:
+    """
+    Writes the spans in a text file in the Prometheus exposition format (for the textfile collector of the node
+    exporter): count and total duration of each stage, and last sizes and throughputs.
+    The file is replaced atomically after each span.
+
+    Attributes:
+        - path (String): Path of the file
+        - prefix (String): Prefix of the metrics, default to "qm_run"
+    """
+    def __init__(self, path, prefix="qm_run"):
+        self.path = path
+        self.prefix = prefix
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def emit(self, span):
+        with self._lock:
+            stage = self._stages.setdefault(span.name, {"count": 0, "seconds": 0., "last": {}})
+            stage["count"] += 1
+            stage["seconds"] += span.duration
+            stage["last"]["duration_seconds"] = span.duration
+            for name, value in list(span.sizes.items()) + list(span.throughput().items()):
+                if isinstance(value, (int, float)):
+                    stage["last"][name] = value
+            self._write()
+
+    def _write(self):
+        # The samples of a metric are grouped below its TYPE line
+        metrics = {"stage_count": ("counter", []), "stage_seconds": ("counter", [])}
+        for name, stage in self._stages.items():
+            metrics["stage_count"][1].append((name, stage["count"]))
+            metrics["stage_seconds"][1].append((name, stage["seconds"]))
+            for metric, value in stage["last"].items():
+                metrics.setdefault(metric, ("gauge", []))[1].append((name, value))
+        lines = []
+        for metric, (metric_type, samples) in metrics.items():
+            lines.append("# TYPE {}_{} {}".format(self.prefix, metric, metric_type))
+            lines.extend('{}_{}{{stage="{}"}} {!r}'.format(self.prefix, metric, name, float(value))
+                         for name, value in samples)
+        temporary = self.path + ".tmp"
+        with open(temporary, "w") as file:
+            file.write("\n".join(lines) + "\n")
+        os.replace(temporary, self.path)
@@ -1,24 +1,215 @@
-from qm.qua import *
 # QUA Program
 # Curve of the laser beam intensity function of the amplitude of RF signal (in V)
 # Using oscilloscope to measure photodiode signal
 # Analog output ports have voltage range +-0.5V : ramp between 0 and 0.5V
 # AOM has a rise time of 120ns
+# The QM SDK is only imported when a program is built: configuration scripts importing this module stay light.
 
-with program() as intensityVoltageprog:
-
-    a = declare(fixed)  # multiplicative factor of the RF amplitude, between 0 and 2
-    i = declare(fixed)  # intensity measured by the photodiode (actually, a voltage)
-
-    with for_(a, 0.000, a < 2.0 + 0.001/2, a + 0.001):  # 2000 steps
-        play('amp_mod_pulse'*amp(a), 'AOM')  # apply a pulse of voltage 0.25*a
-        # assign(i, aom(i, a*0.25))  # intensity of the laser beam is changed after 120ns
-        wait(120)  # When AOM has risen
-        measure('meas_pulse',  # Measure the intensity of the photodiode
-                'photodiode',
-                None,
-                integration.full("integration",  # Compute the average of the intensity over 10us after the 120ns
-                                 "out1",  # average intensity is obtained from analog_input_1
-                                 i))  # and stored in variable i
-        save(a, 'a')
-        save(i, "i")
+
+def build_intensity_voltage_program():
+    """
+    Builds the QUA program measuring the intensity for 2000 amplitudes of the RF pulse
+
+    Return:
+        - intensityVoltageprog (Program): QUA program saving the streams 'a' and 'i'
+    """
+    from qm.qua import amp, declare, fixed, for_, integration, measure, play, program, save, wait
+
+    with program() as intensityVoltageprog:
+
+        a = declare(fixed)  # multiplicative factor of the RF amplitude, between 0 and 2
+        i = declare(fixed)  # intensity measured by the photodiode (actually, a voltage)
+
+        with for_(a, 0.000, a < 2.0 + 0.001/2, a + 0.001):  # 2000 steps
+            play('amp_mod_pulse'*amp(a), 'AOM')  # apply a pulse of voltage 0.25*a
+            # assign(i, aom(i, a*0.25))  # intensity of the laser beam is changed after 120ns
+            wait(120)  # When AOM has risen
+            measure('meas_pulse',  # Measure the intensity of the photodiode
+                    'photodiode',
+                    None,
+                    integration.full("integration",  # Compute the average of the intensity over 10us after the 120ns
+                                     "out1",  # average intensity is obtained from analog_input_1
+                                     i))  # and stored in variable i
+            save(a, 'a')
+            save(i, "i")
+    return intensityVoltageprog
+
+
+def build_amplitude_list_program(amplitudes, wait_time=120):
+    """
+    Builds a QUA program measuring the intensity for a list of amplitudes of the RF pulse, with the same pulses as
+    intensityVoltageprog (used by the adaptive sweep of adaptive.py)
+
+    Params:
+        - amplitudes (List[Float]): Multiplicative factors of the RF amplitude, between -2 and 2
+        - wait_time (Int): Wait between the start of the RF pulse and the measurement, as in intensityVoltageprog
+    Return:
+        - program (Program): QUA program saving the streams 'a' and 'i'
+    """
+    from qm.qua import amp, declare, fixed, for_each_, integration, measure, play, program, save, wait
+
+    with program() as amplitude_list_prog:
+
+        a = declare(fixed)
+        i = declare(fixed)
+
+        with for_each_(a, [float(amplitude) for amplitude in amplitudes]):
+            play('amp_mod_pulse'*amp(a), 'AOM')
+            wait(wait_time)
+            measure('meas_pulse',
+                    'photodiode',
+                    None,
+                    integration.full("integration", "out1", i))
+            save(a, 'a')
+            save(i, "i")
+    return amplitude_list_prog
+
+
+# Size of a value received by the host, in bytes (results are fetched as float64)
+VALUE_SIZE = 8
+
+
+def transfer_volume(n_steps, n_repeats, averaged, save_amplitudes=True, n_channels=1):
+    """
+    Returns the number of values and bytes received by the host for a sweep
+
+    Params:
+        - n_steps (Int): Number of amplitudes of the sweep
+        - n_repeats (Int): Number of repetitions of the sweep
+        - averaged (Bool): Whether the repetitions are averaged on the hardware
+        - save_amplitudes (Bool): Whether the amplitudes are saved along with the intensities
+        - n_channels (Int): Number of intensity streams, default to 1
+    Return:
+        - n_values (Int): Number of values
+        - n_bytes (Int): Number of bytes
+    """
+    n_streams = n_channels + 1 if save_amplitudes else n_channels
+    n_values = n_streams * n_steps * (1 if averaged else n_repeats)
+    return n_values, n_values * VALUE_SIZE
+
+
+def _sweep_step(n_steps, a_min, a_max):
+    """
+    Returns the step of a sweep of n_steps amplitudes from a_min to a_max (included)
+
+    A sweep of a single amplitude needs a_min == a_max, its step is 1 so that the QUA loop
+    (a < a_max + step/2) runs exactly once.
+    """
+    if n_steps < 1:
+        raise ValueError("n_steps must be at least 1, got {}".format(n_steps))
+    if n_steps == 1:
+        if a_min != a_max:
+            raise ValueError("A sweep from {} to {} needs at least 2 steps".format(a_min, a_max))
+        return 1.
+    if a_max <= a_min:
+        raise ValueError("a_max ({}) must be greater than a_min ({})".format(a_max, a_min))
+    return (a_max - a_min) / (n_steps - 1)
+
+
+class ProgramBuild:
+    """
+    QUA program of a sweep with the description of its results
+
+    Attributes:
+        - program (Program): QUA program
+        - n_steps (Int): Number of amplitudes of the sweep
+        - n_repeats (Int): Number of repetitions of the sweep
+        - a_min, a_max (Float): Range of the amplitude factors
+        - averaged (Bool): Whether the repetitions are averaged on the hardware
+        - n_values (Int): Number of values received by the host
+        - n_bytes (Int): Number of bytes received by the host
+    """
+    def __init__(self, program, n_steps, n_repeats, a_min, a_max, averaged, save_amplitudes=True, n_channels=1):
+        self.program = program
+        self.n_steps = n_steps
+        self.n_repeats = n_repeats
+        self.a_min = a_min
+        self.a_max = a_max
+        self.averaged = averaged
+        self.n_values, self.n_bytes = transfer_volume(n_steps, n_repeats, averaged, save_amplitudes, n_channels)
+
+    def simulation_parameters(self):
+        """
+        Parameters of simulator.simulate_intensity_voltage giving the same results
+        """
+        return {"start": self.a_min,
+                "stop": self.a_max,
+                "step": _sweep_step(self.n_steps, self.a_min, self.a_max),
+                "n_sweeps": self.n_repeats,
+                "average": self.averaged}
+
+    def __repr__(self):
+        return "ProgramBuild({} mode, {} steps x {} repeats: {} values, {:.1f} kB to the host)".format(
+            "averaged" if self.averaged else "raw", self.n_steps, self.n_repeats, self.n_values, self.n_bytes / 1e3)
+
+
+def _build_sweep_program(n_steps, n_repeats, a_min, a_max, wait_time, averaged, save_amplitudes):
+    step = _sweep_step(n_steps, a_min, a_max)
+    from qm.qua import (amp, declare, declare_stream, fixed, for_, integration, measure, play, program, save,
+                        stream_processing, wait)
+
+    with program() as sweep_prog:
+
+        n = declare(int)  # repetition of the sweep
+        a = declare(fixed)
+        i = declare(fixed)
+        a_stream = declare_stream()
+        i_stream = declare_stream()
+
+        with for_(n, 0, n < n_repeats, n + 1):
+            with for_(a, a_min, a < a_max + step/2, a + step):
+                play('amp_mod_pulse'*amp(a), 'AOM')
+                wait(wait_time)
+                measure('meas_pulse',
+                        'photodiode',
+                        None,
+                        integration.full("integration", "out1", i))
+                if save_amplitudes:
+                    save(a, a_stream)
+                save(i, i_stream)
+
+        with stream_processing():
+            if averaged:
+                # Only the average over the repetitions of each amplitude is sent to the host
+                if save_amplitudes:
+                    a_stream.buffer(n_steps).average().save("a")
+                i_stream.buffer(n_steps).average().save("i")
+            else:
+                if save_amplitudes:
+                    a_stream.save_all("a")
+                i_stream.save_all("i")
+    return sweep_prog
+
+
+def build_raw_program(n_steps=2001, n_repeats=1, a_min=0., a_max=2., wait_time=120, save_amplitudes=True):
+    """
+    Builds a sweep saving every measurement, as intensityVoltageprog (streams 'a' and 'i')
+
+    Params:
+        - n_steps (Int): Number of amplitudes, default to 2001 (steps of 0.001)
+        - n_repeats (Int): Number of repetitions of the sweep, default to 1
+        - a_min, a_max (Float): Range of the amplitude factors (included), default to 0 and 2
+        - wait_time (Int): Wait between the start of the RF pulse and the measurement
+        - save_amplitudes (Bool): Whether the amplitudes are saved in the stream 'a', default to True
+    Return:
+        - build (ProgramBuild): Program and expected transfer volume
+    """
+    program = _build_sweep_program(n_steps, n_repeats, a_min, a_max, wait_time, False, save_amplitudes)
+    return ProgramBuild(program, n_steps, n_repeats, a_min, a_max, False, save_amplitudes)
+
+
+def build_averaged_program(n_steps=2001, n_repeats=100, a_min=0., a_max=2., wait_time=120, save_amplitudes=True):
+    """
+    Builds a sweep averaged over n_repeats repetitions with stream processing: only the n_steps averages of the
+    streams 'a' and 'i' are sent to the host. Parameters are the ones of build_raw_program.
+    """
+    program = _build_sweep_program(n_steps, n_repeats, a_min, a_max, wait_time, True, save_amplitudes)
+    return ProgramBuild(program, n_steps, n_repeats, a_min, a_max, True, save_amplitudes)
+
+
+def __getattr__(name):
+    # intensityVoltageprog is built at its first access (from intensityVoltage import intensityVoltageprog)
+    if name == "intensityVoltageprog":
+        globals()[name] = build_intensity_voltage_program()
+        return globals()[name]
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
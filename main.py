@@ -1,14 +1,37 @@
-from qm.QuantumMachinesManager import QuantumMachinesManager
-from config import config as conf
-from intensityVoltage import intensityVoltageprog as iVprog
+import json
+
+from instrumentation import Instrumentation
 
 # Press the green button in the gutter to run the script.
 if __name__ == '__main__':
+    # Timings of the stages, ex: QM_INSTRUMENTATION=log,jsonl:timings.jsonl (disabled by default)
+    instrumentation = Instrumentation.from_environment()
+
+    # The configuration dictionary is built when config.py is imported
+    with instrumentation.span("build_config") as span:
+        from config import config as conf
+        span.set(components=sum(len(section) for section in conf.values() if isinstance(section, dict)))
+        if instrumentation.enabled:
+            # Size of the configuration sent by open_qm, only serialized when the stages are measured
+            span.set(config_bytes=len(json.dumps(conf)))
+
+    # The QM SDK is only imported when the program is executed
+    with instrumentation.span("import"):
+        from qm.QuantumMachinesManager import QuantumMachinesManager
+        from intensityVoltage import intensityVoltageprog as iVprog
+
     print(conf)  # print configuration
     qmm = QuantumMachinesManager()  # creates a manager instance
-    qm = qmm.open_qm(conf)  # opens a quantum machine with the specified configuration
-    my_job = qm.execute(iVprog)  # execute program I(V)
+    # open_qm serializes, uploads and validates the configuration
+    with instrumentation.span("open_qm"):
+        qm = qmm.open_qm(conf)  # opens a quantum machine with the specified configuration
+    with instrumentation.span("execute"):
+        my_job = qm.execute(iVprog)  # execute program I(V)
     res_handles = my_job.result_handles
-    res_handles.wait_for_all_values()
-    a = res_handles.get('a').fetch_all()  # obtain V
-    i = res_handles.get('i').fetch_all()  # obtain I
+    with instrumentation.span("wait_for_all_values"):
+        res_handles.wait_for_all_values()
+    with instrumentation.span("fetch_all") as span:
+        a = res_handles.get('a').fetch_all()  # obtain V
+        i = res_handles.get('i').fetch_all()  # obtain I
+        span.set(points=len(a) + len(i), result_bytes=a.nbytes + i.nbytes)
+    instrumentation.close()
@@ -0,0 +1,225 @@
+"""
+Calibration of N AOM channels in parallel, each AOM being read by its own photo-diode.
+The machine duplicates the AOM and photo-diode elements of update_main.py on N couples of ports (AOM<k> on an analog
+output, photodiode<k> on an analog input), with copies of the pulses, waveform, integration weights and oscillator
+of update_main.py. The program plays the ramps of all the AOMs at the same time: elements are independent in QUA, so the
+N pulses (and the N measurements) of a step start together, and a sweep of N channels lasts as long as a sweep of one.
+
+Results are saved in one stream 'a' of amplitudes, and one stream 'i<k>' of intensities per channel, gathered by
+demultiplex into arrays with one row per channel (the shape expected by analysis.py).
+"""
+import copy
+
+import numpy as np
+
+from quantum_machine import Analog_input, Analog_output, Controller, Element, QuantumMachine
+from intensityVoltage import ProgramBuild, _sweep_step
+
+# Ports of an OPX+
+N_ANALOG_OUTPUTS = 10
+N_ANALOG_INPUTS = 2
+
+
+class Channel:
+    """
+    AOM and photo-diode couple
+
+    Attributes:
+        - index (Int): Index of the channel
+        - aom (String): Name of the AOM element
+        - photodiode (String): Name of the photo-diode element
+        - output (Tuple): Port (controller, index) of the AOM
+        - input (Tuple): Port (controller, index) of the photo-diode
+        - stream (String): Name of the stream of the intensities
+    """
+    def __init__(self, index, output, input):
+        self.index = index
+        self.aom = "AOM{}".format(index)
+        self.photodiode = "photodiode{}".format(index)
+        self.output = output
+        self.input = input
+        self.stream = "i{}".format(index)
+
+    def __repr__(self):
+        return "Channel({}: {} -> {})".format(self.index, self.output, self.input)
+
+
+def controller_name(ctrl_name, number):
+    """
+    Returns the name of the controller number (from 1): ctrl_name formatted with number if it contains a field, else
+    ctrl_name for the first controller and ctrl_name followed by number for the next ones (OPX+, OPX+2, ...)
+    """
+    if "{" in ctrl_name:
+        return ctrl_name.format(number)
+    return ctrl_name if number == 1 else "{}{}".format(ctrl_name, number)
+
+
+def channel_ports(n_channels, n_outputs=N_ANALOG_OUTPUTS, n_inputs=N_ANALOG_INPUTS, ctrl_name=None):
+    """
+    Assigns the ports of the channels: each controller drives as many channels as it has analog inputs (and outputs)
+
+    Params:
+        - n_channels (Int): Number of channels
+        - n_outputs, n_inputs (Int): Number of analog outputs and inputs of a controller, default to an OPX+
+        - ctrl_name (String): Name of the controllers, see controller_name, default to the controller of
+        update_main.py
+    Return:
+        - channels (List[Channel]): Channels with their ports
+    """
+    if ctrl_name is None:
+        import update_main
+        ctrl_name = update_main.ctrl_name
+    per_controller = min(n_outputs, n_inputs)
+    channels = []
+    for k in range(n_channels):
+        controller = controller_name(ctrl_name, k // per_controller + 1)
+        port = k % per_controller + 1
+        channels.append(Channel(k, (controller, port), (controller, port)))
+    return channels
+
+
+def build_multichannel_machine(channels, ctrl_type=None):
+    """
+    Builds the Quantum Machine of the channels, with copies of the pulses, waveforms, integration weights and
+    oscillator of update_main.py: the machine owns its components, modify them through the machine
+    (ex: machine.waveforms[0].sample) rather than through update_main.py
+
+    Params:
+        - channels (List[Channel]): Channels, see channel_ports
+        - ctrl_type (String): Type of the controllers, default to the type of the controller of update_main.py
+    Return:
+        - machine (QuantumMachine): Quantum Machine with the elements AOM<k> and photodiode<k>
+    """
+    import update_main
+
+    if ctrl_type is None:
+        ctrl_type = update_main.ctrl_type
+    outputs = {}
+    inputs = {}
+    for channel in channels:
+        outputs.setdefault(channel.output[0], []).append(channel.output[1])
+        inputs.setdefault(channel.input[0], []).append(channel.input[1])
+    controllers = [Controller(name,
+                              analog_outputs=[Analog_output(index, offset=0., delay=0.)
+                                              for index in sorted(set(outputs.get(name, ())))],
+                              analog_inputs=[Analog_input(index, offset=0., gain_db=0)
+                                             for index in sorted(set(inputs.get(name, ())))],
+                              ctrl_type=ctrl_type)
+                   for name in dict.fromkeys(list(outputs) + list(inputs))]
+    elements = []
+    for channel in channels:
+        elements.append(Element(channel.aom,
+                                {"singleInput": {"port": channel.output},
+                                 "oscillator": "osc",
+                                 "operations": {"amp_mod": "amp_mod_pulse"}}))
+        elements.append(Element(channel.photodiode,
+                                {"outputs": {"out1": channel.input},
+                                 "oscillator": "osc",
+                                 "operations": {"meas": "meas_pulse"}}))
+    return QuantumMachine(version=update_main.version,
+                          controllers=controllers,
+                          elements=elements,
+                          pulses=copy.deepcopy(update_main.pulses),
+                          waveforms=copy.deepcopy(update_main.waveforms),
+                          integration_weights=copy.deepcopy(update_main.integration_weights),
+                          oscillators=copy.deepcopy(update_main.oscillators))
+
+
+class MultiChannelBuild(ProgramBuild):
+    """
+    ProgramBuild of a multi-channel sweep
+
+    Attribute:
+        - channels (List[Channel]): Channels of the program
+    """
+    def __init__(self, program, channels, n_steps, n_repeats, a_min, a_max, averaged):
+        super().__init__(program, n_steps, n_repeats, a_min, a_max, averaged, n_channels=len(channels))
+        self.channels = channels
+
+    @property
+    def streams(self):
+        return [channel.stream for channel in self.channels]
+
+    def simulation_parameters(self):
+        parameters = super().simulation_parameters()
+        parameters["streams"] = self.streams
+        return parameters
+
+
+def build_multichannel_program(channels, n_steps=2001, n_repeats=1, a_min=0., a_max=2., wait_time=120,
+                               averaged=False):
+    """
+    Builds the sweep of intensityVoltageprog on all the channels at the same time
+
+    Params:
+        - channels (List[Channel]): Channels, see channel_ports
+        - n_steps (Int): Number of amplitudes, default to 2001 (steps of 0.001)
+        - n_repeats (Int): Number of repetitions of the sweep, default to 1
+        - a_min, a_max (Float): Range of the amplitude factors (included), default to 0 and 2
+        - wait_time (Int): Wait between the start of the RF pulses and the measurements
+        - averaged (Bool): Whether the repetitions are averaged with stream processing, default to False
+    Return:
+        - build (MultiChannelBuild): Program saving the streams 'a' and 'i<k>'
+    """
+    step = _sweep_step(n_steps, a_min, a_max)
+    from qm.qua import (amp, declare, declare_stream, fixed, for_, integration, measure, play, program, save,
+                        stream_processing, wait)
+
+    photodiodes = [channel.photodiode for channel in channels]
+    with program() as multichannel_prog:
+
+        n = declare(int)
+        a = declare(fixed)
+        i = [declare(fixed) for _ in channels]  # one intensity per channel
+        a_stream = declare_stream()
+        i_streams = [declare_stream() for _ in channels]
+
+        with for_(n, 0, n < n_repeats, n + 1):
+            with for_(a, a_min, a < a_max + step/2, a + step):
+                # Statements on different elements run in parallel: all the AOMs are driven together
+                for channel in channels:
+                    play('amp_mod_pulse'*amp(a), channel.aom)
+                wait(wait_time, *photodiodes)
+                for channel, i_k in zip(channels, i):
+                    measure('meas_pulse',
+                            channel.photodiode,
+                            None,
+                            integration.full("integration", "out1", i_k))
+                save(a, a_stream)
+                for i_k, i_stream in zip(i, i_streams):
+                    save(i_k, i_stream)
+
+        with stream_processing():
+            if averaged:
+                a_stream.buffer(n_steps).average().save("a")
+                for channel, i_stream in zip(channels, i_streams):
+                    i_stream.buffer(n_steps).average().save(channel.stream)
+            else:
+                a_stream.save_all("a")
+                for channel, i_stream in zip(channels, i_streams):
+                    i_stream.save_all(channel.stream)
+    return MultiChannelBuild(multichannel_prog, channels, n_steps, n_repeats, a_min, a_max, averaged)
+
+
+def demultiplex(result_handles, build):
+    """
+    Gathers the streams of a multi-channel program
+
+    Params:
+        - result_handles: Result handles of the job (QM SDK or simulator), or Dict of the fetched streams
+        - build (MultiChannelBuild): Program of the job
+    Return:
+        - a (Array): Amplitude factors, of shape (n_steps,) if averaged or n_repeats is 1, else (n_repeats, n_steps)
+        - i (Array): Intensities, of shape (n_channels,) + shape of a
+    """
+    def fetch(name):
+        if isinstance(result_handles, dict):
+            return np.asarray(result_handles[name], dtype=np.float64)
+        return np.asarray(result_handles.get(name).fetch_all(), dtype=np.float64)
+
+    shape = (build.n_steps,) if build.averaged or build.n_repeats == 1 else (build.n_repeats, build.n_steps)
+    a = fetch("a").reshape(shape)
+    i = np.empty((len(build.channels),) + shape)
+    for k, channel in enumerate(build.channels):
+        i[k] = fetch(channel.stream).reshape(shape)
+    return a, i
@@ -0,0 +1,207 @@
+"""
+Samples of the usual pulse shapes, generated with numpy, and arbitrary Waveforms built from them.
+One sample per ns (sampling rate of the OPX outputs): the length of a shape is the length of its pulse.
+
+The samples are memoized on (shape, parameters, length) in bounded LRU caches: sweeps building the same shapes again
+share the same arrays instead of computing and allocating them again. The arguments are bound to the parameters of
+the shape, defaults included, before the cache lookup: gaussian_samples(40) and gaussian_samples(length=40,
+amplitude=0.25) share the same entry. Cached arrays are read-only, Waveform keeps them without copy (assign a new
+array to Waveform.samples to modify a waveform).
+
+Example:
+    aom_wf = waveform("aom_wf", "ramp", 10120, amplitude=0.25)  # flat pulse with 120 ns cosine rise and fall
+    drag_i, drag_q = drag_waveforms("drag_i", "drag_q", 40, amplitude=0.2, sigma=8, alpha=0.5, anharmonicity=-200e6)
+"""
+import inspect
+from functools import lru_cache, wraps
+
+import numpy as np
+
+from quantum_machine import Waveform
+
+# Rise time of the AOM in ns (see intensityVoltage.py)
+AOM_RISE_TIME = 120
+# Number of parameter sets kept by each cache
+CACHE_SIZE = 128
+
+
+def _read_only(samples):
+    samples.flags.writeable = False
+    return samples
+
+
+def _memoize(function):
+    # LRU cache of function keyed on the tuple of all its parameters, however the arguments are passed
+    signature = inspect.signature(function)
+    cached = lru_cache(maxsize=CACHE_SIZE)(function)
+
+    @wraps(function)
+    def memoized(*args, **kwargs):
+        arguments = signature.bind(*args, **kwargs)
+        arguments.apply_defaults()
+        return cached(*arguments.args)
+
+    memoized.cache_info = cached.cache_info
+    memoized.cache_clear = cached.cache_clear
+    return memoized
+
+
+@_memoize
+def gaussian_samples(length, amplitude=0.25, sigma=None, subtract_edges=False):
+    """
+    Gaussian centered on the pulse
+
+    Params:
+        - length (Int): Number of samples
+        - amplitude (Float): Maximal value in V, default to 0.25
+        - sigma (Float): Standard deviation in ns, default to length / 6
+        - subtract_edges (Bool): Whether the gaussian is shifted and rescaled to start and end at 0, default to False
+        (needs at least 3 samples)
+    """
+    if subtract_edges and length < 3:
+        raise ValueError("A gaussian starting and ending at 0 needs at least 3 samples, got {}".format(length))
+    if sigma is None:
+        sigma = length / 6
+    t = np.arange(length) - (length - 1) / 2
+    samples = np.exp(-t**2 / (2 * sigma**2))
+    if subtract_edges:
+        samples -= samples[0]
+        samples /= samples.max()
+    samples *= amplitude
+    return _read_only(samples)
+
+
+@_memoize
+def blackman_samples(length, amplitude=0.25):
+    """
+    Blackman window
+
+    Params:
+        - length (Int): Number of samples
+        - amplitude (Float): Maximal value in V, default to 0.25
+    """
+    return _read_only(amplitude * np.blackman(length))
+
+
+@_memoize
+def ramp_samples(length, amplitude=0.25, rise=AOM_RISE_TIME, fall=None, shape="cosine"):
+    """
+    Flat pulse with smooth rise and fall: the RF amplitude follows the rise of the AOM instead of a step
+
+    Params:
+        - length (Int): Number of samples, rise and fall included
+        - amplitude (Float): Value of the flat part in V, default to 0.25
+        - rise (Int): Duration of the rise in ns, default to the rise time of the AOM (120 ns)
+        - fall (Int): Duration of the fall in ns, default to rise
+        - shape (String): "cosine" for (1 - cos(pi t / rise)) / 2, "sine" for sin(pi t / (2 rise))
+    """
+    if fall is None:
+        fall = rise
+    if rise + fall > length:
+        raise ValueError("Rise and fall last {} ns, longer than the pulse ({} ns)".format(rise + fall, length))
+    if shape not in ("cosine", "sine"):
+        raise ValueError("""shape must be "cosine" or "sine" """)
+    samples = np.full(length, float(amplitude))
+    samples[:rise] *= _edge(rise, shape)
+    if fall:
+        samples[length - fall:] *= _edge(fall, shape)[::-1]
+    return _read_only(samples)
+
+
+def _edge(n, shape):
+    # Rise from 0 to 1 in n samples
+    if shape == "cosine":
+        return (1 - np.cos(np.pi * np.arange(n) / n)) / 2
+    return np.sin(np.pi / 2 * np.arange(n) / n)
+
+
+@_memoize
+def drag_samples(length, amplitude=0.25, sigma=None, alpha=0., anharmonicity=0., detuning=0.):
+    """
+    DRAG pulse: gaussian in-phase component, and quadrature component proportional to its derivative
+
+    Params:
+        - length (Int): Number of samples
+        - amplitude (Float): Maximal value of the in-phase component in V, default to 0.25
+        - sigma (Float): Standard deviation in ns, default to length / 6
+        - alpha (Float): DRAG coefficient, default to 0
+        - anharmonicity (Float): Anharmonicity of the transition in Hz (the derivative is divided by
+        2 pi (anharmonicity - detuning)), default to 0: the derivative is taken per ns
+        - detuning (Float): Detuning of the pulse in Hz, default to 0, must differ from a non-zero anharmonicity
+    Return:
+        - i (Array): In-phase samples
+        - q (Array): Quadrature samples
+    """
+    if anharmonicity == detuning != 0:
+        raise ValueError("The detuning ({} Hz) is equal to the anharmonicity: the DRAG correction diverges".format(
+            detuning))
+    if sigma is None:
+        sigma = length / 6
+    t = np.arange(length) - (length - 1) / 2
+    i = amplitude * np.exp(-t**2 / (2 * sigma**2))
+    derivative = -t / sigma**2 * i  # per ns
+    if anharmonicity != detuning:
+        derivative = derivative * 1e9 / (2 * np.pi * (anharmonicity - detuning))
+    return _read_only(i), _read_only(alpha * derivative)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _piecewise_linear_samples(length, points):
+    times, values = zip(*points)
+    return _read_only(np.interp(np.arange(length), times, values))
+
+
+def piecewise_linear_samples(length, points):
+    """
+    Linear interpolation between points, constant before the first and after the last point
+
+    Params:
+        - length (Int): Number of samples
+        - points (List[Tuple]): Increasing times in ns and values in V, ex: [(0, 0.), (120, 0.25), (1000, 0.25)]
+    """
+    return _piecewise_linear_samples(length, tuple((float(time), float(value)) for time, value in points))
+
+
+SHAPES = {"gaussian": gaussian_samples,
+          "blackman": blackman_samples,
+          "ramp": ramp_samples,
+          "piecewise_linear": piecewise_linear_samples}
+
+
+def waveform(name, shape, length, **parameters):
+    """
+    Arbitrary waveform of a shape
+
+    Params:
+        - name (String): Name of the waveform
+        - shape (String): "gaussian", "blackman", "ramp" or "piecewise_linear"
+        - length (Int): Number of samples (length of the pulse in ns)
+        - parameters: Parameters of the shape, see <shape>_samples
+    Return:
+        - waveform (Waveform): Arbitrary waveform sharing the cached samples
+    """
+    if shape not in SHAPES:
+        raise ValueError("Unknown shape {!r}, possible shapes: {}".format(shape, ", ".join(SHAPES)))
+    return Waveform(name, wvf_type="arbitrary", samples=SHAPES[shape](length, **parameters))
+
+
+def drag_waveforms(name_i, name_q, length, **parameters):
+    """
+    In-phase and quadrature arbitrary waveforms of a DRAG pulse (for the "I" and "Q" waveforms of a pulse on an element
+    with mixInputs), see drag_samples for the parameters
+    """
+    i, q = drag_samples(length, **parameters)
+    return Waveform(name_i, wvf_type="arbitrary", samples=i), Waveform(name_q, wvf_type="arbitrary", samples=q)
+
+
+def cache_info():
+    """
+    Returns the statistics of the caches, by shape
+    """
+    caches = dict(SHAPES, piecewise_linear=_piecewise_linear_samples, drag=drag_samples)
+    return {shape: function.cache_info() for shape, function in caches.items()}
+
+
+def clear_cache():
+    for function in (gaussian_samples, blackman_samples, ramp_samples, drag_samples, _piecewise_linear_samples):
+        function.cache_clear()
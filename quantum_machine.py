@@ -1,9 +1,19 @@
-def dict_from_list_instances(list_instances):
+import hashlib
+import json
+import struct
+
+import numpy as np
+
+from validation import MAX_WEIGHT, WEIGHT_GRANULARITY, WEIGHT_RESOLUTION, check_config, check_pulse, validate_config
+
+
+def dict_from_list_instances(list_instances, cached=False):
     """
     Merges a list of classes whose get returns a dictionary into a dictionary
 
     Param:
         - list_class (List[Class]): List of classes
+        - cached (Bool): Use the cached dictionaries of the classes (see Component.cached_get), default to False
     Return:
         - output_dict (Dict): Dictionary resulting of the merging of the dictionaries of the classes
     """
@@ -11,11 +21,172 @@ def dict_from_list_instances(list_instances):
         return {}
     output_dict = {}
     for instance in list_instances:
-        output_dict.update(instance.get())
+        if cached:
+            output_dict.update(instance.cached_get())
+        else:
+            output_dict.update(instance.get())
     return output_dict
 
 
-class Analog_input:
+def canonical_config(value):
+    """
+    Returns a canonical form of a configuration dictionary, that can be serialized to JSON.
+    Equivalent configurations have the same canonical form:
+        - dictionaries are sorted by keys (keys of any type)
+        - tuples and lists are identical, numbers are converted to floats (0, 0.0 and -0.0 are identical)
+        - lists and arrays of numbers are replaced by a digest of their float64 values, and their shape
+
+    Param:
+        - value (Dict): Configuration dictionary (or any of its values)
+    Return:
+        - canonical_value: Canonical form, made of lists, strings, floats, booleans and None
+    """
+    if isinstance(value, dict):
+        items = [[canonical_config(key), canonical_config(item)] for key, item in value.items()]
+        return ["dict"] + sorted(items, key=lambda item: json.dumps(item[0]))
+    if isinstance(value, (bool, str)) or value is None:
+        return value
+    if isinstance(value, (int, float, np.number)):
+        return float(value) + 0.
+    if isinstance(value, (list, tuple, np.ndarray, memoryview)):
+        try:
+            array = np.asarray(value, dtype=np.float64)
+        except (TypeError, ValueError):
+            return ["list"] + [canonical_config(item) for item in value]
+        if array.dtype != np.float64 or array.ndim == 0:
+            return ["list"] + [canonical_config(item) for item in value]
+        array = np.ascontiguousarray(array + 0.)
+        return ["array", list(array.shape), hashlib.blake2b(array.tobytes(), digest_size=16).hexdigest()]
+    raise TypeError("Unexpected value in a configuration: {!r}".format(value))
+
+
+def config_hash(config):
+    """
+    Returns a stable hash of a configuration dictionary: the SHA-256 of its canonical form (see canonical_config)
+
+    Param:
+        - config (Dict): Configuration dictionary
+    Return:
+        - hash (String): Hexadecimal digest
+    """
+    canonical = json.dumps(canonical_config(config), separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class Component:
+    """
+    Base class of the components of a Quantum Machine.
+    Components use __slots__ to keep their memory footprint small in configurations with many pulses and ports.
+    Records the modifications of its attributes, and notifies the components containing it (its parents),
+    so that the dictionaries are only rebuilt when needed (see QuantumMachine.config with cached=True).
+    In-place modifications (ex: pulse.waveforms["single"] = "wf") are not detected: call touch afterwards.
+
+    Methods:
+        - touch: Marks the component as modified
+        - cached_get: Returns the same Dict as get, rebuilt only if the component or one of its children was modified
+    """
+    # _parents is a flat tuple (parent_1, attribute_1, parent_2, attribute_2, ...), smaller than a list of pairs
+    __slots__ = ("_dirty", "_cache", "_parents", "_adopted")
+    # Attributes containing lists of components whose dictionaries are included in the dictionary of this component
+    _child_attributes = ()
+    # Attributes of the modification tracking and of the caches, reset instead of copied by copy and pickle: a copy
+    # is not contained in the parents of the original, and rebuilds its dictionaries when needed
+    _tracking_attributes = ("_dirty", "_cache", "_parents", "_adopted")
+
+    def __new__(cls, *args, **kwargs):
+        self = object.__new__(cls)
+        self._init_tracking()
+        return self
+
+    def _init_tracking(self):
+        object.__setattr__(self, "_dirty", True)
+        object.__setattr__(self, "_cache", None)
+        object.__setattr__(self, "_parents", None)
+        object.__setattr__(self, "_adopted", None)
+
+    def __getstate__(self):
+        # Subclasses without __slots__ keep their attributes in __dict__
+        state = dict(getattr(self, "__dict__", {}))
+        for cls in type(self).__mro__:
+            for name in cls.__dict__.get("__slots__", ()):
+                if name not in self._tracking_attributes and hasattr(self, name):
+                    state[name] = getattr(self, name)
+        return state
+
+    def __setstate__(self, state):
+        # Attributes are set without notification: the parents of the copy are not known yet, they register
+        # themselves when their own state is restored
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+        self._init_tracking()
+        for name in self._child_attributes:
+            self._adopt(name)
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name[0] != "_":
+            if name in self._child_attributes:
+                self._adopt(name)
+            self._attribute_modified(name)
+
+    def touch(self):
+        """
+        Marks the component as modified, its dictionary will be rebuilt by the next call to cached_get.
+        Also registers the components added in-place to the lists of children.
+        """
+        for name in self._child_attributes:
+            self._adopt(name)
+        self._attribute_modified(None)
+
+    def cached_get(self):
+        """
+        Returns the dictionary of the component. The same Dict object is returned as long as neither the
+        component nor its children are modified. It must not be modified by the caller.
+        """
+        if self._dirty or self._cache is None:
+            self._cache = self._cached_build()
+            self._dirty = False
+        return self._cache
+
+    def _cached_build(self):
+        return self.get()
+
+    def _attribute_modified(self, name):
+        self._notify()
+
+    def _child_modified(self, child, name):
+        self._notify()
+
+    def _notify(self):
+        self._dirty = True
+        parents = self._parents
+        if parents:
+            for k in range(0, len(parents), 2):
+                parents[k]._child_modified(self, parents[k + 1])
+
+    def _adopt(self, name):
+        """
+        Registers this component as the parent of the components listed in the attribute name
+        """
+        if self._adopted is None:
+            self._adopted = {}
+        for child in self._adopted.get(name, ()):
+            child._remove_parent(self, name)
+        children = getattr(self, name)
+        children = [] if children is None else list(children)
+        for child in children:
+            child._parents = (self, name) if child._parents is None else child._parents + (self, name)
+        self._adopted[name] = children
+
+    def _remove_parent(self, parent, name):
+        parents = self._parents
+        for k in range(0, len(parents), 2):
+            if parents[k] is parent and parents[k + 1] == name:
+                self._parents = parents[:k] + parents[k + 2:]
+                return
+
+
+class Analog_input(Component):
     """
     Define an analog output of a Controller
 
@@ -28,6 +199,8 @@ class Analog_input:
     Method:
         - get: Returns a Dict with one element with key index and value a dict containing offset and delay
     """
+    __slots__ = ("index", "offset", "gain_db", "shareable")
+
     def __init__(self,
                  index,
                  offset=0.0,
@@ -48,7 +221,7 @@ class Analog_input:
                              "gain_db": self.gain_db}}
 
 
-class Digital_input:
+class Digital_input(Component):
     """
     Define an analog output of a Controller
 
@@ -61,6 +234,8 @@ class Digital_input:
     Method:
         - get: Returns a Dict with one element with key index and value a dict containing offset and delay
     """
+    __slots__ = ("index", "threshold", "polarity", "window", "shareable")
+
     def __init__(self,
                  index,
                  threshold=0.0,
@@ -84,7 +259,7 @@ class Digital_input:
                              "window": self.window}}
 
 
-class Analog_output:
+class Analog_output(Component):
     """
     Define an analog output of a Controller
 
@@ -97,6 +272,8 @@ class Analog_output:
     Method:
         - get: Returns a Dict with one element with key index and value a dict containing offset and delay
     """
+    __slots__ = ("index", "offset", "delay", "shareable")
+
     def __init__(self,
                  index,
                  offset=0.,
@@ -117,7 +294,7 @@ class Analog_output:
                              "delay": self.delay}}
 
 
-class Digital_output:
+class Digital_output(Component):
     """
     Define an analog output of a Controller
 
@@ -127,6 +304,8 @@ class Digital_output:
     Method:
         - get: Returns a Dict with one element with key index and value a dict containing offset and delay
     """
+    __slots__ = ("index", "shareable")
+
     def __init__(self,
                  index,
                  shareable=True):
@@ -142,7 +321,7 @@ class Digital_output:
         return {self.index: {}}
 
 
-class Controller:
+class Controller(Component):
     """
     Defines a controller such as https://www.quantum-machines.co/opx+/
 
@@ -154,6 +333,9 @@ class Controller:
         - analog_inputs (List): List of Analog_input objects, default to None
         - digital_inputs (List): List of Digital_input objects, default to None
     """
+    __slots__ = ("name", "ctrl_type", "analog_outputs", "digital_outputs", "analog_inputs", "digital_inputs")
+    _child_attributes = ("analog_outputs", "digital_outputs", "analog_inputs", "digital_inputs")
+
     def __init__(self,
                  name,
                  analog_outputs=None,
@@ -168,15 +350,18 @@ class Controller:
         self.analog_inputs = analog_inputs
         self.digital_inputs = digital_inputs
 
-    def get(self):
+    def get(self, cached=False):
         return {self.name: {"type": self.ctrl_type,
-                            "analog_outputs": dict_from_list_instances(self.analog_outputs),
-                            "digital_outputs": dict_from_list_instances(self.digital_outputs),
-                            "analog_inputs": dict_from_list_instances(self.analog_inputs),
-                            "digital_inputs": dict_from_list_instances(self.digital_inputs)}}
+                            "analog_outputs": dict_from_list_instances(self.analog_outputs, cached),
+                            "digital_outputs": dict_from_list_instances(self.digital_outputs, cached),
+                            "analog_inputs": dict_from_list_instances(self.analog_inputs, cached),
+                            "digital_inputs": dict_from_list_instances(self.digital_inputs, cached)}}
+
+    def _cached_build(self):
+        return self.get(cached=True)
 
 
-class Waveform:
+class Waveform(Component):
     """
     Define the waveforms to be used in the pulses
     Either a constant value waveform or an arbitrary one
@@ -185,8 +370,20 @@ class Waveform:
           - name (String): Name of the waveform
           - wvf_type (String): Either "constant" or "arbitrary"
           - sample (Float): Float if type is constant
-          - samples (List): List of samples if type is arbitrary
+          - samples (Array): Samples if type is arbitrary. Any sequence of floats is accepted, and stored as a
+          contiguous numpy array of float64 (no copy if it already is one). A single number is kept as a float.
+          In-place modifications of the array must be followed by a call to touch.
+
+    Methods:
+          - get: Returns a Dict with one element with key name. For an arbitrary waveform, samples are given as a list,
+          built at the first call and kept until samples is assigned or touch is called
+          - get_samples_list: Returns the samples as a list of floats (the kept list, not to be modified)
+          - get_buffer: Returns a memoryview on the samples, without creating a Python object per sample
     """
+    __slots__ = ("name", "wvf_type", "sample", "_samples", "_samples_list")
+    # The list of the samples is rebuilt when needed, copies do not duplicate it
+    _tracking_attributes = Component._tracking_attributes + ("_samples_list",)
+
     def __init__(self,
                  name,
                  wvf_type="constant",
@@ -197,21 +394,86 @@ class Waveform:
         self.sample = sample
         self.samples = samples
 
+    @property
+    def samples(self):
+        return self._samples
+
+    @samples.setter
+    def samples(self, samples):
+        if isinstance(samples, (int, float)):
+            # Constant waveforms: no array is allocated for the unused samples
+            self._samples = float(samples)
+        else:
+            self._samples = np.ascontiguousarray(samples, dtype=np.float64)
+        self._samples_list = None
+
+    def _init_tracking(self):
+        Component._init_tracking(self)
+        object.__setattr__(self, "_samples_list", None)
+
+    def _attribute_modified(self, name):
+        if name is None:
+            # samples may have been modified in-place
+            self._samples_list = None
+        Component._attribute_modified(self, name)
+
+    def _samples_array(self):
+        if isinstance(self._samples, float):
+            return np.atleast_1d(self._samples)
+        return self._samples
+
+    def get_samples_list(self):
+        """
+        Returns the samples as a list of floats, as expected in the configuration dictionary.
+        The list is built the first time it is needed and kept, so that building the configuration again does not
+        convert the samples again. It takes about 4 times the memory of the array: it is released when samples is
+        assigned or touch is called, and waveform_buffers/get_buffer give the samples without it.
+        """
+        if self._samples_list is None:
+            self._samples_list = self._samples_array().tolist()
+        return self._samples_list
+
+    def get_buffer(self):
+        """
+        Returns a read-only memoryview on the samples (float64, native byte order)
+        """
+        return memoryview(self._samples_array()).toreadonly()
+
     def get(self):
         if self.wvf_type == "constant":
             return {self.name: {"type": "constant",
                                 "sample": self.sample}}
         elif self.wvf_type == "arbitrary":
             return {self.name: {"type": "arbitrary",
-                                "samples": self.samples}}
+                                "samples": self.get_samples_list()}}
         else:
             raise ValueError("""Waveform type must be "constant" or "arbitrary" """)
 
+    def content_key(self):
+        """
+        Returns a hashable key identifying the content of the waveform (not its name).
+        Arbitrary waveforms are identified by a digest of their samples.
+        """
+        if self.wvf_type == "arbitrary":
+            samples = self._samples_array()
+            return ("arbitrary", samples.size, hashlib.blake2b(samples.tobytes(), digest_size=16).digest())
+        return (self.wvf_type, float(self.sample))
+
+    def same_content(self, other):
+        """
+        Checks that two waveforms with the same content_key have the same samples
+        """
+        if self.wvf_type == "arbitrary":
+            return np.array_equal(self._samples_array(), other._samples_array())
+        return True
+
 
-class DigitalWaveform:
+class DigitalWaveform(Component):
     """
     Initialize a digital waveform
     """
+    __slots__ = ("name", "digital_waveform")
+
     def __init__(self,
                  name,
                  digital_waveform):
@@ -222,7 +484,33 @@ class DigitalWaveform:
         return {self.name: self.digital_waveform}
 
 
-class IntegrationWeight:
+def compress_weights(samples, granularity=WEIGHT_GRANULARITY):
+    """
+    Compresses per-sample integration weights into the shortest list of (weight, duration) segments.
+    The weights are averaged on blocks of granularity ns (the weights of the OPX are constant on 4 ns), clipped to
+    [-2048, 2048] and rounded to multiples of 2**-15, then consecutive equal blocks are merged. The last block is
+    completed with zeros if the number of samples is not a multiple of granularity.
+
+    Params:
+        - samples (Array): Weight of each ns
+        - granularity (Int): Duration of a block in ns, default to 4
+    Return:
+        - segments (List[Tuple]): List of (weight, duration), durations being multiples of granularity
+    """
+    samples = np.asarray(samples, dtype=np.float64).ravel()
+    if samples.size == 0:
+        return []
+    padding = -samples.size % granularity
+    if padding:
+        samples = np.concatenate((samples, np.zeros(padding)))
+    blocks = samples.reshape(-1, granularity).mean(axis=1)
+    blocks = np.round(np.clip(blocks, -MAX_WEIGHT, MAX_WEIGHT) / WEIGHT_RESOLUTION) * WEIGHT_RESOLUTION
+    starts = np.concatenate(([0], np.flatnonzero(blocks[1:] != blocks[:-1]) + 1))
+    durations = np.diff(np.append(starts, blocks.size)) * granularity
+    return list(zip(blocks[starts].tolist(), durations.tolist()))
+
+
+class IntegrationWeight(Component):
     """
     integration weights are used in the demodulation process as part of the measurement. Defined as a list of tuples
     First element: value of integration weight, Second element is duration (in ns, must be divisible by 4)
@@ -232,25 +520,181 @@ class IntegrationWeight:
           - sin_duration (Int): Integration duration for sine in ns. Must be multiple of 4
           - cos_weight (Double): Integration weight for sine, range [-2048; 2048] in steps of 2**(-15)
           - cos_duration (Int): Integration duration for sine in ns. Must be multiple of 4
+          - sine (List or Array): Time-resolved weights for sine, replacing sin_weight and sin_duration if given:
+          list of (weight, duration) segments, or array of the weight of each ns (compressed with compress_weights)
+          - cosine (List or Array): Time-resolved weights for cosine, as sine
+
+    Methods:
+          - from_segments: Builds an integration weight from the segments of a configuration
+          - from_samples: Builds an integration weight from arrays of per-ns weights
+          - window: Average over a window of the pulse (ex: skipping the rise of the AOM)
+          - matched_filter: Weighted average following a recorded trace of the signal
     """
+    __slots__ = ("name", "sin_weight", "cos_weight", "sin_duration", "cos_duration", "_sine", "_cosine")
+
     def __init__(self,
                  name,
                  sin_weight=0.,
                  sin_duration=0,
                  cos_weight=0.,
-                 cos_duration=0):
+                 cos_duration=0,
+                 sine=None,
+                 cosine=None):
         self.name = name
         self.sin_weight = sin_weight
         self.cos_weight = cos_weight
         self.sin_duration = sin_duration
         self.cos_duration = cos_duration
+        self.sine = sine
+        self.cosine = cosine
+
+    @staticmethod
+    def _segments(weights):
+        if weights is None:
+            return None
+        if isinstance(weights, np.ndarray) or (len(weights) and isinstance(weights[0], (int, float, np.generic))):
+            if len(weights) % WEIGHT_GRANULARITY:
+                raise ValueError("Per-ns weights must have a length multiple of {} ns (got {})".format(
+                    WEIGHT_GRANULARITY, len(weights)))
+            return compress_weights(weights)
+        return [(weight, duration) for weight, duration in weights]
+
+    @property
+    def sine(self):
+        return self._sine
+
+    @sine.setter
+    def sine(self, sine):
+        self._sine = self._segments(sine)
+
+    @property
+    def cosine(self):
+        return self._cosine
+
+    @cosine.setter
+    def cosine(self, cosine):
+        self._cosine = self._segments(cosine)
 
     def get(self):
-        return {self.name: {"sine": [(self.sin_weight, self.sin_duration)],
-                            "cosine": [(self.cos_weight, self.cos_duration)]}}
+        return {self.name: {"sine": self._sine if self._sine is not None else [(self.sin_weight, self.sin_duration)],
+                            "cosine": self._cosine if self._cosine is not None else [(self.cos_weight,
+                                                                                      self.cos_duration)]}}
+
+    @classmethod
+    def from_segments(cls, name, sine, cosine):
+        """
+        Builds an integration weight from the lists of (weight, duration) of the configuration
+
+        Params:
+            - name (String): Name of the integration weight
+            - sine (List): List of tuples (weight, duration) for the sine
+            - cosine (List): List of tuples (weight, duration) for the cosine
+        """
+        if len(sine) == 1 and len(cosine) == 1:
+            (sin_weight, sin_duration), = sine
+            (cos_weight, cos_duration), = cosine
+            return cls(name,
+                       sin_weight=sin_weight,
+                       sin_duration=sin_duration,
+                       cos_weight=cos_weight,
+                       cos_duration=cos_duration)
+        return cls(name, sine=list(sine), cosine=list(cosine))
+
+    @classmethod
+    def from_samples(cls, name, cosine=None, sine=None):
+        """
+        Builds an integration weight from the weights of each ns, compressed into segments (see compress_weights):
+        the weights are rounded to multiples of 2**-15, weights smaller than about 1e-5 are lost
+
+        Params:
+            - name (String): Name of the integration weight
+            - cosine (Array): Weights for cosine, default to zeros
+            - sine (Array): Weights for sine, default to zeros. Both must have the same length, multiple of 4 ns
+        """
+        if cosine is None and sine is None:
+            raise ValueError("Integration weight {!r}: cosine or sine weights must be given".format(name))
+        length = len(cosine) if cosine is not None else len(sine)
+        if length % WEIGHT_GRANULARITY or (cosine is not None and sine is not None and len(sine) != length):
+            lengths = [len(weights) for weights in (cosine, sine) if weights is not None]
+            raise ValueError("Cosine and sine weights must have the same length, multiple of {} ns (got {})".format(
+                WEIGHT_GRANULARITY, " and ".join(map(str, lengths))))
+        cosine = np.zeros(length) if cosine is None else cosine
+        sine = np.zeros(length) if sine is None else sine
+        return cls(name, sine=compress_weights(sine), cosine=compress_weights(cosine))
+
+    @staticmethod
+    def _full_scale(weights, margin):
+        """
+        Returns the largest factor of the weights keeping the demodulation of a full-scale signal in the ranges of the
+        OPX with the margin (see demodulation.suggested_scale)
+        """
+        from demodulation import WeightBounds, suggested_scale
+
+        return suggested_scale(WeightBounds(np.column_stack((weights, np.ones(len(weights)))), ()), margin=margin)
+
+    @classmethod
+    def window(cls, name, length, start=0, stop=None, scale=None, margin=0.9):
+        """
+        Cosine weights averaging the signal between start and stop (weight scale/(stop-start)), zero elsewhere.
+        The weights are quantized as in from_samples: scale makes the weight much larger than the resolution 2**-15
+        (1/10000 alone would be rounded by 8.5%)
+
+        Params:
+            - name (String): Name of the integration weight
+            - length (Int): Length of the measurement pulse in ns, multiple of 4
+            - start (Int): Start of the window in ns (ex: 120 to skip the rise of the AOM), multiple of 4
+            - stop (Int): End of the window in ns, multiple of 4, default to length
+            - scale (Float): Factor of the average, default to the largest one allowed by margin for a full-scale
+            signal (see demodulation.py). The scale used is the sum of the weights, sum(weight * duration)
+            - margin (Float): Part of the ranges of the demodulation used by the default scale, default to 0.9
+        """
+        if stop is None:
+            stop = length
+        if not 0 <= start < stop <= length or start % WEIGHT_GRANULARITY or stop % WEIGHT_GRANULARITY:
+            raise ValueError("Window [{}, {}] must be in [0, {}] with bounds multiple of 4".format(start, stop, length))
+        cosine = np.zeros(length)
+        cosine[start:stop] = 1 / (stop - start)
+        if scale is None:
+            scale = cls._full_scale(cosine, margin)
+        return cls.from_samples(name, cosine=scale * cosine)
+
+    @classmethod
+    def matched_filter(cls, name, trace, scale=None, margin=0.9):
+        """
+        Cosine weights proportional to a recorded trace of the signal, scale * trace / max(|trace|): the result is
+        scale times the correlation of the signal with its expected shape, normalized to a peak of 1. The trace may
+        have a zero mean (ex: a demodulated signal changing sign).
+        The weights are quantized as in from_samples: a small scale only keeps a few levels of the shape
+
+        Params:
+            - name (String): Name of the integration weight
+            - trace (Array): Signal recorded during the measurement pulse, one value per ns, length multiple of 4
+            - scale (Float): Factor of the weights, default to the largest one allowed by margin for a full-scale
+            signal (see demodulation.py)
+            - margin (Float): Part of the ranges of the demodulation used by the default scale, default to 0.9
+        """
+        trace = np.asarray(trace, dtype=np.float64)
+        peak = np.abs(trace).max() if trace.size else 0.
+        if not peak > 0:
+            raise ValueError("Integration weight {!r}: the trace is zero, it has no shape to match".format(name))
+        weights = trace / peak
+        if scale is None:
+            scale = cls._full_scale(weights, margin)
+        return cls.from_samples(name, cosine=scale * weights)
+
+    def content_key(self):
+        """
+        Returns a hashable key identifying the content of the integration weight (not its name)
+        """
+        weights = self.get()[self.name]
+        return (tuple((float(weight), int(duration)) for weight, duration in weights["sine"]),
+                tuple((float(weight), int(duration)) for weight, duration in weights["cosine"]))
+
+    def same_content(self, other):
+        return True
 
 
-class Pulse:
+class Pulse(Component):
     """
     Defines a Pulse
 
@@ -262,6 +706,8 @@ class Pulse:
           - integration_heights (Dict): For a measurement pulse
           - digital_marker (String): [Not Implemented] Name of the digital waveform to be played with the pulse
     """
+    __slots__ = ("name", "operation", "length", "waveforms", "digital_marker", "integration_weights")
+
     def __init__(self,
                  name,
                  waveforms=None,
@@ -269,10 +715,7 @@ class Pulse:
                  length=16,
                  integration_weights=None,
                  digital_marker=""):
-        if operation != "control" and operation != "measurement":
-            raise ValueError("""Possible values for operation: "control" or "measurement" """)
-        if length < 16 or length > 2**31-1:
-            raise ValueError("""pulse length must be between 16 and 2^31-1 ns""")
+        check_pulse(operation, length)
         self.name = name
         self.operation = operation
         self.length = length
@@ -284,10 +727,7 @@ class Pulse:
         self.integration_weights = integration_weights
 
     def get(self):
-        if self.operation != "control" and self.operation != "measurement":
-            raise ValueError("""Possible values for operation: "control" or "measurement" """)
-        if self.length < 16 or self.length > 2**31-1:
-            raise ValueError("""Pulse length must be between 16 and 2^31-1 ns""")
+        check_pulse(self.operation, self.length)
         if self.operation == "control":
             return {self.name: {"operation": self.operation,
                                 "length": self.length,
@@ -299,7 +739,7 @@ class Pulse:
                                 "integration_weights": self.integration_weights}}
 
 
-class Mixer:
+class Mixer(Component):
     """
     Configures the IQ mixer instance used by elements.
     List of Dict for various couples of intermediate and LO frequencies
@@ -309,12 +749,14 @@ class Mixer:
           - lo_frequency (Int): LO frequency
           - correction (List): 4 elements list specifying the correction matrix. Each element is a double in [-2,2]
     """
+    __slots__ = ("name", "intermediate_frequency", "lo_frequency", "correction")
+
     def __init__(self,
                  name,
                  intermediate_frequency,
                  lo_frequency=0,
                  correction=None):
-        self.name = name,
+        self.name = name
         self.intermediate_frequency = intermediate_frequency
         self.lo_frequency = lo_frequency
         if correction is None:
@@ -328,7 +770,9 @@ class Mixer:
                              "correction": self.correction}]}
 
 
-class Oscillator:
+class Oscillator(Component):
+    __slots__ = ("name", "lo_frequency", "mixer", "intermediate_frequency")
+
     def __init__(self,
                  name,
                  intermediate_frequency,
@@ -341,9 +785,9 @@ class Oscillator:
 
     def get(self):
         output_dict = {self.name: {"intermediate_frequency": self.intermediate_frequency}}
-        if self.mixer is None:
+        if self.mixer is not None:
             output_dict[self.name]["mixer"] = self.mixer
-        if self.lo_frequency==0:
+        if self.lo_frequency != 0:
             output_dict[self.name]["lo_frequency"] = self.lo_frequency
         return output_dict
 
@@ -353,7 +797,9 @@ class Oscillator:
 #                            "mixer": self.mixer}}
 
 
-class Element:
+class Element(Component):
+    __slots__ = ("name", "element")
+
     def __init__(self,
                  name,
                  element):
@@ -363,7 +809,9 @@ class Element:
     def get(self):
         return {self.name: self.element}
 
-class Oscillator2:
+class Oscillator2(Component):
+    __slots__ = ("name", "intermediate_frequency")
+
     def __init__(self,
                  name,
                  intermediate_frequency):
@@ -374,7 +822,132 @@ class Oscillator2:
         return {self.name: {"intermediate_frequency": self.intermediate_frequency}}
 
 
-class QuantumMachine:
+def _deduplicate_instances(list_instances):
+    """
+    Finds the instances having the same content, using an index of their content_key
+
+    Param:
+        - list_instances (List): List of Waveform or IntegrationWeight
+    Return:
+        - merged (Dict): Map the names of the duplicated instances to the name of the first identical instance
+        - kept (List): Instances without duplicates
+    """
+    merged = {}
+    kept = []
+    index = {}
+    for instance in list_instances if list_instances is not None else []:
+        key = instance.content_key()
+        identical = index.get(key)
+        if identical is not None and identical.same_content(instance):
+            if instance.name != identical.name:
+                merged[instance.name] = identical.name
+        else:
+            index[key] = instance
+            kept.append(instance)
+    return merged, kept
+
+
+# Sections of the configuration built from a list of components
+_SECTIONS = ('controllers',
+             'elements',
+             'pulses',
+             'waveforms',
+             'digital_waveforms',
+             'integration_weights',
+             'mixers',
+             'oscillators')
+
+
+# Binary encoding of the configurations (QuantumMachine.to_bytes):
+#     - magic bytes and uint32 length of the header
+#     - header: JSON with the version and the position of each section and buffer in the data
+#     - sections: compact JSON of each section. Dictionaries with non-string keys and tuples are tagged to be restored.
+#     - buffers: samples of the arbitrary waveforms, float64 little-endian, aligned on 8 bytes
+_MAGIC = b"QMCF\x01"
+_HEADER = struct.Struct("<I")
+
+
+def _encode(value, buffers):
+    """
+    Converts a value of a configuration into a JSON value, appending the arrays of samples to buffers
+    """
+    if isinstance(value, dict):
+        if all(isinstance(key, str) for key in value):
+            return {key: _encode(item, buffers) for key, item in value.items()}
+        return {"__items__": [[_encode(key, buffers), _encode(item, buffers)] for key, item in value.items()]}
+    if isinstance(value, tuple):
+        return {"__tuple__": [_encode(item, buffers) for item in value]}
+    if isinstance(value, list):
+        return [_encode(item, buffers) for item in value]
+    if isinstance(value, np.ndarray):
+        buffers.append(np.ascontiguousarray(value, dtype="<f8"))
+        return {"__buffer__": len(buffers) - 1}
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _decoder(buffers):
+    """
+    Returns the object_hook restoring the values encoded by _encode
+    """
+    def object_hook(value):
+        if "__items__" in value:
+            return {key: item for key, item in value["__items__"]}
+        if "__tuple__" in value:
+            return tuple(value["__tuple__"])
+        if "__buffer__" in value:
+            return buffers[value["__buffer__"]]
+        return value
+    return object_hook
+
+
+class ConfigArchive:
+    """
+    Configuration encoded by QuantumMachine.to_bytes. Sections are decoded when they are first accessed, and the
+    samples of the arbitrary waveforms are read-only numpy arrays sharing the memory of the data (never decoded).
+
+    Attributes:
+        - data (Bytes): Encoded configuration
+        - version (Int): Version of the configuration
+
+    Methods:
+        - section: Returns a section of the configuration dictionary (samples as numpy arrays)
+        - config: Returns the whole configuration dictionary
+        - machine: Returns the QuantumMachine
+    """
+    def __init__(self, data):
+        data = memoryview(data)
+        if bytes(data[:len(_MAGIC)]) != _MAGIC:
+            raise ValueError("Not an encoded configuration")
+        start = len(_MAGIC) + _HEADER.size
+        header_length = _HEADER.unpack_from(data, len(_MAGIC))[0]
+        header = json.loads(bytes(data[start:start + header_length]))
+        self.data = data
+        self.version = header["version"]
+        self._positions = header["sections"]
+        self._buffers = [np.frombuffer(data, dtype="<f8", count=count, offset=offset)
+                         for offset, count in header["buffers"]]
+        self._sections = {}
+
+    def section(self, name):
+        if name not in self._sections:
+            offset, length = self._positions[name]
+            self._sections[name] = json.loads(bytes(self.data[offset:offset + length]),
+                                              object_hook=_decoder(self._buffers))
+        return self._sections[name]
+
+    def config(self):
+        config = {'version': self.version}
+        for section in _SECTIONS:
+            config[section] = self.section(section)
+        return config
+
+    def machine(self):
+        return QuantumMachine.from_config(self.config())
+
+
+class QuantumMachine(Component):
     """
     Defines a Quantum Machine, the combination of the quantum system and the Operator-X (OPX).
     OPX is the control hardware of the Quantum Orchestration Platform (QOP).
@@ -384,6 +957,11 @@ class QuantumMachine:
         - controllers: List of Controller objects
         - elements: List of Elements objects
     """
+    __slots__ = ("version",) + _SECTIONS + ("_sections_cache", "_rebuild_sections", "_modified_children")
+    _child_attributes = _SECTIONS
+    _tracking_attributes = Component._tracking_attributes + ("_sections_cache", "_rebuild_sections",
+                                                             "_modified_children")
+
     def __init__(self,
                  controllers=None,
                  elements=None,
@@ -404,7 +982,23 @@ class QuantumMachine:
         self.mixers = mixers
         self.oscillators = oscillators
 
-    def config(self):
+    def config(self, cached=False, deduplicate=False):
+        """
+        Returns the configuration dictionary of the Quantum Machine
+
+        Params:
+            - cached (Bool): If True, only the sections containing modified components are rebuilt, and the
+            dictionaries of the unmodified components are the same objects as in the previous call. The returned
+            dictionary must then be considered as read-only. Default to False.
+            - deduplicate (Bool): If True, identical waveforms and integration weights are first merged in the
+            Quantum Machine (see deduplicate). Default to False.
+        Return:
+            - config (Dict): Configuration to be given to QuantumMachinesManager.open_qm
+        """
+        if deduplicate:
+            self.deduplicate()
+        if cached:
+            return self._cached_config()
         return {'version': self.version,
                 'controllers': dict_from_list_instances(self.controllers),
                 'elements': dict_from_list_instances(self.elements),
@@ -414,3 +1008,259 @@ class QuantumMachine:
                 'integration_weights': dict_from_list_instances(self.integration_weights),
                 'mixers': dict_from_list_instances(self.mixers),
                 'oscillators': dict_from_list_instances(self.oscillators)}
+
+    def validate(self, raise_errors=True):
+        """
+        Checks the configuration of the Quantum Machine: references between components and ranges of the values
+        (see validation.validate_config)
+
+        Param:
+            - raise_errors (Bool): Whether a ConfigError is raised if the configuration is not valid, default to True
+        Return:
+            - errors (List[String]): Description of every error, empty if the configuration is valid
+        """
+        config = self.config(cached=True)
+        if raise_errors:
+            check_config(config)
+            return []
+        return validate_config(config)
+
+    def config_hash(self):
+        """
+        Returns a stable hash of the configuration, identical for equivalent configurations (see config_hash)
+        """
+        return config_hash(self.config(cached=True))
+
+    def deduplicate(self):
+        """
+        Merges the waveforms and the integration weights having the same content under different names.
+        The first one is kept, the other ones are removed and the references of the pulses are rewritten.
+        Components are indexed by a hash of their content, so the merge is linear in the number of components.
+
+        Return:
+            - merged (Dict): For "waveforms" and "integration_weights", Dict mapping the names of the removed
+            components to the names of the kept ones
+        """
+        merged_waveforms, waveforms = _deduplicate_instances(self.waveforms)
+        merged_weights, weights = _deduplicate_instances(self.integration_weights)
+        if merged_waveforms:
+            self.waveforms = waveforms
+        if merged_weights:
+            self.integration_weights = weights
+        if merged_waveforms or merged_weights:
+            for pulse in self.pulses if self.pulses is not None else []:
+                if pulse.waveforms and any(name in merged_waveforms for name in pulse.waveforms.values()):
+                    pulse.waveforms = {key: merged_waveforms.get(name, name) for key, name in pulse.waveforms.items()}
+                if pulse.integration_weights and any(name in merged_weights
+                                                     for name in pulse.integration_weights.values()):
+                    pulse.integration_weights = {key: merged_weights.get(name, name)
+                                                 for key, name in pulse.integration_weights.items()}
+        return {"waveforms": merged_waveforms,
+                "integration_weights": merged_weights}
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Builds the Quantum Machine of a configuration dictionary (config.py, output of config)
+
+        Param:
+            - config (Dict): Configuration dictionary
+        Return:
+            - quantum_machine (QuantumMachine): Quantum Machine whose config is equal to config
+        """
+        controllers = []
+        for name, controller in (config.get('controllers') or {}).items():
+            analog_outputs = [Analog_output(index, offset=port.get("offset", 0.), delay=port.get("delay", 0.))
+                              for index, port in (controller.get("analog_outputs") or {}).items()]
+            digital_outputs = [Digital_output(index) for index in controller.get("digital_outputs") or {}]
+            analog_inputs = [Analog_input(index, offset=port.get("offset", 0.), gain_db=port.get("gain_db", 0))
+                             for index, port in (controller.get("analog_inputs") or {}).items()]
+            digital_inputs = [Digital_input(index, threshold=port.get("threshold", 0.),
+                                            polarity=port.get("polarity", ""), window=port.get("window", 0))
+                              for index, port in (controller.get("digital_inputs") or {}).items()]
+            controllers.append(Controller(name,
+                                          analog_outputs=analog_outputs,
+                                          digital_outputs=digital_outputs,
+                                          analog_inputs=analog_inputs,
+                                          digital_inputs=digital_inputs,
+                                          ctrl_type=controller.get("type", "opx1")))
+        elements = [Element(name, element) for name, element in (config.get('elements') or {}).items()]
+        pulses = [Pulse(name,
+                        waveforms=pulse.get("waveforms"),
+                        operation=pulse.get("operation", "control"),
+                        length=pulse.get("length", 16),
+                        integration_weights=pulse.get("integration_weights"),
+                        digital_marker=pulse.get("digital_marker", ""))
+                  for name, pulse in (config.get('pulses') or {}).items()]
+        waveforms = [Waveform(name,
+                              wvf_type=waveform["type"],
+                              sample=waveform.get("sample", 0.),
+                              samples=waveform.get("samples", 0.))
+                     for name, waveform in (config.get('waveforms') or {}).items()]
+        digital_waveforms = [DigitalWaveform(name, digital_waveform)
+                             for name, digital_waveform in (config.get('digital_waveforms') or {}).items()]
+        integration_weights = [IntegrationWeight.from_segments(name, weight.get("sine", []), weight.get("cosine", []))
+                               for name, weight in (config.get('integration_weights') or {}).items()]
+        mixers = []
+        for name, mixer in (config.get('mixers') or {}).items():
+            if len(mixer) != 1:
+                raise ValueError("Mixer {} must have one couple of frequencies".format(name))
+            mixers.append(Mixer(name,
+                                mixer[0]["intermediate_frequency"],
+                                lo_frequency=mixer[0].get("lo_frequency", 0),
+                                correction=mixer[0].get("correction")))
+        oscillators = []
+        for name, oscillator in (config.get('oscillators') or {}).items():
+            if set(oscillator) == {"intermediate_frequency"}:
+                oscillators.append(Oscillator2(name, oscillator["intermediate_frequency"]))
+            else:
+                oscillators.append(Oscillator(name,
+                                              oscillator["intermediate_frequency"],
+                                              lo_frequency=oscillator.get("lo_frequency", 0),
+                                              mixer=oscillator.get("mixer")))
+        return cls(controllers=controllers,
+                   elements=elements,
+                   pulses=pulses,
+                   waveforms=waveforms,
+                   digital_waveforms=digital_waveforms,
+                   integration_weights=integration_weights,
+                   mixers=mixers,
+                   oscillators=oscillators,
+                   version=config.get('version', 1))
+
+    def to_bytes(self):
+        """
+        Encodes the configuration into a compact binary format: JSON sections, and raw float64 buffers for the samples
+        of the arbitrary waveforms (see ConfigArchive)
+
+        Return:
+            - data (Bytes): Encoded configuration, decoded by QuantumMachine.from_bytes
+        """
+        config = dict(self.config(cached=True))
+        # Samples are taken from the arrays of the waveforms instead of the lists of the configuration
+        config['waveforms'] = {name: dict(waveform) for name, waveform in config['waveforms'].items()}
+        for waveform in self.waveforms if self.waveforms is not None else []:
+            if waveform.wvf_type == "arbitrary":
+                config['waveforms'][waveform.name]["samples"] = waveform._samples_array()
+        buffers = []
+        blobs = [json.dumps(_encode(config[section], buffers), separators=(",", ":")).encode()
+                 for section in _SECTIONS]
+
+        def build_header(start):
+            positions = {}
+            offset = start
+            for section, blob in zip(_SECTIONS, blobs):
+                positions[section] = [offset, len(blob)]
+                offset += len(blob)
+            buffers_positions = []
+            for buffer in buffers:
+                offset += -offset % 8
+                buffers_positions.append([offset, buffer.size])
+                offset += buffer.nbytes
+            return json.dumps({"version": config['version'],
+                               "sections": positions,
+                               "buffers": buffers_positions}, separators=(",", ":")).encode()
+
+        # The length of the header depends on the positions, which depend on the length of the header
+        header = build_header(0)
+        while True:
+            start = len(_MAGIC) + _HEADER.size + len(header)
+            new_header = build_header(start)
+            if len(new_header) == len(header):
+                header = new_header
+                break
+            header = new_header
+        parts = [_MAGIC, _HEADER.pack(len(header)), header] + blobs
+        offset = start + sum(len(blob) for blob in blobs)
+        for buffer in buffers:
+            parts.append(b"\x00" * (-offset % 8))
+            offset += -offset % 8
+            parts.append(buffer.tobytes())
+            offset += buffer.nbytes
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Decodes a configuration encoded by to_bytes. The samples of the arbitrary waveforms are read-only arrays
+        sharing the memory of data. Use ConfigArchive(data) to access some sections without building the machine.
+        """
+        return ConfigArchive(data).machine()
+
+    def _init_tracking(self):
+        Component._init_tracking(self)
+        # Cache of each section: Dict mapping id of the components to their dictionaries, and merged dictionary
+        object.__setattr__(self, "_sections_cache", {})
+        object.__setattr__(self, "_rebuild_sections", set(_SECTIONS))
+        object.__setattr__(self, "_modified_children", {section: {} for section in _SECTIONS})
+
+    def touch(self):
+        """
+        Marks the whole Quantum Machine as modified. To be called after an in-place modification of its lists of
+        components (ex: quantum_machine.pulses.append(pulse))
+        """
+        Component.touch(self)
+        self._rebuild_sections.update(_SECTIONS)
+
+    def _attribute_modified(self, name):
+        if name in _SECTIONS:
+            self._rebuild_sections.add(name)
+        self._dirty = True
+
+    def _child_modified(self, child, name):
+        self._modified_children[name][id(child)] = child
+
+    def _cached_config(self):
+        """
+        Incremental build of the configuration, see config.
+        A section is fully rebuilt when its list of components is replaced. Otherwise, only the dictionaries of the
+        modified components are replaced in a copy of the section, the other ones are shared with the previous
+        configuration.
+        """
+        modified = self._dirty or self._cache is None
+        for section in _SECTIONS:
+            modified_children = self._modified_children[section]
+            if section in self._rebuild_sections:
+                instances = getattr(self, section)
+                instances_dicts = {}
+                section_dict = {}
+                for instance in instances if instances is not None else []:
+                    instance_dict = instance.cached_get()
+                    instances_dicts[id(instance)] = instance_dict
+                    section_dict.update(instance_dict)
+                self._sections_cache[section] = (instances_dicts, section_dict)
+                modified_children.clear()
+                modified = True
+            elif modified_children:
+                instances_dicts, section_dict = self._sections_cache[section]
+                section_dict = dict(section_dict)
+                for key, child in modified_children.items():
+                    old_dict = instances_dicts[key]
+                    new_dict = child.cached_get()
+                    for name in old_dict:
+                        if name not in new_dict:
+                            del section_dict[name]
+                    section_dict.update(new_dict)
+                    instances_dicts[key] = new_dict
+                self._sections_cache[section] = (instances_dicts, section_dict)
+                modified_children.clear()
+                modified = True
+        self._rebuild_sections.clear()
+        if modified:
+            self._cache = {'version': self.version}
+            for section in _SECTIONS:
+                self._cache[section] = self._sections_cache[section][1]
+            self._dirty = False
+        return self._cache
+
+    def waveform_buffers(self):
+        """
+        Returns the samples of the arbitrary waveforms without building their lists of floats
+
+        Return:
+            - buffers (Dict): Map the name of the arbitrary waveforms to a read-only memoryview on their samples
+        """
+        if self.waveforms is None:
+            return {}
+        return {waveform.name: waveform.get_buffer()
+                for waveform in self.waveforms if waveform.wvf_type == "arbitrary"}
@@ -0,0 +1,192 @@
+"""
+On-disk storage of the acquisitions (the 'a' and 'i' streams of intensityVoltageprog).
+Each acquisition (run) is a directory containing:
+    - meta.json: the configuration and the program that generated it, the columns and their dtypes
+    - one binary file per stream (column), to which the values are appended as raw little-endian numbers
+
+Columns of past runs are memory-mapped: analyzing many runs does not load them in memory.
+Runs can be read while they are written, the readers only see the values already flushed.
+"""
+import datetime
+import json
+import os
+
+import numpy as np
+
+METADATA_FILE = "meta.json"
+
+
+def _to_json(value):
+    """
+    Converts the objects which are not serializable to JSON (numpy arrays and scalars, memoryviews)
+    """
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, memoryview):
+        return value.tolist()
+    raise TypeError("Object of type {} is not JSON serializable".format(type(value).__name__))
+
+
+def _json_keys(value):
+    """
+    Converts the keys of the dictionaries to strings (ports indices are Int)
+    """
+    if isinstance(value, dict):
+        return {str(key): _json_keys(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_keys(item) for item in value]
+    return value
+
+
+class RunWriter:
+    """
+    Appends chunks of values to the columns of a run. Can be used as a consumer of streaming.stream_results.
+
+    Attributes:
+        - path (String): Directory of the run
+        - columns (Dict): Map the names of the columns to their numpy dtypes
+        - count (Int): Number of values written in each column
+
+    Methods:
+        - append (or update): Writes a chunk of values at the end of the columns
+        - flush: Makes the written values visible to the readers
+        - close: Closes the files of the columns
+    """
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = {name: np.dtype(dtype).newbyteorder("<") for name, dtype in columns.items()}
+        self.count = 0
+        self._files = {name: open(os.path.join(path, name + ".bin"), "ab") for name in self.columns}
+
+    def append(self, chunk):
+        """
+        Param:
+            - chunk (Dict): Map the names of the columns to the arrays of their new values, all of the same length
+        """
+        lengths = {len(chunk[name]) for name in self.columns}
+        if len(lengths) != 1:
+            raise ValueError("All the columns of a chunk must have the same length")
+        for name, dtype in self.columns.items():
+            self._files[name].write(np.ascontiguousarray(chunk[name], dtype=dtype).tobytes())
+        self.count += lengths.pop()
+
+    update = append
+
+    def flush(self):
+        for file in self._files.values():
+            file.flush()
+
+    def close(self):
+        for file in self._files.values():
+            file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class Run:
+    """
+    Acquisition stored on disk. Columns are memory-mapped in read-only mode.
+
+    Attributes:
+        - path (String): Directory of the run
+        - metadata (Dict): Content of meta.json
+        - config (Dict): Configuration of the Quantum Machine (keys of the dictionaries converted to strings)
+        - program (String): Program that generated the data
+        - columns (List[String]): Names of the columns
+
+    Methods:
+        - __getitem__: Returns a memory-mapped column. Call it again to see the values appended since.
+        - __len__: Number of complete rows (values written in all the columns)
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, METADATA_FILE)) as file:
+            self.metadata = json.load(file)
+        self._dtypes = {name: np.dtype(dtype) for name, dtype in self.metadata["columns"].items()}
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+    @property
+    def config(self):
+        return self.metadata["config"]
+
+    @property
+    def program(self):
+        return self.metadata["program"]
+
+    @property
+    def columns(self):
+        return list(self._dtypes)
+
+    def _file(self, column):
+        return os.path.join(self.path, column + ".bin")
+
+    def __len__(self):
+        return min((os.path.getsize(self._file(name)) // dtype.itemsize for name, dtype in self._dtypes.items()),
+                   default=0)
+
+    def __getitem__(self, column):
+        dtype = self._dtypes[column]
+        length = len(self)
+        if length == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(self._file(column), dtype=dtype, mode="r", shape=(length,))
+
+
+class ResultStore:
+    """
+    Directory containing the runs
+
+    Attribute:
+        - directory (String): Path of the directory, created if needed
+
+    Methods:
+        - create: Creates a new run and returns its RunWriter
+        - open: Opens a stored run
+        - runs: Returns the names of the stored runs, oldest first
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def create(self, name=None, config=None, program=None, columns=None, metadata=None):
+        """
+        Params:
+            - name (String): Name of the run, default to the current date and time
+            - config (Dict): Configuration of the Quantum Machine
+            - program (String): Program generating the data (ex: output of qm.generate_qua_script)
+            - columns (Dict): Map the names of the columns to their dtypes, default to float64 columns 'a' and 'i'
+            - metadata (Dict): Additional metadata
+        Return:
+            - writer (RunWriter): Writer of the new run
+        """
+        if name is None:
+            name = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        if columns is None:
+            columns = {"a": "float64", "i": "float64"}
+        path = os.path.join(self.directory, name)
+        os.makedirs(path)
+        content = {"created": datetime.datetime.now().isoformat(),
+                   "config": _json_keys(config),
+                   "program": None if program is None else str(program),
+                   "columns": {column: np.dtype(dtype).newbyteorder("<").str for column, dtype in columns.items()},
+                   "metadata": metadata if metadata is not None else {}}
+        with open(os.path.join(path, METADATA_FILE), "w") as file:
+            json.dump(content, file, default=_to_json)
+        return RunWriter(path, columns)
+
+    def open(self, name):
+        return Run(os.path.join(self.directory, name))
+
+    def runs(self):
+        names = [name for name in os.listdir(self.directory)
+                 if os.path.isfile(os.path.join(self.directory, name, METADATA_FILE))]
+        return sorted(names, key=lambda name: os.path.getmtime(os.path.join(self.directory, name, METADATA_FILE)))
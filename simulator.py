@@ -0,0 +1,400 @@
+"""
+Offline simulation of the intensity-voltage sweep of intensityVoltage.py.
+The AOM and the photo-diode are replaced by a parametrized model, and the whole sweep is computed with numpy
+array operations from the configuration dictionary. Results have the same names as the streams saved by the QUA
+program ('a' and 'i'), and can be accessed as the result handles of a job.
+"""
+import threading
+import time
+
+import numpy as np
+
+
+class AOMPhotodiodeModel:
+    """
+    Model of the AOM and of the photo-diode measuring the intensity of the diffracted beam
+
+    Attributes:
+        - max_intensity (Float): Photo-diode voltage at maximal diffraction efficiency, in V. Default to 0.4
+        - saturation_voltage (Float): RF amplitude at maximal diffraction efficiency, in V. Default to 0.4
+        - rise_time (Float): Time constant of the exponential rise (and fall) of the AOM, in ns. Default to 30
+        - dark_level (Float): Photo-diode voltage without light, in V. Default to 0
+        - noise (Float): Standard deviation of the photo-diode noise on each ADC sample (1ns), in V. Default to 0
+        - seed (Int): Seed of the random generator of the noise, default to None
+
+    Methods:
+        - intensity: Returns the steady-state photo-diode voltage for RF amplitudes
+        - response: Returns the normalized response of the AOM to a RF pulse
+    """
+    def __init__(self,
+                 max_intensity=0.4,
+                 saturation_voltage=0.4,
+                 rise_time=30.,
+                 dark_level=0.,
+                 noise=0.,
+                 seed=None):
+        self.max_intensity = max_intensity
+        self.saturation_voltage = saturation_voltage
+        self.rise_time = rise_time
+        self.dark_level = dark_level
+        self.noise = noise
+        self.rng = np.random.default_rng(seed)
+
+    def intensity(self, voltage):
+        """
+        Steady-state photo-diode voltage. The diffraction efficiency of the AOM is sin^2(pi/2 V/V_sat) below
+        the saturation voltage, and stays maximal above.
+
+        Param:
+            - voltage (Array): RF amplitudes in V
+        Return:
+            - intensity (Array): Photo-diode voltages in V
+        """
+        ratio = np.minimum(np.abs(voltage) / self.saturation_voltage, 1.)
+        return self.dark_level + self.max_intensity * np.sin(np.pi / 2 * ratio)**2
+
+    def response(self, times, pulse_length):
+        """
+        Normalized response of the AOM to a RF pulse starting at t=0
+
+        Params:
+            - times (Array): Times in ns
+            - pulse_length (Int): Duration of the RF pulse in ns
+        Return:
+            - response (Array): Fraction of the steady-state intensity reached at each time
+        """
+        times = np.asarray(times, dtype=np.float64)
+        if self.rise_time <= 0:
+            return ((times >= 0) & (times < pulse_length)).astype(np.float64)
+        rise = 1 - np.exp(-np.clip(times, 0, pulse_length) / self.rise_time)
+        fall = np.exp(-np.clip(times - pulse_length, 0, None) / self.rise_time)
+        return np.where(times < 0, 0., rise * fall)
+
+
+def expand_integration_weights(segments):
+    """
+    Returns the integration weights applied to each ADC sample (1ns)
+
+    Param:
+        - segments (List): List of tuples (weight, duration in ns), as in the configuration
+    Return:
+        - weights (Array): Weight of each sample
+    """
+    if len(segments) == 0:
+        return np.zeros(0)
+    weights, durations = zip(*segments)
+    return np.repeat(np.asarray(weights, dtype=np.float64), np.asarray(durations, dtype=np.int64))
+
+
+def simulate_amplitudes(config,
+                        amplitudes,
+                        model=None,
+                        n_sweeps=1,
+                        control_pulse="amp_mod_pulse",
+                        measurement_pulse="meas_pulse",
+                        integration_weights="integration",
+                        wait_time=120):
+    """
+    Simulates the measurement of the intensity for given amplitude factors: for each amplitude factor a, the control
+    pulse is played with amplitude a, and the measurement pulse starts wait_time ns later, integrating the
+    photo-diode signal with the cosine weights. All the amplitudes (and repetitions) are computed at once.
+
+    Params:
+        - config (Dict): Configuration dictionary (config.config or QuantumMachine.config())
+        - amplitudes (Array): Amplitude factors a
+        - model (AOMPhotodiodeModel): Model of the setup, default to AOMPhotodiodeModel()
+        - n_sweeps (Int): Number of repetitions of the measurements
+        - control_pulse (String): Name of the pulse sent to the AOM
+        - measurement_pulse (String): Name of the measurement pulse of the photo-diode
+        - integration_weights (String): Name of the integration weights in the measurement pulse
+        - wait_time (Int): Delay between the start of the control pulse and the measurement, in ns
+    Return:
+        - intensities (Array): Results of the integration, of shape (n_sweeps, len(amplitudes))
+    """
+    if model is None:
+        model = AOMPhotodiodeModel()
+    amplitudes = np.asarray(amplitudes, dtype=np.float64)
+
+    control = config["pulses"][control_pulse]
+    waveform = config["waveforms"][next(iter(control["waveforms"].values()))]
+    measurement = config["pulses"][measurement_pulse]
+    weights_name = measurement["integration_weights"][integration_weights]
+    weights = expand_integration_weights(config["integration_weights"][weights_name]["cosine"])
+
+    times = wait_time + np.arange(weights.size)
+    response = model.response(times, control["length"])
+    if waveform["type"] == "constant":
+        # The integral of the signal is separable: steady-state intensity times the integral of the response
+        intensities = model.intensity(amplitudes * waveform["sample"]) - model.dark_level
+        signal = intensities * np.dot(weights, response)
+    else:
+        # Envelope of the RF pulse during the measurement, zero once the pulse is over
+        samples = np.asarray(waveform["samples"], dtype=np.float64)
+        envelope = np.zeros(times.size)
+        played = times < samples.size
+        envelope[played] = samples[times[played]]
+        intensities = model.intensity(amplitudes[:, None] * envelope[None, :]) - model.dark_level
+        signal = intensities @ (weights * response)
+    signal = signal + model.dark_level * weights.sum()
+
+    shape = (n_sweeps, amplitudes.size)
+    if model.noise > 0:
+        return signal + model.rng.normal(0., model.noise * np.sqrt(np.dot(weights, weights)), shape)
+    return np.array(np.broadcast_to(signal, shape))
+
+
+def simulate_intensity_voltage(config,
+                               model=None,
+                               start=0.,
+                               stop=2.,
+                               step=0.001,
+                               n_sweeps=1,
+                               amplitudes=None,
+                               **kwargs):
+    """
+    Simulates intensityVoltageprog, see simulate_amplitudes
+
+    Params:
+        - config (Dict): Configuration dictionary (config.config or QuantumMachine.config())
+        - model (AOMPhotodiodeModel): Model of the setup, default to AOMPhotodiodeModel()
+        - start, stop, step (Float): Amplitude factors from start to stop (included) by step
+        - n_sweeps (Int): Number of repetitions of the sweep
+        - amplitudes (Array): Amplitude factors of the sweep, replacing start, stop and step if given
+        - kwargs: Names of the pulses and wait time, see simulate_amplitudes
+    Return:
+        - results (Dict): 'a' and 'i' arrays of shape (n_steps,) if n_sweeps is 1, else (n_sweeps, n_steps)
+    """
+    if amplitudes is None:
+        amplitudes = np.arange(start, stop + step / 2, step)
+    amplitudes = np.asarray(amplitudes, dtype=np.float64)
+    i = simulate_amplitudes(config, amplitudes, model, n_sweeps, **kwargs)
+    a = np.broadcast_to(amplitudes, i.shape)
+    if n_sweeps == 1:
+        return {"a": a[0].copy(), "i": i[0]}
+    return {"a": a.copy(), "i": i}
+
+
+class SimulatedResult:
+    """
+    Result of a stream, with the methods of the result handles of the QM SDK used in main.py and streaming.py
+
+    Attributes:
+        - name (String): Name of the stream
+        - values (Array): All the values of the stream
+        - handles (SimulatedResultHandles): Handles giving the number of values already available
+    """
+    def __init__(self, name, values, handles=None):
+        self.name = name
+        self.values = np.asarray(values)
+        self.handles = handles
+
+    def count_so_far(self):
+        if self.handles is None:
+            return len(self.values)
+        return min(self.handles.available, len(self.values))
+
+    def fetch(self, item):
+        return self.values[:self.count_so_far()][item]
+
+    def wait_for_all_values(self, timeout=None):
+        if self.handles is not None:
+            self.handles.wait_for_all_values(timeout)
+        return True
+
+    def fetch_all(self):
+        return self.values[:self.count_so_far()]
+
+
+class SimulatedResultHandles:
+    """
+    Result handles of a simulated job.
+    Values can be made available progressively, as during a real acquisition: every call to is_processing
+    makes values_per_poll more values of each stream available, and/or the values are made available at a constant
+    rate during duration seconds.
+
+    Attributes:
+        - results (Dict): Map the names of the streams to their arrays of values
+        - values_per_poll (Int): Number of values made available at each poll, default to None
+        - duration (Float): Duration of the acquisition in s, default to None
+        - available (Int): Number of values available in each stream
+    """
+    def __init__(self, results, values_per_poll=None, duration=None):
+        self.results = {name: SimulatedResult(name, values, self) for name, values in results.items()}
+        self.values_per_poll = values_per_poll
+        self.duration = duration
+        self.total = max([len(result.values) for result in self.results.values()], default=0)
+        self.start = time.monotonic()
+        self.halted = None
+        self._polled = self.total if values_per_poll is None else 0
+
+    @property
+    def available(self):
+        if self.halted is not None:
+            return self.halted
+        available = self._polled
+        if self.duration:
+            elapsed = (time.monotonic() - self.start) / self.duration
+            available = min(available, int(self.total * min(elapsed, 1.)))
+        return available
+
+    def get(self, name):
+        return self.results[name]
+
+    def keys(self):
+        return self.results.keys()
+
+    def is_processing(self):
+        if self._polled < self.total:
+            self._polled = min(self._polled + self.values_per_poll, self.total)
+        return self.available < self.total and self.halted is None
+
+    def halt(self):
+        """
+        Stops the acquisition, no more values will be available
+        """
+        self.halted = self.available
+
+    def wait_for_all_values(self, timeout=None):
+        """
+        Waits until all the values are available. Returns False if it is not the case after timeout seconds.
+        """
+        if self.halted is not None:
+            return self.halted == self.total
+        if self.duration:
+            remaining = self.start + self.duration - time.monotonic()
+            if timeout is not None and remaining > timeout:
+                time.sleep(max(timeout, 0))
+                return False
+            time.sleep(max(remaining, 0))
+        self._polled = self.total
+        return True
+
+
+class SimulatedJob:
+    """
+    Job running on a SimulatedQuantumMachine
+
+    Attributes:
+        - program: Program executed
+        - result_handles (SimulatedResultHandles): Results of the job
+    """
+    def __init__(self, program, results, values_per_poll=None, duration=None):
+        self.program = program
+        self.result_handles = SimulatedResultHandles(results, values_per_poll, duration)
+
+    def halt(self):
+        self.result_handles.halt()
+        return True
+
+
+class SimulatedQuantumMachine:
+    """
+    Quantum Machine opened by a SimulatedQuantumMachinesManager.
+    QUA programs cannot be interpreted: execute runs simulate_intensity_voltage, with the parameters given by the
+    program if it is a Dict (ex: {"start": 0., "stop": 1., "n_sweeps": 10, "average": True}) or a ProgramBuild of
+    intensityVoltage.py, else with the parameters of intensityVoltageprog. The parameter "streams" lists the names
+    of the intensity streams of a multi-channel program (default to 'i').
+
+    Attributes:
+        - config (Dict): Configuration of the machine
+        - manager (SimulatedQuantumMachinesManager): Manager having opened the machine
+        - closed (Bool): Whether the machine was closed
+    """
+    def __init__(self, config, manager):
+        self.config = config
+        self.manager = manager
+        self.closed = False
+
+    def execute(self, program):
+        if self.closed:
+            raise RuntimeError("The quantum machine is closed")
+        if hasattr(program, "simulation_parameters"):
+            parameters = program.simulation_parameters()
+        else:
+            parameters = dict(program) if isinstance(program, dict) else {}
+        average = parameters.pop("average", False)
+        streams = parameters.pop("streams", None)
+        if streams is None:
+            results = simulate_intensity_voltage(self.config, self.manager.model, **parameters)
+        else:
+            # Several channels measured in parallel: the same sweep with independent noise in each intensity stream
+            results = {}
+            for name in streams:
+                channel_results = simulate_intensity_voltage(self.config, self.manager.model, **parameters)
+                results["a"] = channel_results["a"]
+                results[name] = channel_results["i"]
+        if average and results["a"].ndim == 2:
+            results = {name: values.mean(axis=0) for name, values in results.items()}
+        results = {name: values.ravel() for name, values in results.items()}
+        return SimulatedJob(program, results, self.manager.values_per_poll, self.manager.execution_time)
+
+    def _set(self, path, value):
+        # The configuration may be shared (QuantumMachine.config(cached=True)): the dictionaries are copied on write
+        self.config = config = dict(self.config)
+        for key in path[:-1]:
+            config[key] = dict(config[key])
+            config = config[key]
+        config[path[-1]] = value
+
+    def set_intermediate_frequency(self, element, freq):
+        """
+        Sets the intermediate frequency of an element, as QuantumMachine.set_intermediate_frequency of the QM SDK.
+        The frequency of the oscillator of the element is set, if it has one.
+        """
+        oscillator = self.config["elements"][element].get("oscillator")
+        if oscillator is not None:
+            self._set(("oscillators", oscillator, "intermediate_frequency"), freq)
+        else:
+            self._set(("elements", element, "intermediate_frequency"), freq)
+
+    def set_output_dc_offset_by_element(self, element, input, offset):
+        """
+        Sets the DC offset of the analog output of an element ("single", "I" or "Q"), as
+        QuantumMachine.set_output_dc_offset_by_element of the QM SDK
+        """
+        element_config = self.config["elements"][element]
+        if input == "single":
+            controller, index = element_config["singleInput"]["port"]
+        else:
+            controller, index = element_config["mixInputs"][input]
+        self._set(("controllers", controller, "analog_outputs", index, "offset"), offset)
+
+    def close(self):
+        with self.manager.lock:
+            if not self.closed:
+                self.manager.open_machines.remove(self)
+            self.closed = True
+        return True
+
+
+class SimulatedQuantumMachinesManager:
+    """
+    Stand-in for QuantumMachinesManager, with the latencies of a real setup
+
+    Attributes:
+        - model (AOMPhotodiodeModel): Model of the simulated setup, default to AOMPhotodiodeModel()
+        - open_time (Float): Duration of open_qm (upload and validation of the configuration) in s, default to 0
+        - execution_time (Float): Duration of the execution of a program in s, default to 0
+        - values_per_poll (Int): See SimulatedResultHandles, default to None
+        - open_machines (List): Machines currently open
+        - n_opened (Int): Number of calls to open_qm
+    """
+    def __init__(self, model=None, open_time=0., execution_time=0., values_per_poll=None):
+        self.model = model if model is not None else AOMPhotodiodeModel()
+        self.open_time = open_time
+        self.execution_time = execution_time
+        self.values_per_poll = values_per_poll
+        self.open_machines = []
+        self.n_opened = 0
+        self.lock = threading.RLock()
+
+    def open_qm(self, config, close_other_machines=True):
+        time.sleep(self.open_time)
+        machine = SimulatedQuantumMachine(config, self)
+        with self.lock:
+            if close_other_machines:
+                for other_machine in list(self.open_machines):
+                    other_machine.close()
+            self.open_machines.append(machine)
+            self.n_opened += 1
+        return machine
@@ -0,0 +1,221 @@
+"""
+Streaming acquisition of the results of a job.
+Instead of waiting for the end of the program (wait_for_all_values) and fetching the whole streams (fetch_all),
+the new values of the streams are fetched while the program runs, and given by chunks to incremental consumers.
+Only the current chunk and the state of the consumers are kept in memory, however long the acquisition is.
+
+A consumer is any object with a method update(chunk), chunk being a Dict mapping the names of the streams to the
+arrays of their new values.
+"""
+import asyncio
+import time
+
+import numpy as np
+
+
+def _values(fetched):
+    """
+    Returns the values of fetched results. Depending on the version of the QM SDK, results of save are structured
+    arrays with a field "value".
+    """
+    fetched = np.asarray(fetched)
+    if fetched.dtype.names is not None and "value" in fetched.dtype.names:
+        return fetched["value"]
+    return fetched
+
+
+def _fetch_new_values(handles, fetched, chunk_size):
+    """
+    Returns the chunk of values available after the fetched first ones, or None if no new value is available
+    """
+    available = min(handle.count_so_far() for handle in handles.values())
+    if available <= fetched:
+        return None
+    stop = available if chunk_size is None else min(available, fetched + chunk_size)
+    return {name: _values(handle.fetch(slice(fetched, stop))) for name, handle in handles.items()}
+
+
+def stream_results(result_handles, names=("a", "i"), chunk_size=None, poll_interval=0.1, timeout=None):
+    """
+    Generator of the values of streams while they are acquired.
+    The streams are read at the same pace, so that the i-th values of all the streams are in the same chunk.
+
+    Params:
+        - result_handles: Result handles of a job (job.result_handles)
+        - names (Tuple[String]): Names of the streams, default to ("a", "i")
+        - chunk_size (Int): Maximal number of values of a chunk, default to None (all the available values)
+        - poll_interval (Float): Time in s between two checks of the number of available values, default to 0.1
+        - timeout (Float): Maximal duration of the acquisition in s, default to None (no limit)
+    Yield:
+        - chunk (Dict): Map the names of the streams to the arrays of their new values
+    """
+    handles = {name: result_handles.get(name) for name in names}
+    fetched = 0
+    start = time.monotonic()
+    while True:
+        # Checked before counting the values: once processing is over, all the values are counted
+        processing = result_handles.is_processing()
+        chunk = _fetch_new_values(handles, fetched, chunk_size)
+        if chunk is not None:
+            fetched += len(next(iter(chunk.values())))
+            yield chunk
+            continue
+        if not processing:
+            return
+        if timeout is not None and time.monotonic() - start > timeout:
+            raise TimeoutError("Acquisition not over after {} s".format(timeout))
+        time.sleep(poll_interval)
+
+
+async def astream_results(result_handles, names=("a", "i"), chunk_size=None, poll_interval=0.1, timeout=None,
+                          executor=None):
+    """
+    Asynchronous version of stream_results. The calls to the result handles are made in the threads of executor
+    (default executor of the event loop if None), so that the event loop is not blocked.
+    """
+    loop = asyncio.get_running_loop()
+    handles = {name: result_handles.get(name) for name in names}
+    fetched = 0
+    start = time.monotonic()
+    while True:
+        processing = await loop.run_in_executor(executor, result_handles.is_processing)
+        chunk = await loop.run_in_executor(executor, _fetch_new_values, handles, fetched, chunk_size)
+        if chunk is not None:
+            fetched += len(next(iter(chunk.values())))
+            yield chunk
+            continue
+        if not processing:
+            return
+        if timeout is not None and time.monotonic() - start > timeout:
+            raise TimeoutError("Acquisition not over after {} s".format(timeout))
+        await asyncio.sleep(poll_interval)
+
+
+def consume(chunks, consumers):
+    """
+    Gives every chunk to every consumer
+
+    Params:
+        - chunks (Iterable[Dict]): Chunks, as generated by stream_results
+        - consumers (List): Objects with a method update(chunk)
+    Return:
+        - consumers (List): The consumers, updated
+    """
+    for chunk in chunks:
+        for consumer in consumers:
+            consumer.update(chunk)
+    return consumers
+
+
+class RunningStatistics:
+    """
+    Running mean and variance of a stream in bins of another one (the intensity in bins of amplitude)
+    Chunks are merged using the parallel algorithm of Chan et al., so no value is kept in memory.
+
+    Attributes:
+        - edges (Array): Edges of the bins, values outside are ignored
+        - x (String): Name of the stream defining the bins, default to "a"
+        - y (String): Name of the stream whose statistics are computed, default to "i"
+        - count (Array): Number of values in each bin
+        - mean (Array): Mean of the values in each bin
+        - m2 (Array): Sum of the squared deviations from the mean in each bin
+
+    Methods:
+        - update: Adds a chunk of values
+        - variance: Returns the (unbiased) variance in each bin
+    """
+    def __init__(self, edges, x="a", y="i"):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.x = x
+        self.y = y
+        n_bins = self.edges.size - 1
+        self.count = np.zeros(n_bins, dtype=np.int64)
+        self.mean = np.zeros(n_bins)
+        self.m2 = np.zeros(n_bins)
+
+    @classmethod
+    def uniform(cls, start, stop, n_bins, x="a", y="i"):
+        """
+        Statistics in n_bins bins of same width between start and stop
+        """
+        return cls(np.linspace(start, stop, n_bins + 1), x, y)
+
+    @property
+    def centers(self):
+        return (self.edges[1:] + self.edges[:-1]) / 2
+
+    def update(self, chunk):
+        x = np.asarray(chunk[self.x], dtype=np.float64)
+        y = np.asarray(chunk[self.y], dtype=np.float64)
+        bins = np.searchsorted(self.edges, x, side="right") - 1
+        # Last edge is included in the last bin
+        bins[x == self.edges[-1]] = self.count.size - 1
+        inside = (bins >= 0) & (bins < self.count.size)
+        bins, y = bins[inside], y[inside]
+        n_bins = self.count.size
+
+        count = np.bincount(bins, minlength=n_bins)
+        in_chunk = count > 0
+        mean = np.bincount(bins, weights=y, minlength=n_bins)
+        mean[in_chunk] /= count[in_chunk]
+        m2 = np.bincount(bins, weights=(y - mean[bins])**2, minlength=n_bins)
+
+        total = self.count + count
+        delta = mean - self.mean
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.mean = np.where(in_chunk, self.mean + delta * count / total, self.mean)
+            self.m2 = np.where(in_chunk, self.m2 + m2 + delta**2 * self.count * count / total, self.m2)
+        self.count = total
+
+    def variance(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.count > 1, self.m2 / (self.count - 1), np.nan)
+
+
+class OnlinePolynomialFit:
+    """
+    Least-squares polynomial fit of a stream as a function of another one, updated chunk by chunk.
+    Only the normal equations (matrix of size degree+1) are kept in memory.
+
+    Attributes:
+        - degree (Int): Degree of the polynomial
+        - x (String): Name of the stream of the variable, default to "a"
+        - y (String): Name of the stream of the fitted values, default to "i"
+        - count (Int): Number of fitted values
+
+    Methods:
+        - update: Adds a chunk of values
+        - coefficients: Returns the coefficients of the fit, highest degree first (as numpy.polyval)
+        - predict: Evaluates the fit
+    """
+    def __init__(self, degree=3, x="a", y="i"):
+        self.degree = degree
+        self.x = x
+        self.y = y
+        self.count = 0
+        self.xtx = np.zeros((degree + 1, degree + 1))
+        self.xty = np.zeros(degree + 1)
+        self.yty = 0.
+
+    def update(self, chunk):
+        x = np.asarray(chunk[self.x], dtype=np.float64)
+        y = np.asarray(chunk[self.y], dtype=np.float64)
+        vandermonde = np.vander(x, self.degree + 1)
+        self.xtx += vandermonde.T @ vandermonde
+        self.xty += vandermonde.T @ y
+        self.yty += np.dot(y, y)
+        self.count += x.size
+
+    def coefficients(self):
+        return np.linalg.lstsq(self.xtx, self.xty, rcond=None)[0]
+
+    def residual_variance(self):
+        """
+        Returns the variance of the residuals of the fit
+        """
+        coefficients = self.coefficients()
+        residuals = self.yty - 2 * coefficients @ self.xty + coefficients @ self.xtx @ coefficients
+        return max(residuals, 0.) / max(self.count - self.degree - 1, 1)
+
+    def predict(self, x):
+        return np.polyval(self.coefficients(), x)
@@ -0,0 +1,96 @@
+"""
+Families of configurations differing by the values of a few attributes of the components of a QuantumMachine.
+Configurations are generated lazily, one at a time, with the incremental build of QuantumMachine.config: only the
+modified components are rebuilt, and all the unmodified dictionaries are shared between the configurations.
+
+Example:
+    for point, config in ConfigSweep(quantumMachine,
+                                     SweepAxis(amp_mod_wf, "sample", np.linspace(0.1, 0.3, 100)),
+                                     SweepAxis(osc, "intermediate_frequency", [99e6, 100e6, 101e6])):
+        ...
+"""
+import itertools
+
+import numpy as np
+
+
+class SweepAxis:
+    """
+    Values taken by an attribute of a component
+
+    Attributes:
+        - component (Component): Component of the QuantumMachine (Waveform, Pulse, Analog_output, Oscillator2...)
+        - attribute (String): Name of the attribute, ex: "sample", "length", "offset", "intermediate_frequency"
+        - values (Iterable): Values of the attribute
+        - label (String): Name of the axis in the points of the sweep, default to "<component name>.<attribute>"
+    """
+    def __init__(self, component, attribute, values, label=None):
+        if not hasattr(component, attribute):
+            raise AttributeError("{} has no attribute {}".format(type(component).__name__, attribute))
+        self.component = component
+        self.attribute = attribute
+        self.values = [value.item() if isinstance(value, np.generic) else value for value in values]
+        if label is None:
+            name = getattr(component, "name", type(component).__name__)
+            label = "{}.{}".format(name, attribute)
+        self.label = label
+
+    def __len__(self):
+        return len(self.values)
+
+
+class ConfigSweep:
+    """
+    Iterable over the configurations of a sweep. Each item is a tuple (point, config): point maps the labels of the
+    axes to their values, config is the configuration dictionary (read-only, see QuantumMachine.config).
+    The attributes are restored to their initial values at the end of the iteration.
+
+    Attributes:
+        - machine (QuantumMachine): Base machine, whose components are modified during the iteration
+        - axes (List[SweepAxis]): Axes of the sweep
+        - mode (String): "product" for the cartesian product of the axes (last axis varying fastest),
+        "zip" to vary all the axes together. Default to "product"
+    """
+    def __init__(self, machine, *axes, mode="product"):
+        if mode not in ("product", "zip"):
+            raise ValueError("""mode must be "product" or "zip" """)
+        if mode == "zip" and len({len(axis) for axis in axes}) > 1:
+            raise ValueError("All the axes of a zip sweep must have the same number of values")
+        self.machine = machine
+        self.axes = list(axes)
+        self.mode = mode
+
+    def __len__(self):
+        if not self.axes:
+            return 1
+        if self.mode == "zip":
+            return len(self.axes[0])
+        length = 1
+        for axis in self.axes:
+            length *= len(axis)
+        return length
+
+    def points(self):
+        """
+        Generator of the tuples of values of the axes
+        """
+        values = [axis.values for axis in self.axes]
+        if self.mode == "zip":
+            return zip(*values)
+        return itertools.product(*values)
+
+    def __iter__(self):
+        initial_values = [getattr(axis.component, axis.attribute) for axis in self.axes]
+        current_values = list(initial_values)
+        try:
+            for values in self.points():
+                for k, (axis, value) in enumerate(zip(self.axes, values)):
+                    # Only the attributes which change are set, the other components are not rebuilt
+                    if value is not current_values[k]:
+                        setattr(axis.component, axis.attribute, value)
+                        current_values[k] = value
+                point = {axis.label: value for axis, value in zip(self.axes, values)}
+                yield point, self.machine.config(cached=True)
+        finally:
+            for axis, value in zip(self.axes, initial_values):
+                setattr(axis.component, axis.attribute, value)
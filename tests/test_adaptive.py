@@ -0,0 +1,46 @@
+"""
+Adaptive I(V) sweep on the noisy simulator
+"""
+import numpy as np
+import pytest
+
+from adaptive import adaptive_sweep, simulator_measure
+from config import config
+from simulator import AOMPhotodiodeModel, simulate_amplitudes
+
+DENSE_POINTS = 2001
+
+
+def measurement_noise(model):
+    # Standard deviation of an integrated intensity: noise of the ADC samples times the norm of the weights
+    weights = config["integration_weights"]["integration"]["cosine"]
+    return model.noise * np.sqrt(sum(weight**2 * duration for weight, duration in weights))
+
+
+@pytest.mark.parametrize("noise", [0.01, 0.03])
+def test_noisy_sweep_stops_at_the_noise_level(noise):
+    model = AOMPhotodiodeModel(noise=noise, seed=3)
+    result = adaptive_sweep(simulator_measure(config, model), tolerance=1e-5)
+    sigma = measurement_noise(model)
+    assert result.converged
+    assert result.n_shots <= DENSE_POINTS / 5
+    assert 0.6 * sigma < result.noise < 1.4 * sigma
+    assert result.threshold > result.noise > 1e-5
+    # The interpolated curve is as accurate as the measurements
+    dense = np.linspace(0., 2., DENSE_POINTS)
+    exact = simulate_amplitudes(config, dense, AOMPhotodiodeModel())[0]
+    assert np.max(np.abs(np.interp(dense, result.a, result.i) - exact)) < 5 * sigma
+
+
+def test_noiseless_sweep_meets_the_tolerance():
+    result = adaptive_sweep(simulator_measure(config, AOMPhotodiodeModel()), tolerance=1e-5)
+    assert result.noise == 0.
+    assert result.threshold == 1e-5
+    assert result.converged
+    assert result.n_shots < DENSE_POINTS / 5
+
+
+def test_given_noise_skips_the_repetition():
+    model = AOMPhotodiodeModel(noise=0.01, seed=3)
+    result = adaptive_sweep(simulator_measure(config, model), tolerance=1e-5, noise=measurement_noise(model))
+    assert result.n_shots == result.a.size
@@ -0,0 +1,60 @@
+"""
+Asyncio interface over the simulated manager: concurrent jobs, timeouts and cancellations
+"""
+import asyncio
+import time
+
+import pytest
+
+from async_jobs import AsyncQuantumMachinesManager
+from config import config
+
+
+def test_concurrent_jobs():
+    async def main():
+        async with AsyncQuantumMachinesManager.simulated(execution_time=0.2, poll_interval=0.01) as qmm:
+            qm = await qmm.open_qm(config)
+            start = time.perf_counter()
+            jobs = [await qm.execute({"stop": 1., "step": 0.01 * (k + 1)}) for k in range(4)]
+            results = await asyncio.gather(*(job.result(timeout=5) for job in jobs))
+            return results, time.perf_counter() - start
+
+    results, duration = asyncio.run(main())
+    # The 4 jobs of 0.2 s run at the same time
+    assert duration < 0.6
+    for k, result in enumerate(results):
+        assert result["a"].size == result["i"].size == round(1. / (0.01 * (k + 1))) + 1
+
+
+def test_timeout_halts_the_job():
+    async def main():
+        async with AsyncQuantumMachinesManager.simulated(execution_time=10., poll_interval=0.01) as qmm:
+            qm = await qmm.open_qm(config)
+            job = await qm.execute({})
+            with pytest.raises(asyncio.TimeoutError):
+                await job.wait(timeout=0.1)
+            return job
+
+    job = asyncio.run(main())
+    handles = job.result_handles
+    assert handles.halted is not None
+    assert handles.available < handles.total
+    assert not handles.is_processing()
+
+
+def test_machine_of_a_cancelled_open_is_closed():
+    async def main():
+        async with AsyncQuantumMachinesManager.simulated(open_time=0.2) as qmm:
+            task = asyncio.ensure_future(qmm.open_qm(config))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            with pytest.raises(asyncio.TimeoutError):
+                await qmm.open_qm(config, timeout=0.05)
+            return qmm.manager
+
+    # Leaving the context waits for the openings in progress, which close their machines
+    manager = asyncio.run(main())
+    assert manager.n_opened == 2
+    assert manager.open_machines == []
@@ -0,0 +1,63 @@
+"""
+Calibration daemon on the simulated manager: false alarms without drift, detection of a drift, failing steps
+"""
+import logging
+
+import pytest
+
+from calibration import CalibrationDaemon, simulated_programs
+from config import config
+from simulator import AOMPhotodiodeModel, SimulatedQuantumMachinesManager
+
+
+def start_daemon(seed, **kwargs):
+    manager = SimulatedQuantumMachinesManager(AOMPhotodiodeModel(noise=0.01, seed=seed))
+    daemon = CalibrationDaemon(manager, config, interval=0., programs=simulated_programs(), **kwargs)
+    return manager, daemon.start()
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_no_recalibration_without_drift(seed):
+    _, daemon = start_daemon(seed)
+    daemon.run(n_steps=300)
+    assert daemon.n_probes == 300
+    # One full sweep measures the first reference, false alarms are rare
+    assert daemon.n_full_sweeps - 1 <= 1
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_drift_is_detected(seed):
+    manager, daemon = start_daemon(seed)
+    # Laser power decreasing by 1e-4 per probe: the intensities drift by about the noise of a probe every 2 probes
+    for n in range(1, 21):
+        manager.model.max_intensity *= 1 - 1e-4
+        result, recalibrated = daemon.step()
+        if recalibrated:
+            break
+    assert recalibrated
+    assert n <= 10
+    assert result.drift < 1e-3
+    assert daemon.n_full_sweeps == 2
+    # The new reference is the drifted curve
+    assert daemon.step() == (daemon.history[-1], False)
+
+
+def test_run_goes_on_after_failing_steps(caplog):
+    _, daemon = start_daemon(0)
+    machine = daemon.machine
+    execute = machine.execute
+    calls = []
+
+    def failing_execute(program):
+        calls.append(program)
+        if len(calls) in (2, 3):
+            raise RuntimeError("connection lost")
+        return execute(program)
+
+    machine.execute = failing_execute
+    with caplog.at_level(logging.ERROR, logger="calibration"):
+        daemon.run(n_steps=5)
+    assert len(calls) == 5
+    assert daemon.n_probes == 3
+    assert daemon.n_failures == 0
+    assert sum("Step failed" in record.message for record in caplog.records) == 2
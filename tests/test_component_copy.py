@@ -0,0 +1,74 @@
+"""
+Copy and pickle round trips of the components of a Quantum Machine
+"""
+import copy
+import pickle
+
+import numpy as np
+import pytest
+
+from quantum_machine import (Analog_input, Analog_output, Controller, Element, IntegrationWeight, Oscillator, Pulse,
+                             QuantumMachine, Waveform)
+
+
+def build_machine():
+    return QuantumMachine(
+        controllers=[Controller("con1",
+                                analog_outputs=[Analog_output(1, offset=0.)],
+                                analog_inputs=[Analog_input(1, offset=0., gain_db=0)])],
+        elements=[Element("AOM", {"singleInput": {"port": ("con1", 1)},
+                                  "oscillator": "osc",
+                                  "operations": {"amp_mod": "amp_mod_pulse"}}),
+                  Element("photodiode", {"outputs": {"out1": ("con1", 1)},
+                                         "oscillator": "osc",
+                                         "operations": {"meas": "meas_pulse"}})],
+        pulses=[Pulse("amp_mod_pulse", {"single": "gauss_wf"}, "control", 1000),
+                Pulse("meas_pulse", {"single": "zero_wf"}, "measurement", 1000,
+                      integration_weights={"integration": "integration_w"}, digital_marker="ON")],
+        waveforms=[Waveform("gauss_wf", "arbitrary", samples=0.25 * np.hanning(1000)),
+                   Waveform("zero_wf", "constant", sample=0.)],
+        integration_weights=[IntegrationWeight("integration_w", cos_weight=1 / 1000, cos_duration=1000,
+                                               sin_duration=1000)],
+        oscillators=[Oscillator("osc", intermediate_frequency=1e8)])
+
+
+COPIES = {"deepcopy": copy.deepcopy,
+          "pickle": lambda value: pickle.loads(pickle.dumps(value))}
+
+
+@pytest.mark.parametrize("copy_function", COPIES.values(), ids=COPIES.keys())
+def test_machine_round_trip(copy_function):
+    machine = build_machine()
+    expected = machine.config(cached=True)
+    machine_copy = copy_function(machine)
+    assert machine_copy.config() == expected
+    assert machine_copy.config(cached=True) == expected
+    assert machine_copy.config_hash() == machine.config_hash()
+
+
+@pytest.mark.parametrize("copy_function", COPIES.values(), ids=COPIES.keys())
+def test_copy_tracks_its_own_modifications(copy_function):
+    machine = build_machine()
+    machine.config(cached=True)
+    machine_copy = copy_function(machine)
+    machine_copy.config(cached=True)
+    machine_copy.oscillators[0].intermediate_frequency = 5e7
+    machine_copy.waveforms[0].samples = np.zeros(1000)
+    config = machine_copy.config(cached=True)
+    assert config["oscillators"]["osc"]["intermediate_frequency"] == 5e7
+    assert config["waveforms"]["gauss_wf"]["samples"] == [0.] * 1000
+    # The original is not modified, nor notified
+    assert machine.config(cached=True)["oscillators"]["osc"]["intermediate_frequency"] == 1e8
+    assert machine.config(cached=True) == build_machine().config()
+
+
+@pytest.mark.parametrize("copy_function", COPIES.values(), ids=COPIES.keys())
+def test_attached_component_round_trip(copy_function):
+    machine = build_machine()
+    machine.config(cached=True)
+    waveform = machine.waveforms[0]
+    waveform_copy = copy_function(waveform)
+    assert waveform_copy.get()["gauss_wf"]["samples"] == waveform.get()["gauss_wf"]["samples"]
+    # The copy is detached: modifying it does not modify the configuration of the machine
+    waveform_copy.samples = np.ones(1000)
+    assert machine.config(cached=True)["waveforms"]["gauss_wf"]["samples"] == waveform.get_samples_list()
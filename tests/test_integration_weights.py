@@ -0,0 +1,42 @@
+"""
+Integration weights built from per-ns weights
+"""
+import numpy as np
+import pytest
+
+from quantum_machine import WEIGHT_RESOLUTION, IntegrationWeight
+
+
+def test_matched_filter_of_a_zero_mean_trace():
+    trace = np.sin(np.linspace(0., 4 * np.pi, 1000, endpoint=False))
+    weight = IntegrationWeight.matched_filter("matched", trace, scale=0.5)
+    weights = np.repeat(*zip(*weight.cosine))
+    assert np.all(np.isfinite(weights))
+    # Peak of the trace averaged over blocks of 4 ns
+    assert np.abs(weights).max() == pytest.approx(0.5, abs=1e-3)
+    assert np.corrcoef(weights, trace)[0, 1] > 0.999
+    # The default scale fills the ranges of the demodulation, it does not depend on the normalization
+    assert IntegrationWeight.matched_filter("matched", 3 * trace).cosine == \
+        IntegrationWeight.matched_filter("matched", trace).cosine
+
+
+@pytest.mark.parametrize("trace", [np.zeros(1000), np.zeros(0)])
+def test_matched_filter_of_a_zero_trace_is_rejected(trace):
+    with pytest.raises(ValueError):
+        IntegrationWeight.matched_filter("matched", trace)
+
+
+def test_from_samples_needs_weights():
+    with pytest.raises(ValueError):
+        IntegrationWeight.from_samples("empty")
+
+
+@pytest.mark.parametrize("build", [lambda weights: IntegrationWeight.from_samples("w", cosine=weights),
+                                   lambda weights: IntegrationWeight("w", cosine=weights),
+                                   lambda weights: IntegrationWeight("w", cosine=list(weights))],
+                         ids=["from_samples", "array", "list"])
+def test_per_ns_weights_must_fill_blocks_of_4_ns(build):
+    with pytest.raises(ValueError):
+        build(np.full(1002, 1e-3))
+    expected = round(1e-3 / WEIGHT_RESOLUTION) * WEIGHT_RESOLUTION
+    assert build(np.full(1000, 1e-3)).get()["w"]["cosine"] == [(expected, 1000)]
@@ -0,0 +1,24 @@
+"""
+Machine of several AOM channels built from the components of update_main.py
+"""
+import update_main
+from multichannel import build_multichannel_machine, channel_ports
+
+
+def test_defaults_follow_update_main():
+    channels = channel_ports(5)
+    assert [channel.output[0] for channel in channels] == ["OPX+", "OPX+", "OPX+2", "OPX+2", "OPX+3"]
+    config = build_multichannel_machine(channels).config()
+    assert list(config["controllers"]) == ["OPX+", "OPX+2", "OPX+3"]
+    assert all(controller["type"] == update_main.ctrl_type for controller in config["controllers"].values())
+    assert [channel.output[0] for channel in channel_ports(3, ctrl_name="con{}")] == ["con1", "con1", "con2"]
+
+
+def test_machine_owns_its_components():
+    machine = build_multichannel_machine(channel_ports(2))
+    machine.config(cached=True)
+    sample = update_main.amp_mod_wf.sample
+    machine.waveforms[0].sample = sample / 2
+    assert machine.config(cached=True)["waveforms"]["amp_mod_wf"]["sample"] == sample / 2
+    assert update_main.quantumMachine.config()["waveforms"]["amp_mod_wf"]["sample"] == sample
+    assert all(pulse is not update_main.pulses[0] for pulse in machine.pulses)
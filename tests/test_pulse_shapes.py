@@ -0,0 +1,62 @@
+"""
+Samples of the pulse shapes and their caches
+"""
+import numpy as np
+import pytest
+
+import pulse_shapes
+from pulse_shapes import drag_samples, gaussian_samples, piecewise_linear_samples, ramp_samples, waveform
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    pulse_shapes.clear_cache()
+    yield
+    pulse_shapes.clear_cache()
+
+
+def test_cache_key_does_not_depend_on_how_arguments_are_passed():
+    samples = gaussian_samples(40)
+    assert gaussian_samples(40, 0.25) is samples
+    assert gaussian_samples(length=40, amplitude=0.25, sigma=None) is samples
+    assert ramp_samples(1000, 0.25, 120) is ramp_samples(length=1000, rise=120, shape="cosine")
+    info = pulse_shapes.cache_info()
+    assert (info["gaussian"].hits, info["gaussian"].misses) == (2, 1)
+    assert (info["ramp"].hits, info["ramp"].misses) == (1, 1)
+
+
+def test_cached_samples_are_read_only():
+    samples = waveform("gauss_wf", "gaussian", 40).samples
+    assert samples is gaussian_samples(40)
+    with pytest.raises(ValueError):
+        samples[0] = 0.
+
+
+def test_gaussian_with_edges_subtracted():
+    samples = gaussian_samples(41, amplitude=0.2, subtract_edges=True)
+    assert samples[0] == samples[-1] == 0.
+    assert samples.max() == pytest.approx(0.2)
+    for length in [0, 1, 2]:
+        with pytest.raises(ValueError):
+            gaussian_samples(length, subtract_edges=True)
+    assert np.all(np.isfinite(gaussian_samples(1)))
+
+
+def test_drag_quadrature_is_the_scaled_derivative():
+    i, q = drag_samples(41, amplitude=0.2, sigma=8, alpha=0.5)
+    t = np.arange(41) - 20
+    np.testing.assert_allclose(q, -0.5 * t / 64 * i)
+    _, q_detuned = drag_samples(41, amplitude=0.2, sigma=8, alpha=0.5, anharmonicity=-200e6, detuning=10e6)
+    np.testing.assert_allclose(q_detuned, q * 1e9 / (2 * np.pi * -210e6))
+
+
+def test_drag_at_the_anharmonicity_is_rejected():
+    with pytest.raises(ValueError):
+        drag_samples(40, alpha=0.5, anharmonicity=-200e6, detuning=-200e6)
+
+
+def test_piecewise_linear_samples():
+    samples = piecewise_linear_samples(200, [(0, 0.), (100, 0.2), (150, 0.2)])
+    assert samples[50] == pytest.approx(0.1)
+    assert np.all(samples[100:] == 0.2)
+    assert piecewise_linear_samples(200, [(0., 0), (100., 0.2), (150., 0.2)]) is samples
@@ -0,0 +1,59 @@
+"""
+Streaming of the results of a simulated job, and incremental consumers compared with numpy on the full data
+"""
+import numpy as np
+
+from simulator import SimulatedResultHandles
+from streaming import OnlinePolynomialFit, RunningStatistics, consume, stream_results
+
+
+def full_data(n_values=5000, seed=1):
+    rng = np.random.default_rng(seed)
+    a = rng.uniform(0., 2., n_values)
+    i = 0.3 * a**3 - 0.5 * a**2 + a + rng.normal(0., 0.05, n_values)
+    return {"a": a, "i": i}
+
+
+def test_chunks_cover_the_streams_in_order():
+    data = full_data()
+    handles = SimulatedResultHandles(data, values_per_poll=97)
+    chunks = list(stream_results(handles, chunk_size=64, poll_interval=0.))
+    assert len(chunks) > 1
+    assert all(len(chunk["a"]) == len(chunk["i"]) <= 64 for chunk in chunks)
+    for name in ("a", "i"):
+        np.testing.assert_array_equal(np.concatenate([chunk[name] for chunk in chunks]), data[name])
+
+
+def test_running_statistics_match_numpy():
+    data = full_data()
+    statistics = RunningStatistics.uniform(0., 2., 10)
+    consume(stream_results(SimulatedResultHandles(data, values_per_poll=333), chunk_size=250, poll_interval=0.),
+            [statistics])
+    bins = np.minimum((data["a"] / 0.2).astype(int), 9)
+    for k in range(10):
+        values = data["i"][bins == k]
+        assert statistics.count[k] == values.size
+        np.testing.assert_allclose(statistics.mean[k], np.mean(values), rtol=1e-12)
+        np.testing.assert_allclose(statistics.variance()[k], np.var(values, ddof=1), rtol=1e-10)
+
+
+def test_running_statistics_keep_empty_bins():
+    statistics = RunningStatistics.uniform(0., 4., 2)
+    statistics.update({"a": np.array([0.5, 1., 1.5]), "i": np.array([1., 2., 3.])})
+    statistics.update({"a": np.array([1.]), "i": np.array([6.])})
+    assert statistics.count.tolist() == [4, 0]
+    np.testing.assert_allclose(statistics.mean[0], 3.)
+    np.testing.assert_allclose(statistics.variance()[0], np.var([1., 2., 3., 6.], ddof=1))
+    assert np.isnan(statistics.variance()[1])
+
+
+def test_online_polynomial_fit_matches_polyfit():
+    data = full_data()
+    fit = OnlinePolynomialFit(degree=3)
+    consume(stream_results(SimulatedResultHandles(data, values_per_poll=500), chunk_size=128, poll_interval=0.),
+            [fit])
+    expected, residuals = np.polyfit(data["a"], data["i"], 3, full=True)[:2]
+    assert fit.count == data["a"].size
+    np.testing.assert_allclose(fit.coefficients(), expected, rtol=1e-8, atol=1e-10)
+    np.testing.assert_allclose(fit.residual_variance(), residuals[0] / (data["a"].size - 4), rtol=1e-6)
+    np.testing.assert_allclose(fit.predict(data["a"]), np.polyval(expected, data["a"]), rtol=1e-8, atol=1e-10)
@@ -0,0 +1,23 @@
+"""
+Step of the amplitude sweeps, checked against the amplitudes of the simulator
+"""
+import pytest
+
+from config import config
+from intensityVoltage import _sweep_step
+from simulator import simulate_intensity_voltage
+
+
+@pytest.mark.parametrize("n_steps, a_min, a_max", [(2001, 0., 2.), (2, 0.5, 1.5), (1, 1., 1.)])
+def test_sweep_has_n_steps_amplitudes(n_steps, a_min, a_max):
+    step = _sweep_step(n_steps, a_min, a_max)
+    results = simulate_intensity_voltage(config, start=a_min, stop=a_max, step=step)
+    assert results["a"].size == n_steps
+    assert results["a"][0] == a_min
+    assert results["a"][-1] == pytest.approx(a_max)
+
+
+@pytest.mark.parametrize("n_steps, a_min, a_max", [(1, 0., 2.), (0, 0., 0.), (10, 2., 0.), (10, 1., 1.)])
+def test_invalid_sweeps_are_rejected(n_steps, a_min, a_max):
+    with pytest.raises(ValueError):
+        _sweep_step(n_steps, a_min, a_max)
@@ -15,9 +15,11 @@ analog_input_1 = Analog_input(1,
 
 # Use the Analog Output 1 and Analog Input 1 ports of an opx2 (has a delay)
 ctrl_name = "OPX+"
+ctrl_type = "opx1"
 OPX = Controller(ctrl_name,
                  analog_outputs=[analog_output_1],
-                 analog_inputs=[analog_input_1])
+                 analog_inputs=[analog_input_1],
+                 ctrl_type=ctrl_type)
 controllers = [OPX]
 
 # Two hardware elements: AOM and photo-diode
@@ -29,7 +31,7 @@ AOM = Element("AOM",
                 "oscillator": "osc",
                 "operations": {"amp_mod": "amp_mod_pulse"}})
 photodiode = Element("photodiode",
-                     {"outputs": {"out1": ("con1", 1)},  # measure on input port 1
+                     {"outputs": {"out1": (ctrl_name, 1)},  # measure on input port 1
                       "oscillator": "osc",  # Uses same oscillator
                       "operations": {"meas": "meas_pulse"}})  # Performs measurement operation
 elements = [AOM,
@@ -62,6 +64,7 @@ waveforms = [amp_mod_wf]
 # Want to avoid overflow: integration weights such that:
 # - raw ADC data scaled to between -0.5 and 0.5 multiplied by weights has result between -2 and 2.
 # - The sum of the multiplication above is smaller than 2**16
+# (checked numerically by demodulation.check_demodulation, run by validation.validate_config)
 # If we assume constant weights w=1, and a constant signal a[n] = a*cos(\omega_{IF} t_s n)
 # then result is d = \frac{a N cos(\phi) 2{-12}}{2}
 # The signal is constant and not modulated. We perform the average by integration during 10 \mu s
@@ -0,0 +1,226 @@
+"""
+Validation of a configuration dictionary before it is sent to the QuantumMachinesManager.
+The whole configuration is checked in a single pass: sections are used as name indexes to check the references
+between components (ports of the elements, pulses of the operations, waveforms and integration weights of the
+pulses...) and the ranges of the values. All the errors are reported at once. Valid configurations are then checked
+for overflows of the demodulation (see demodulation.py).
+"""
+import numpy as np
+
+# Ranges from the documentation of the OPX configuration
+MIN_PULSE_LENGTH = 16
+MAX_PULSE_LENGTH = 2**31 - 1
+MAX_WEIGHT = 2048
+WEIGHT_RESOLUTION = 2**-15
+WEIGHT_GRANULARITY = 4
+OUTPUT_RANGE = 0.5
+MIN_GAIN_DB = -12
+MAX_GAIN_DB = 20
+
+
+class ConfigError(ValueError):
+    """
+    Raised when a configuration is not valid
+
+    Attribute:
+        - errors (List[String]): Description of every error, prefixed by the path of the wrong value
+    """
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("{} error(s) in the configuration:\n".format(len(errors)) + "\n".join(errors))
+
+
+def check_pulse(operation, length):
+    """
+    Checks the operation and the length of a pulse, raises a ValueError if one is not valid
+    """
+    if operation != "control" and operation != "measurement":
+        raise ValueError("""Possible values for operation: "control" or "measurement" """)
+    if length < MIN_PULSE_LENGTH or length > MAX_PULSE_LENGTH:
+        raise ValueError("""Pulse length must be between 16 and 2^31-1 ns""")
+
+
+def _port(port):
+    """
+    Returns the (controller, index) tuple of a port, or None if it is not one
+    """
+    if isinstance(port, (tuple, list)) and len(port) == 2:
+        return port[0], port[1]
+    return None
+
+
+def _check_port(errors, path, port, controllers, ports_type):
+    port = _port(port)
+    if port is None:
+        errors.append("{}: a port must be a tuple (controller, index)".format(path))
+        return
+    controller = controllers.get(port[0])
+    if controller is None:
+        errors.append("{}: controller {!r} is not declared".format(path, port[0]))
+    elif port[1] not in (controller.get(ports_type) or {}):
+        errors.append("{}: port {} is not in the {} of controller {!r}".format(path, port[1], ports_type, port[0]))
+
+
+def _check_controllers(errors, controllers):
+    for name, controller in controllers.items():
+        for index, port in (controller.get("analog_outputs") or {}).items():
+            offset = port.get("offset", 0.)
+            if not -OUTPUT_RANGE <= offset < OUTPUT_RANGE:
+                errors.append("controllers.{}.analog_outputs.{}.offset: {} not in [-0.5, 0.5)".format(
+                    name, index, offset))
+            if port.get("delay", 0) < 0:
+                errors.append("controllers.{}.analog_outputs.{}.delay: must be positive".format(name, index))
+        for index, port in (controller.get("analog_inputs") or {}).items():
+            offset = port.get("offset", 0.)
+            if not -OUTPUT_RANGE <= offset <= OUTPUT_RANGE:
+                errors.append("controllers.{}.analog_inputs.{}.offset: {} not in [-0.5, 0.5]".format(
+                    name, index, offset))
+            gain_db = port.get("gain_db", 0)
+            if gain_db != int(gain_db) or not MIN_GAIN_DB <= gain_db <= MAX_GAIN_DB:
+                errors.append("controllers.{}.analog_inputs.{}.gain_db: {} is not an integer in [-12, 20]".format(
+                    name, index, gain_db))
+
+
+def _check_elements(errors, config):
+    controllers = config.get("controllers") or {}
+    pulses = config.get("pulses") or {}
+    oscillators = config.get("oscillators") or {}
+    mixers = config.get("mixers") or {}
+    for name, element in (config.get("elements") or {}).items():
+        path = "elements." + name
+        if "singleInput" in element:
+            _check_port(errors, path + ".singleInput.port", element["singleInput"].get("port"), controllers,
+                        "analog_outputs")
+        if "mixInputs" in element:
+            mix_inputs = element["mixInputs"]
+            for key in ("I", "Q"):
+                _check_port(errors, "{}.mixInputs.{}".format(path, key), mix_inputs.get(key), controllers,
+                            "analog_outputs")
+            mixer = mix_inputs.get("mixer")
+            if mixer is not None and mixer not in mixers:
+                errors.append("{}.mixInputs.mixer: mixer {!r} is not declared".format(path, mixer))
+        for key, port in (element.get("outputs") or {}).items():
+            _check_port(errors, "{}.outputs.{}".format(path, key), port, controllers, "analog_inputs")
+        for key, digital_input in (element.get("digitalInputs") or {}).items():
+            _check_port(errors, "{}.digitalInputs.{}.port".format(path, key), digital_input.get("port"), controllers,
+                        "digital_outputs")
+        oscillator = element.get("oscillator")
+        if oscillator is not None and oscillator not in oscillators:
+            errors.append("{}.oscillator: oscillator {!r} is not declared".format(path, oscillator))
+        for operation, pulse_name in (element.get("operations") or {}).items():
+            pulse = pulses.get(pulse_name)
+            if pulse is None:
+                errors.append("{}.operations.{}: pulse {!r} is not declared".format(path, operation, pulse_name))
+            elif pulse.get("operation") == "measurement" and not element.get("outputs"):
+                errors.append("{}.operations.{}: measurement pulse {!r} on an element without outputs".format(
+                    path, operation, pulse_name))
+
+
+def _check_pulses(errors, config):
+    waveforms = config.get("waveforms") or {}
+    weights = config.get("integration_weights") or {}
+    digital_waveforms = config.get("digital_waveforms") or {}
+    for name, pulse in (config.get("pulses") or {}).items():
+        path = "pulses." + name
+        length = pulse.get("length", 0)
+        try:
+            check_pulse(pulse.get("operation"), length)
+        except ValueError as error:
+            errors.append("{}: {}".format(path, str(error).strip()))
+        if length % 4 != 0:
+            errors.append("{}.length: {} is not a multiple of 4".format(path, length))
+        for key, waveform_name in (pulse.get("waveforms") or {}).items():
+            waveform = waveforms.get(waveform_name)
+            if waveform is None:
+                errors.append("{}.waveforms.{}: waveform {!r} is not declared".format(path, key, waveform_name))
+            elif waveform.get("type") == "arbitrary" and len(waveform.get("samples", ())) != length:
+                errors.append("{}.waveforms.{}: waveform {!r} has {} samples, pulse length is {}".format(
+                    path, key, waveform_name, len(waveform.get("samples", ())), length))
+        integration_weights = pulse.get("integration_weights") or {}
+        if integration_weights and pulse.get("operation") != "measurement":
+            errors.append("{}.integration_weights: only measurement pulses have integration weights".format(path))
+        for key, weight_name in integration_weights.items():
+            weight = weights.get(weight_name)
+            if weight is None:
+                errors.append("{}.integration_weights.{}: integration weight {!r} is not declared".format(
+                    path, key, weight_name))
+                continue
+            for quadrature in ("cosine", "sine"):
+                duration = sum(segment[1] for segment in weight.get(quadrature, ()))
+                if duration != length:
+                    errors.append("{}.integration_weights.{}: {} duration of {!r} is {} ns, pulse length is {}".format(
+                        path, key, quadrature, weight_name, duration, length))
+        digital_marker = pulse.get("digital_marker")
+        if digital_marker and digital_marker not in digital_waveforms:
+            errors.append("{}.digital_marker: digital waveform {!r} is not declared".format(path, digital_marker))
+
+
+def _check_waveforms(errors, waveforms):
+    for name, waveform in waveforms.items():
+        path = "waveforms." + name
+        wvf_type = waveform.get("type")
+        if wvf_type == "constant":
+            low = high = waveform.get("sample", 0.)
+        elif wvf_type == "arbitrary":
+            # Samples may be millions of floats: the bounds are computed by numpy, not by Python loops
+            try:
+                samples = np.asarray(waveform.get("samples", ()), dtype=np.float64)
+            except (TypeError, ValueError):
+                errors.append("{}.samples: must be a sequence of numbers".format(path))
+                continue
+            if samples.size == 0:
+                continue
+            low, high = samples.min(), samples.max()
+        else:
+            errors.append("""{}.type: must be "constant" or "arbitrary" """.format(path).strip())
+            continue
+        if not (-OUTPUT_RANGE <= low and high < OUTPUT_RANGE):
+            errors.append("{}: samples not in [-0.5, 0.5)".format(path))
+
+
+def _check_integration_weights(errors, weights):
+    for name, weight in weights.items():
+        for quadrature in ("cosine", "sine"):
+            path = "integration_weights.{}.{}".format(name, quadrature)
+            for k, segment in enumerate(weight.get(quadrature, ())):
+                if not isinstance(segment, (tuple, list)) or len(segment) != 2:
+                    errors.append("{}[{}]: a segment must be a tuple (weight, duration)".format(path, k))
+                    continue
+                value, duration = segment
+                if not -MAX_WEIGHT <= value <= MAX_WEIGHT:
+                    errors.append("{}[{}]: weight {} not in [-2048, 2048]".format(path, k, value))
+                if duration <= 0 or duration % 4 != 0:
+                    errors.append("{}[{}]: duration {} is not a positive multiple of 4".format(path, k, duration))
+
+
+def validate_config(config):
+    """
+    Checks a configuration dictionary
+
+    Param:
+        - config (Dict): Configuration dictionary (config.config, QuantumMachine.config())
+    Return:
+        - errors (List[String]): Description of every error, empty if the configuration is valid
+    """
+    errors = []
+    if config.get("version") != 1:
+        errors.append("version: must be 1")
+    _check_controllers(errors, config.get("controllers") or {})
+    _check_elements(errors, config)
+    _check_pulses(errors, config)
+    _check_waveforms(errors, config.get("waveforms") or {})
+    _check_integration_weights(errors, config.get("integration_weights") or {})
+    if not errors:
+        # Overflows of the demodulation are only computed on well-formed configurations
+        from demodulation import demodulation_errors
+        errors.extend(demodulation_errors(config))
+    return errors
+
+
+def check_config(config):
+    """
+    Checks a configuration dictionary, raises a ConfigError listing all the errors if it is not valid
+    """
+    errors = validate_config(config)
+    if errors:
+        raise ConfigError(errors)